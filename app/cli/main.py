@@ -4,6 +4,7 @@ from __future__ import annotations
 
 import argparse
 import json
+import sys
 from pathlib import Path
 from typing import Optional
 
@@ -15,7 +16,9 @@ from app.queue.db import init_db
 from app.queue.jobs import enqueue_job
 from app.queue.worker import run_worker
 from app.clients.snowflake_client import SnowflakeClient
+from app.modules.retrieve.fanout import require_source, retrieve_timeout, run_sources
 from app.modules.retrieve.retrieve_snowflake import retrieve
+from app.modules.retrieve.result_cache import result_cache_stats
 from app.modules.swarm.route import route_question
 from app.modules.swarm.synthesize import synthesize
 from app.modules.swarm.analyze import analyze
@@ -24,9 +27,11 @@ from app.modules.memory.memory_write import write_memory
 from app.modules.memory.memory_recall import recall as recall_memory
 from app.modules.memory.memory_stats import get_memory_stats
 from app.modules.memory.maintenance import handle_job as handle_memory_maintain_job
+from app.modules.memory.memory_embed import handle_job as handle_memory_embed_job
 from app.modules.memory.maintenance import run_memory_maintenance
 from app.modules.memory.router import parse_explicit_remember, route_memory
 from app.modules.memory.retrieval_feedback import record_retrieval_feedback
+from app.modules.memory.transfer import export_memories, import_memories
 from app.modules.memory.context_handoff import (
     get_handoff,
     inject_session_resume_evidence,
@@ -47,7 +52,11 @@ from app.modules.transcribe.transcript_markdown import handle_job as handle_tran
 from app.modules.chunk.chunk_text import handle_job as handle_chunk_text
 from app.modules.chunk.chunk_transcript import handle_job as handle_chunk_transcript
 from app.modules.embeddings.embed_chunks import handle_job as handle_embed_chunks
+from app.modules.embeddings.embed_doc_summary import handle_job as handle_embed_doc_summary
 from app.modules.embeddings.embed_voice_gallery import handle_job as handle_embed_voice_gallery
+from app.modules.embeddings.query_cache import query_cache_stats
+from app.modules.embeddings.reembed import handle_job as handle_reembed
+from app.modules.embeddings.reembed import reembed_status, start_reembed
 from app.modules.enrich.enrich_doc import handle_job as handle_enrich_doc
 from app.modules.enrich.enrich_chunks import handle_job as handle_enrich_chunks
 from app.modules.publish.publish_snowflake import handle_job as handle_publish_snowflake
@@ -128,7 +137,9 @@ def cmd_worker(args) -> None:
         "chunk_text": handle_chunk_text,
         "chunk_transcript": handle_chunk_transcript,
         "embed_chunks": handle_embed_chunks,
+        "embed_doc_summary": handle_embed_doc_summary,
         "embed_voice_gallery": handle_embed_voice_gallery,
+        "reembed": handle_reembed,
         "enrich_doc": handle_enrich_doc,
         "enrich_chunks": handle_enrich_chunks,
         "publish_snowflake": handle_publish_snowflake,
@@ -143,6 +154,7 @@ def cmd_worker(args) -> None:
         "voiceprint_match": handle_voiceprint_match,
         "voiceprint_review": handle_voiceprint_review,
         "memory_maintain": handle_memory_maintain_job,
+        "memory_embed": handle_memory_embed_job,
     }
     run_worker(args.lane, handlers, max_idle_polls=args.max_idle)
 
@@ -160,6 +172,18 @@ def cmd_status(_args) -> None:
     print("Job status:")
     for status, count in rows:
         print(f"- {status}: {count}")
+    cache = query_cache_stats()
+    print("Query embedding cache:")
+    print(
+        f"- hits: {cache['hits']} disk_hits: {cache['disk_hits']} misses: {cache['misses']} "
+        f"size: {cache['size']}/{cache['max_size']}"
+    )
+    results = result_cache_stats()
+    print("Retrieve result cache:")
+    print(
+        f"- hits: {results['hits']} misses: {results['misses']} stale: {results['stale']} "
+        f"size: {results['size']}/{results['max_size']}"
+    )
 
 
 
@@ -188,6 +212,27 @@ def cmd_delete_source(args) -> None:
     print(f"  Artifacts removed:  {result['artifacts_removed']}")
 
 
+def cmd_rebuild_chunk_index(args) -> None:
+    """Fill the local lexical index from chunk artifacts (sources chunked before it existed)."""
+    from app.modules.retrieve.chunk_index import rebuild_chunk_index
+    result = rebuild_chunk_index(missing_only=not args.all)
+    print(json.dumps(result, ensure_ascii=True, sort_keys=True, indent=2))
+
+
+def cmd_backfill_doc_summaries(args) -> None:
+    """Queue embed_doc_summary for summarized sources that have no vector from the active model."""
+    from app.modules.embeddings.embed_doc_summary import schedule_doc_summary_backfill
+    print(json.dumps({"queued": schedule_doc_summary_backfill()}, ensure_ascii=True, sort_keys=True, indent=2))
+
+
+def cmd_reembed(args) -> None:
+    if bool(args.status):
+        print(json.dumps(reembed_status(args.model), ensure_ascii=True, sort_keys=True, indent=2))
+        return
+    job_id = start_reembed(args.model)
+    print(f"Enqueued reembed job: {job_id}")
+
+
 def cmd_ask(args) -> None:
     question = normalize_user_text(args.question, max_len=2400)
     if not question:
@@ -219,13 +264,21 @@ def cmd_ask(args) -> None:
     plan = route_question(question)
     plan_filters = dict(plan.filters or {})
     plan_filters.update(scope_filters)
-    evidence = retrieve(question, limit=plan.retrieve_top_k, filters=plan_filters)
-    graph_evidence = []
-    try:
-        graph_evidence = graph_retrieve(question, limit=plan.retrieve_top_k, hops=1)
-    except Exception:
-        graph_evidence = []
-    combined_evidence = evidence + (graph_evidence or [])
+    show_timings = bool(getattr(args, "timings", False))
+    retrieval_report: dict = {}
+    retrieve_kwargs = {"report": retrieval_report} if show_timings else {}
+    outputs, ask_report = run_sources(
+        {
+            "retrieve": lambda: retrieve(question, limit=plan.retrieve_top_k, filters=plan_filters, **retrieve_kwargs),
+            "graph": lambda: graph_retrieve(question, limit=plan.retrieve_top_k, hops=1),
+        },
+        timeouts={"retrieve": retrieve_timeout()},
+    )
+    # Graph evidence is optional; answering without retrieval would synthesize from nothing.
+    require_source(ask_report, "retrieve")
+    evidence = outputs.get("retrieve") or []
+    graph_evidence = outputs.get("graph") or []
+    combined_evidence = evidence + graph_evidence
     try:
         inject_session_resume_evidence(combined_evidence, session_id=session_id)
     except Exception:
@@ -270,6 +323,12 @@ def cmd_ask(args) -> None:
         print("Citations:")
         for c in result.citations:
             print(f"- {c.doc_id}:{c.segment_id}")
+    if show_timings:
+        print("Retrieval timings:")
+        timings = dict(retrieval_report.get("sources") or {})
+        timings["graph"] = ask_report.get("graph", {})
+        for name, entry in timings.items():
+            print(f"- {name}: {entry.get('status')} {entry.get('ms')}ms count={entry.get('count', 0)}")
 
 
 def _write_routed_ask_memory(
@@ -361,12 +420,22 @@ def main() -> int:
     p_del = sub.add_parser("delete-source", help="Delete a source and all its data")
     p_del.add_argument("source_id", help="Source ID to delete (e.g. url:https://...)")
 
+    p_chunk_index = sub.add_parser("rebuild-chunk-index", help="Index chunked sources missing from the lexical index")
+    p_chunk_index.add_argument("--all", action="store_true", help="Re-index every source, not only missing ones")
+
+    sub.add_parser("backfill-doc-summaries", help="Embed existing document summaries for the retrieval prefilter")
+
+    p_reembed = sub.add_parser("reembed", help="Re-embed all chunks with a new model, then switch atomically")
+    p_reembed.add_argument("--model", default=None, help="Target embedding model (default: OLLAMA_MODEL_EMBED)")
+    p_reembed.add_argument("--status", action="store_true", help="Show migration progress instead of enqueueing")
+
     p_ask = sub.add_parser("ask")
     p_ask.add_argument("question")
     p_ask.add_argument("--user-id", default=None)
     p_ask.add_argument("--project-id", default=None)
     p_ask.add_argument("--session-id", default=None)
     p_ask.add_argument("--remember", action="store_true")
+    p_ask.add_argument("--timings", action="store_true", help="Print per-source retrieval timings")
 
     p_mem_write = sub.add_parser("memory-write")
     p_mem_write.add_argument("--type", required=True, dest="memory_type")
@@ -397,6 +466,21 @@ def main() -> int:
     p_mem_stats.add_argument("--project-id", default=None)
     p_mem_stats.add_argument("--session-id", default=None)
 
+    p_mem_export = sub.add_parser("memory-export", help="Stream memory_items as JSONL, oldest first")
+    p_mem_export.add_argument("--output", default="-", help="File to write ('-' for stdout)")
+    p_mem_export.add_argument("--after", default=None, help="Resume after this memory_id (appends to --output)")
+    p_mem_export.add_argument("--page-size", type=int, default=1000)
+    p_mem_export.add_argument("--user-id", default=None)
+    p_mem_export.add_argument("--project-id", default=None)
+    p_mem_export.add_argument("--session-id", default=None)
+
+    p_mem_import = sub.add_parser("memory-import", help="Load a memory-export JSONL file")
+    p_mem_import.add_argument("--input", required=True, help="File to read ('-' for stdin)")
+    p_mem_import.add_argument("--skip-lines", type=int, default=0, help="Resume after this many input lines")
+    p_mem_import.add_argument("--batch-size", type=int, default=500)
+    p_mem_import.add_argument("--no-route", action="store_true", help="Keep exported kind/slot instead of re-routing")
+    p_mem_import.add_argument("--no-embed", action="store_true", help="Do not schedule memory embedding")
+
     p_mem_maintain = sub.add_parser("memory-maintain")
     p_mem_maintain.add_argument("--user-id", default=None)
     p_mem_maintain.add_argument("--project-id", default=None)
@@ -435,6 +519,12 @@ def main() -> int:
         cmd_library(args)
     elif args.cmd == "delete-source":
         cmd_delete_source(args)
+    elif args.cmd == "rebuild-chunk-index":
+        cmd_rebuild_chunk_index(args)
+    elif args.cmd == "backfill-doc-summaries":
+        cmd_backfill_doc_summaries(args)
+    elif args.cmd == "reembed":
+        cmd_reembed(args)
     elif args.cmd == "ask":
         cmd_ask(args)
     elif args.cmd == "memory-write":
@@ -493,6 +583,41 @@ def main() -> int:
             session_id=session_id,
         )
         print(json.dumps(stats, ensure_ascii=True, sort_keys=True, indent=2))
+    elif args.cmd == "memory-export":
+        user_id, project_id, session_id = _resolve_scope(
+            user_id=getattr(args, "user_id", None),
+            project_id=getattr(args, "project_id", None),
+            session_id=getattr(args, "session_id", None),
+        )
+        export_kwargs = {
+            "after": args.after,
+            "page_size": args.page_size,
+            "user_id": user_id,
+            "project_id": project_id,
+            "session_id": session_id,
+        }
+        if args.output == "-":
+            output = export_memories(sys.stdout, **export_kwargs)
+            # Keep stdout pure JSONL.
+            print(json.dumps(output, ensure_ascii=True, sort_keys=True), file=sys.stderr)
+        else:
+            with open(args.output, "a" if args.after else "w", encoding="utf-8") as out:
+                output = export_memories(out, **export_kwargs)
+            print(json.dumps(output, ensure_ascii=True, sort_keys=True, indent=2))
+    elif args.cmd == "memory-import":
+        import_kwargs = {
+            "skip_lines": max(0, int(args.skip_lines)),
+            "batch_size": args.batch_size,
+            "route": not args.no_route,
+            "embed": not args.no_embed,
+            "on_batch": lambda line_no: print(f"committed through line {line_no}", file=sys.stderr),
+        }
+        if args.input == "-":
+            output = import_memories(sys.stdin, **import_kwargs)
+        else:
+            with open(args.input, "r", encoding="utf-8") as lines:
+                output = import_memories(lines, **import_kwargs)
+        print(json.dumps(output, ensure_ascii=True, sort_keys=True, indent=2))
     elif args.cmd == "memory-maintain":
         user_id, project_id, session_id = _resolve_scope(
             user_id=getattr(args, "user_id", None),
@@ -28,11 +28,42 @@ class Settings:
     ollama_request_retries: int
     ollama_request_backoff_seconds: float
     embeddings_enabled: bool
+    query_embedding_cache_size: int
+    query_embedding_cache_disk: bool
+    pgvector_enabled: bool
+    pgvector_dim: int
+    pgvector_index: str
+    pgvector_ivfflat_lists: int
+    embedding_quantization: str
+    embedding_rerank_factor: int
+    embedding_shards_enabled: bool
+    reembed_batch_size: int
+    reembed_interval_seconds: float
+    lexical_index_enabled: bool
+    retrieve_parallel: bool
+    retrieve_source_timeout_seconds: float
+    retrieve_source_timeouts: dict[str, float]
+    retrieve_fusion: str
+    retrieve_fusion_weights: dict[str, float]
+    retrieve_cache_size: int
+    retrieve_cache_ttl_seconds: float
+    retrieve_diversify_enabled: bool
+    retrieve_mmr_lambda: float
+    retrieve_near_dup_threshold: float
+    retrieve_expand_seconds: float
+    retrieve_expand_chunks: int
+    retrieve_doc_prefilter_top: int
+    evidence_token_budget: int
+    evidence_token_budgets: dict[str, float]
     chunk_summaries_enabled: bool
     memory_enabled: bool
     memory_retrieve_limit: int
     memory_maintenance_feedback_retention_days: int
     memory_maintenance_max_delete_per_run: int
+    memory_embeddings_enabled: bool
+    memory_embed_batch_size: int
+    memory_access_flush_seconds: float
+    memory_access_flush_max_pending: int
     retrieval_feedback_enabled: bool
     retrieval_feedback_history_limit: int
     retrieval_feedback_signal_limit: int
@@ -85,6 +116,21 @@ def _getenv_bool(name: str, default: bool = False) -> bool:
     return val.strip().lower() in {"1", "true", "yes", "on"}
 
 
+def _parse_float_map(raw: str, allow_zero: bool = False) -> dict[str, float]:
+    """Parse "name=value,name=value" overrides; malformed or negative entries are ignored."""
+    out: dict[str, float] = {}
+    for part in raw.split(","):
+        name, _, value = part.partition("=")
+        name = name.strip().lower()
+        try:
+            number = float(value)
+        except ValueError:
+            continue
+        if name and (number > 0 or (allow_zero and number == 0)):
+            out[name] = number
+    return out
+
+
 def load_settings() -> Settings:
     load_dotenv()
     artifact_root = Path(os.getenv("ARTIFACT_ROOT", "./data/artifacts")).resolve()
@@ -108,6 +154,33 @@ def load_settings() -> Settings:
         ollama_request_retries=max(0, int(os.getenv("OLLAMA_REQUEST_RETRIES", "2"))),
         ollama_request_backoff_seconds=max(0.0, float(os.getenv("OLLAMA_REQUEST_BACKOFF_SECONDS", "0.5"))),
         embeddings_enabled=_getenv_bool("EMBEDDINGS_ENABLED", True),
+        query_embedding_cache_size=max(0, int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "512"))),
+        query_embedding_cache_disk=_getenv_bool("QUERY_EMBEDDING_CACHE_DISK", False),
+        pgvector_enabled=_getenv_bool("PGVECTOR_ENABLED", True),
+        pgvector_dim=max(1, int(os.getenv("PGVECTOR_DIM", "768"))),
+        pgvector_index="ivfflat" if os.getenv("PGVECTOR_INDEX", "hnsw").strip().lower() == "ivfflat" else "hnsw",
+        pgvector_ivfflat_lists=max(1, int(os.getenv("PGVECTOR_IVFFLAT_LISTS", "100"))),
+        embedding_quantization="int8" if os.getenv("EMBEDDING_QUANTIZATION", "off").strip().lower() == "int8" else "off",
+        embedding_rerank_factor=max(1, int(os.getenv("EMBEDDING_RERANK_FACTOR", "4"))),
+        embedding_shards_enabled=_getenv_bool("EMBEDDING_SHARDS_ENABLED", False),
+        reembed_batch_size=max(1, int(os.getenv("REEMBED_BATCH_SIZE", "64"))),
+        reembed_interval_seconds=max(0.0, float(os.getenv("REEMBED_INTERVAL_SECONDS", "2"))),
+        lexical_index_enabled=_getenv_bool("LEXICAL_INDEX_ENABLED", True),
+        retrieve_parallel=_getenv_bool("RETRIEVE_PARALLEL", True),
+        retrieve_source_timeout_seconds=max(0.1, float(os.getenv("RETRIEVE_SOURCE_TIMEOUT_SECONDS", "8"))),
+        retrieve_source_timeouts=_parse_float_map(os.getenv("RETRIEVE_SOURCE_TIMEOUTS", "")),
+        retrieve_fusion=os.getenv("RETRIEVE_FUSION", "legacy").strip().lower(),
+        retrieve_fusion_weights=_parse_float_map(os.getenv("RETRIEVE_FUSION_WEIGHTS", ""), allow_zero=True),
+        retrieve_cache_size=max(0, int(os.getenv("RETRIEVE_CACHE_SIZE", "256"))),
+        retrieve_cache_ttl_seconds=max(0.0, float(os.getenv("RETRIEVE_CACHE_TTL_SECONDS", "300"))),
+        retrieve_diversify_enabled=_getenv_bool("RETRIEVE_DIVERSIFY_ENABLED", True),
+        retrieve_mmr_lambda=min(1.0, max(0.0, float(os.getenv("RETRIEVE_MMR_LAMBDA", "0.7")))),
+        retrieve_near_dup_threshold=min(1.0, max(0.0, float(os.getenv("RETRIEVE_NEAR_DUP_THRESHOLD", "0.8")))),
+        retrieve_expand_seconds=max(0.0, float(os.getenv("RETRIEVE_EXPAND_SECONDS", "0"))),
+        retrieve_expand_chunks=max(0, int(os.getenv("RETRIEVE_EXPAND_CHUNKS", "0"))),
+        retrieve_doc_prefilter_top=max(0, int(os.getenv("RETRIEVE_DOC_PREFILTER_TOP", "0"))),
+        evidence_token_budget=max(64, int(os.getenv("EVIDENCE_TOKEN_BUDGET", "2200"))),
+        evidence_token_budgets=_parse_float_map(os.getenv("EVIDENCE_TOKEN_BUDGETS", "")),
         chunk_summaries_enabled=_getenv_bool("CHUNK_SUMMARIES_ENABLED", True),
         memory_enabled=_getenv_bool("MEMORY_ENABLED", True),
         memory_retrieve_limit=int(os.getenv("MEMORY_RETRIEVE_LIMIT", "4")),
@@ -115,6 +188,10 @@ def load_settings() -> Settings:
             1, int(os.getenv("MEMORY_MAINTENANCE_FEEDBACK_RETENTION_DAYS", "30"))
         ),
         memory_maintenance_max_delete_per_run=max(10, int(os.getenv("MEMORY_MAINTENANCE_MAX_DELETE_PER_RUN", "250"))),
+        memory_embeddings_enabled=_getenv_bool("MEMORY_EMBEDDINGS_ENABLED", True),
+        memory_embed_batch_size=max(1, int(os.getenv("MEMORY_EMBED_BATCH_SIZE", "64"))),
+        memory_access_flush_seconds=max(0.0, float(os.getenv("MEMORY_ACCESS_FLUSH_SECONDS", "30"))),
+        memory_access_flush_max_pending=max(1, int(os.getenv("MEMORY_ACCESS_FLUSH_MAX_PENDING", "1000"))),
         retrieval_feedback_enabled=_getenv_bool("RETRIEVAL_FEEDBACK_ENABLED", True),
         retrieval_feedback_history_limit=max(10, int(os.getenv("RETRIEVAL_FEEDBACK_HISTORY_LIMIT", "80"))),
         retrieval_feedback_signal_limit=max(3, int(os.getenv("RETRIEVAL_FEEDBACK_SIGNAL_LIMIT", "8"))),
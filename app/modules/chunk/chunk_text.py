@@ -10,6 +10,8 @@ from app.core.manifest import get_manifest, upsert_manifest
 from app.core.storage import artifact_path, read_artifact, write_artifact
 from app.core.timeutil import utc_now
 from app.modules.chunk.summarize_chunk import summarize_chunk
+from app.modules.memory.policy import token_set
+from app.modules.retrieve.chunk_index import index_chunks
 from app.queue.jobs import enqueue_job
 from app.queue.logs import log_run
 
@@ -52,6 +54,7 @@ def chunk(
                 "end_ms": None,
                 "speaker": None,
                 "text": part,
+                "tokens": token_set(part),
                 "source_refs": {"chunk_index": idx},
             }
         )
@@ -150,6 +153,8 @@ def handle_job(job: Dict[str, object]) -> None:
             row["source_refs"] = refs
     lines = "\n".join(json.dumps(c, ensure_ascii=True) for c in chunks)
     write_artifact(source_id, source_version, CHUNKS_REL_PATH, lines)
+    if load_settings().lexical_index_enabled:
+        index_chunks(source_id, source_version, chunks)
 
     manifest.setdefault("artifacts", {})["chunks"] = CHUNKS_REL_PATH
     manifest.setdefault("steps", {})["chunk_text"] = {"status": "done", "chunk_count": len(chunks)}
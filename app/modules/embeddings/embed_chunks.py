@@ -11,7 +11,12 @@ from app.core.ids import sha256_text
 from app.core.manifest import get_manifest, upsert_manifest
 from app.core.storage import artifact_path, read_artifact
 from app.core.timeutil import utc_now
-from app.modules.embeddings.embedding_store import get_embedding_hashes, upsert_embedding
+from app.modules.embeddings.embedding_store import (
+    get_active_embedding_model,
+    get_embedding_hashes,
+    upsert_embedding,
+)
+from app.modules.embeddings.vector_shards import build_shard
 from app.queue.logs import log_run
 
 
@@ -55,6 +60,7 @@ def handle_job(job: Dict[str, object]) -> None:
     )
 
     chunks = _load_chunks(chunks_text)
+    model = get_active_embedding_model()
     existing_hashes = get_embedding_hashes(source_id)
     embedded = 0
     for chunk in chunks:
@@ -65,7 +71,7 @@ def handle_job(job: Dict[str, object]) -> None:
         text_hash = sha256_text(text)
         if existing_hashes.get(segment_id) == text_hash:
             continue
-        vector = embed(text)
+        vector = embed(text, model=model)
         upsert_embedding(
             {
                 "doc_id": source_id,
@@ -79,10 +85,14 @@ def handle_job(job: Dict[str, object]) -> None:
                 "end_ms": chunk.get("end_ms"),
                 "speaker": chunk.get("speaker"),
                 "source_refs": chunk.get("source_refs") or {},
+                "embedding_model": model,
             }
         )
         embedded += 1
 
+    if settings.embedding_shards_enabled:
+        build_shard(source_id, source_version, model)
+
     manifest.setdefault("steps", {})["embed_chunks"] = {"status": "done", "embedded": embedded}
     manifest["updated_at"] = utc_now().isoformat()
     upsert_manifest(source_id, source_version, manifest)
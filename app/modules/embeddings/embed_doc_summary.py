@@ -0,0 +1,132 @@
+"""Embed the enrich_doc summary of a source for document-level pre-filtering."""
+
+from __future__ import annotations
+
+import json
+from typing import Dict, List, Tuple
+
+from app.clients.ollama_client import embed
+from app.core.config import load_settings
+from app.core.ids import sha256_text
+from app.core.manifest import get_manifest, upsert_manifest
+from app.core.storage import read_artifact
+from app.core.timeutil import utc_now
+from app.modules.embeddings.embedding_store import (
+    get_active_embedding_model,
+    get_doc_embedding_hash,
+    upsert_doc_embedding,
+)
+from app.modules.enrich.enrich_doc import SUMMARY_REL_PATH
+from app.queue.db import get_conn
+from app.queue.jobs import enqueue_job
+from app.queue.logs import log_run
+
+
+JOB_TYPE = "embed_doc_summary"
+JOB_LANE = "oss20b"
+
+
+def summary_text(payload: Dict[str, object]) -> str:
+    """Text embedded for a document: long summary (or short) followed by its topics."""
+    summary = str(payload.get("summary_long") or payload.get("summary_short") or "").strip()
+    topics = [str(topic).strip() for topic in payload.get("topics") or [] if str(topic).strip()]  # type: ignore[union-attr]
+    if topics:
+        summary = f"{summary}\nTopics: {', '.join(topics)}".strip()
+    return summary
+
+
+def handle_job(job: Dict[str, object]) -> None:
+    settings = load_settings()
+    if not settings.embeddings_enabled:
+        return
+
+    source_id = str(job["source_id"])
+    source_version = str(job["source_version"])
+
+    manifest = get_manifest(source_id, source_version)
+    if not manifest:
+        raise RuntimeError("Manifest not found for embed_doc_summary")
+
+    raw = read_artifact(source_id, source_version, SUMMARY_REL_PATH)
+    if raw is None:
+        raise RuntimeError("doc_summary artifact missing on disk")
+    text = summary_text(json.loads(raw))
+    if not text:
+        return
+
+    text_hash = sha256_text(text)
+    if get_doc_embedding_hash(source_id) == text_hash:
+        return
+
+    run_id = log_run(
+        lane=str(job.get("lane", "oss20b")),
+        component="embed_doc_summary",
+        input_json={"source_id": source_id, "source_version": source_version},
+    )
+    model = get_active_embedding_model()
+    upsert_doc_embedding(
+        {
+            "doc_id": source_id,
+            "source_id": source_id,
+            "source_version": source_version,
+            "summary": text,
+            "text_hash": text_hash,
+            "embedding": embed(text, model=model),
+            "embedding_model": model,
+        }
+    )
+
+    manifest.setdefault("steps", {})["embed_doc_summary"] = {"status": "done"}
+    manifest["updated_at"] = utc_now().isoformat()
+    upsert_manifest(source_id, source_version, manifest)
+
+    log_run(
+        lane=str(job.get("lane", "oss20b")),
+        component="embed_doc_summary",
+        input_json={"run_id": run_id},
+        output_json={"chars": len(text)},
+    )
+
+
+def schedule_doc_summary_backfill() -> int:
+    """Queue embed_doc_summary for every summarized source without a vector from the active model.
+
+    Covers sources enriched before summaries were embedded and summaries left on the
+    previous model by a reembed switch. Sources with a queued job are skipped.
+    """
+    settings = load_settings()
+    if not settings.embeddings_enabled:
+        return 0
+    pending = _sources_missing_summary_vectors(get_active_embedding_model())
+    for source_id, source_version in pending:
+        enqueue_job(JOB_TYPE, JOB_LANE, source_id, source_version)
+    return len(pending)
+
+
+def _sources_missing_summary_vectors(model: str) -> List[Tuple[str, str]]:
+    with get_conn() as conn:
+        cur = conn.cursor()
+        ph = "?" if conn.is_sqlite else "%s"
+        cur.execute(
+            "SELECT m.source_id, m.source_version, m.manifest_json, d.doc_id, j.job_id FROM manifests m "
+            f"LEFT JOIN doc_embeddings d ON d.doc_id = m.source_id AND d.source_version = m.source_version "
+            f"AND d.embedding_model = {ph} "
+            f"LEFT JOIN jobs j ON j.job_type = {ph} AND j.status IN ('queued', 'running') "
+            "AND j.source_id = m.source_id AND j.source_version = m.source_version "
+            "ORDER BY m.updated_at DESC",
+            (model, JOB_TYPE),
+        )
+        rows = cur.fetchall()
+    seen = set()
+    out: List[Tuple[str, str]] = []
+    for source_id, source_version, raw, embedded, queued in rows:
+        manifest = json.loads(raw) if isinstance(raw, (str, bytes, bytearray)) else raw
+        if not isinstance(manifest, dict) or not (manifest.get("artifacts") or {}).get("doc_summary"):
+            continue
+        # doc_embeddings holds one summary per source: only its newest summarized version counts.
+        if source_id in seen:
+            continue
+        seen.add(source_id)
+        if embedded is None and queued is None:
+            out.append((str(source_id), str(source_version)))
+    return out
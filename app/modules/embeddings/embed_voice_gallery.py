@@ -9,7 +9,11 @@ from app.clients.ollama_client import embed
 from app.core.config import load_settings
 from app.core.ids import sha256_text
 from app.modules.voiceprint.gallery import load_gallery
-from app.modules.embeddings.embedding_store import get_embedding_hashes, upsert_embedding
+from app.modules.embeddings.embedding_store import (
+    get_active_embedding_model,
+    get_embedding_hashes,
+    upsert_embedding,
+)
 from app.queue.logs import log_run
 
 
@@ -58,6 +62,7 @@ def handle_job(job: Dict[str, object]) -> None:
     if not data:
         return
 
+    model = get_active_embedding_model()
     existing_hashes = get_embedding_hashes("voice_gallery")
     embedded = 0
     for vp_id, entry in data.items():
@@ -68,7 +73,7 @@ def handle_job(job: Dict[str, object]) -> None:
         text_hash = sha256_text(text)
         if existing_hashes.get(segment_id) == text_hash:
             continue
-        vector = embed(text)
+        vector = embed(text, model=model)
         upsert_embedding(
             {
                 "doc_id": "voice_gallery",
@@ -82,6 +87,7 @@ def handle_job(job: Dict[str, object]) -> None:
                 "end_ms": None,
                 "speaker": None,
                 "source_refs": {"voiceprint_id": vp_id},
+                "embedding_model": model,
             }
         )
         embedded += 1
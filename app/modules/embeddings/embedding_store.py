@@ -2,11 +2,29 @@
 
 from __future__ import annotations
 
+import heapq
 import json
 import math
-from typing import Any, Dict, Iterable, List, Tuple
+import operator
+import threading
+from array import array
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
 
+from app.core.config import load_settings
+from app.modules.embeddings import vector_shards
+from app.modules.memory.policy import token_set
+from app.modules.memory.scope import SCOPE_KEYS, normalize_scope
 from app.queue.db import get_conn
+from app.queue.generation import EMBEDDINGS_GENERATION, bump_generation, current_generation, read_generation
+
+
+# Per-DSN cache of the pgvector column dimension (only found dimensions are cached).
+_PGVECTOR_DIMS: Dict[str, int] = {}
+_INT8_INDEXES: Dict[str, "_Int8Index"] = {}
+_INT8_BUILDING: Set[str] = set()
+_INT8_LOCK = threading.Lock()
+_SCAN_PAGE_SIZE = 500
 
 
 def _json_dumps(value: object) -> str:
@@ -25,6 +43,52 @@ def _json_loads(value: object) -> object:
     return value
 
 
+def get_active_embedding_model() -> str:
+    """Model whose vectors search currently uses; defaults to OLLAMA_MODEL_EMBED until a re-embed switches it."""
+    try:
+        with get_conn() as conn:
+            return _active_model(conn)
+    except Exception:
+        return load_settings().ollama_model_embed
+
+
+def _active_model(conn: Any) -> str:
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            "SELECT value FROM embedding_meta WHERE key=?" if conn.is_sqlite else
+            "SELECT value FROM embedding_meta WHERE key=%s",
+            ("active_model",),
+        )
+        row = cur.fetchone()
+    except Exception:
+        if not conn.is_sqlite:
+            conn.rollback()
+        row = None
+    if row and row[0]:
+        return str(row[0])
+    return load_settings().ollama_model_embed
+
+
+def set_active_embedding_model(conn: Any, model: str) -> None:
+    """Record the active model on an open connection; the caller owns the commit."""
+    cur = conn.cursor()
+    if conn.is_sqlite:
+        cur.execute(
+            "INSERT INTO embedding_meta (key, value, updated_at) VALUES (?, ?, CURRENT_TIMESTAMP) "
+            "ON CONFLICT(key) DO UPDATE SET value=excluded.value, updated_at=CURRENT_TIMESTAMP",
+            ("active_model", model),
+        )
+    else:
+        cur.execute(
+            "INSERT INTO embedding_meta (key, value, updated_at) VALUES (%s, %s, now()) "
+            "ON CONFLICT (key) DO UPDATE SET value=EXCLUDED.value, updated_at=now()",
+            ("active_model", model),
+        )
+    bump_generation(conn)
+    bump_generation(conn, EMBEDDINGS_GENERATION)
+
+
 def get_embedding_hashes(doc_id: str) -> Dict[str, str]:
     hashes: Dict[str, str] = {}
     with get_conn() as conn:
@@ -54,30 +118,137 @@ def upsert_embedding(row: Dict[str, Any]) -> None:
         "end_ms": row.get("end_ms"),
         "speaker": row.get("speaker"),
         "source_refs": _json_dumps(row.get("source_refs") or {}),
+        "embedding_model": str(row.get("embedding_model") or get_active_embedding_model()),
+        "embedding_dim": len(row["embedding"]),
+        "tokens": " ".join(row.get("tokens") or token_set(row["text"])),
     }
     with get_conn() as conn:
         cur = conn.cursor()
         if conn.is_sqlite:
             cur.execute(
-                "INSERT INTO embeddings (doc_id, segment_id, source_id, source_version, text, text_hash, embedding, start_ms, end_ms, speaker, source_refs, updated_at) "
-                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP) "
+                "INSERT INTO embeddings (doc_id, segment_id, source_id, source_version, text, text_hash, embedding, start_ms, end_ms, speaker, source_refs, "
+                "embedding_model, embedding_dim, tokens, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP) "
                 "ON CONFLICT(doc_id, segment_id) DO UPDATE SET "
                 "source_id=excluded.source_id, source_version=excluded.source_version, text=excluded.text, text_hash=excluded.text_hash, "
                 "embedding=excluded.embedding, start_ms=excluded.start_ms, end_ms=excluded.end_ms, speaker=excluded.speaker, "
-                "source_refs=excluded.source_refs, updated_at=CURRENT_TIMESTAMP",
+                "source_refs=excluded.source_refs, embedding_model=excluded.embedding_model, embedding_dim=excluded.embedding_dim, tokens=excluded.tokens, "
+                "embedding_next=NULL, embedding_next_model=NULL, updated_at=CURRENT_TIMESTAMP",
                 tuple(payload.values()),
             )
         else:
-            cur.execute(
-                "INSERT INTO embeddings (doc_id, segment_id, source_id, source_version, text, text_hash, embedding, start_ms, end_ms, speaker, source_refs, updated_at) "
-                "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, now()) "
-                "ON CONFLICT (doc_id, segment_id) DO UPDATE SET "
-                "source_id=EXCLUDED.source_id, source_version=EXCLUDED.source_version, text=EXCLUDED.text, text_hash=EXCLUDED.text_hash, "
-                "embedding=EXCLUDED.embedding, start_ms=EXCLUDED.start_ms, end_ms=EXCLUDED.end_ms, speaker=EXCLUDED.speaker, "
-                "source_refs=EXCLUDED.source_refs, updated_at=now()",
-                tuple(payload.values()),
-            )
+            vec_dim = _pgvector_dim(conn)
+            if vec_dim:
+                vector = row["embedding"]
+                vec_literal = _vector_literal(vector) if len(vector) == vec_dim else None
+                cur.execute(
+                    "INSERT INTO embeddings (doc_id, segment_id, source_id, source_version, text, text_hash, embedding, start_ms, end_ms, speaker, source_refs, "
+                    "embedding_model, embedding_dim, tokens, updated_at, embedding_vec) "
+                    "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, now(), CAST(%s AS vector)) "
+                    "ON CONFLICT (doc_id, segment_id) DO UPDATE SET "
+                    "source_id=EXCLUDED.source_id, source_version=EXCLUDED.source_version, text=EXCLUDED.text, text_hash=EXCLUDED.text_hash, "
+                    "embedding=EXCLUDED.embedding, start_ms=EXCLUDED.start_ms, end_ms=EXCLUDED.end_ms, speaker=EXCLUDED.speaker, "
+                    "source_refs=EXCLUDED.source_refs, embedding_model=EXCLUDED.embedding_model, embedding_dim=EXCLUDED.embedding_dim, tokens=EXCLUDED.tokens, "
+                    "embedding_next=NULL, embedding_next_model=NULL, updated_at=now(), embedding_vec=EXCLUDED.embedding_vec",
+                    tuple(payload.values()) + (vec_literal,),
+                )
+            else:
+                cur.execute(
+                    "INSERT INTO embeddings (doc_id, segment_id, source_id, source_version, text, text_hash, embedding, start_ms, end_ms, speaker, source_refs, "
+                    "embedding_model, embedding_dim, tokens, updated_at) "
+                    "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, now()) "
+                    "ON CONFLICT (doc_id, segment_id) DO UPDATE SET "
+                    "source_id=EXCLUDED.source_id, source_version=EXCLUDED.source_version, text=EXCLUDED.text, text_hash=EXCLUDED.text_hash, "
+                    "embedding=EXCLUDED.embedding, start_ms=EXCLUDED.start_ms, end_ms=EXCLUDED.end_ms, speaker=EXCLUDED.speaker, "
+                    "source_refs=EXCLUDED.source_refs, embedding_model=EXCLUDED.embedding_model, embedding_dim=EXCLUDED.embedding_dim, tokens=EXCLUDED.tokens, "
+                    "embedding_next=NULL, embedding_next_model=NULL, updated_at=now()",
+                    tuple(payload.values()),
+                )
+        bump_generation(conn)
+        bump_generation(conn, EMBEDDINGS_GENERATION)
+        generation = read_generation(conn, EMBEDDINGS_GENERATION)
         conn.commit()
+    _patch_int8_index(payload["embedding_model"], (str(row["doc_id"]), str(row["segment_id"])), row["embedding"], generation)
+    # Unconditional: a writer with shards disabled must still retire shards another process searches.
+    vector_shards.invalidate_shard(str(row["source_id"]), str(row["source_version"]))
+
+
+def _vector_literal(values: Iterable[float]) -> str:
+    return "[" + ",".join(repr(float(x)) for x in values) + "]"
+
+
+def _pgvector_dim(conn: Any) -> Optional[int]:
+    """Return the pgvector column dimension for this database, or None if unavailable."""
+    if conn.is_sqlite:
+        return None
+    settings = load_settings()
+    if not settings.pgvector_enabled:
+        return None
+    key = settings.postgres_dsn
+    if _PGVECTOR_DIMS.get(key):
+        return _PGVECTOR_DIMS[key]
+    dim: Optional[int] = None
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            "SELECT atttypmod FROM pg_attribute "
+            "WHERE attrelid = to_regclass('embeddings') AND attname = 'embedding_vec' AND NOT attisdropped"
+        )
+        row = cur.fetchone()
+        if row and int(row[0] or 0) > 0:
+            dim = int(row[0])
+    except Exception:
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+    if dim:
+        # Misses are not cached: init_db may add embedding_vec after this process first probed.
+        _PGVECTOR_DIMS[key] = dim
+    return dim
+
+
+def _search_pgvector(
+    conn: Any,
+    query_embedding: List[float],
+    limit: int,
+    where: str = "",
+    params: Optional[List[object]] = None,
+) -> List[Dict[str, Any]]:
+    literal = _vector_literal(query_embedding)
+    cur = conn.cursor()
+    if where:
+        # Let the ANN index keep scanning until enough rows pass the filter (pgvector >= 0.8).
+        settings = load_settings()
+        option = "ivfflat.iterative_scan = relaxed_order" if settings.pgvector_index == "ivfflat" else "hnsw.iterative_scan = relaxed_order"
+        try:
+            cur.execute(f"SET LOCAL {option}")
+        except Exception:
+            conn.rollback()
+            cur = conn.cursor()
+    cur.execute(
+        "SELECT doc_id, segment_id, start_ms, end_ms, speaker, text, source_refs, "
+        "1 - (embedding_vec <=> CAST(%s AS vector)) AS score, tokens "
+        f"FROM embeddings WHERE embedding_vec IS NOT NULL{' AND ' + where if where else ''} "
+        "ORDER BY embedding_vec <=> CAST(%s AS vector) LIMIT %s",
+        (literal, *(params or []), literal, int(limit)),
+    )
+    results = []
+    for row in cur.fetchall():
+        results.append(
+            {
+                "doc_id": row[0],
+                "segment_id": row[1],
+                "start_ms": row[2],
+                "end_ms": row[3],
+                "speaker": row[4],
+                "text_snippet": row[5],
+                "score": float(row[7] or 0.0),
+                "source_refs": _json_loads(row[6]) or {},
+                "tokens": str(row[8] or "").split(),
+            }
+        )
+    return results
 
 
 def _cosine(a: Iterable[float], b: Iterable[float]) -> float:
@@ -93,61 +264,737 @@ def _cosine(a: Iterable[float], b: Iterable[float]) -> float:
     return dot / (math.sqrt(na) * math.sqrt(nb))
 
 
-def _load_embeddings() -> List[Dict[str, Any]]:
-    rows: List[Dict[str, Any]] = []
+def _stream_top_k(
+    query_embedding: List[float],
+    limit: int,
+    where: str = "",
+    params: Optional[List[object]] = None,
+    table: str = "embeddings",
+    key_columns: Tuple[str, ...] = ("doc_id", "segment_id"),
+) -> List[Tuple[float, Tuple[str, ...]]]:
+    """Exact top-k by cosine, scanning vectors page by page and keeping only the best k ids."""
+    query = [float(x) for x in query_embedding]
+    qn = math.sqrt(sum(x * x for x in query))
+    if qn == 0.0 or limit <= 0:
+        return []
+    dim = len(query)
+    with get_conn() as conn:
+        # Server-side cursor on Postgres so pages are not all buffered client-side.
+        cur = conn.cursor(name="embedding_scan")
+        cur.execute(
+            f"SELECT {', '.join(key_columns)}, embedding FROM {table}" + (f" WHERE {where}" if where else ""),
+            tuple(params or []),
+        )
+        width = len(key_columns)
+
+        def scored() -> Iterable[Tuple[float, Tuple[str, ...]]]:
+            while True:
+                page = cur.fetchmany(_SCAN_PAGE_SIZE)
+                if not page:
+                    return
+                for row in page:
+                    emb = _json_loads(row[width])
+                    if not isinstance(emb, list) or len(emb) != dim:
+                        continue
+                    norm = math.sqrt(sum(x * x for x in emb))
+                    if norm == 0.0:
+                        continue
+                    yield sum(map(operator.mul, query, emb)) / (qn * norm), tuple(str(value) for value in row[:width])
+
+        return heapq.nlargest(limit, scored())
+
+
+def _as_result(row: Dict[str, Any], score: float) -> Dict[str, Any]:
+    return {
+        "doc_id": row.get("doc_id"),
+        "segment_id": row.get("segment_id"),
+        "start_ms": row.get("start_ms"),
+        "end_ms": row.get("end_ms"),
+        "speaker": row.get("speaker"),
+        "text_snippet": row.get("text"),
+        "score": score,
+        "source_refs": row.get("source_refs") or {},
+        "tokens": row.get("tokens") or [],
+    }
+
+
+def search_embeddings(
+    query_embedding: List[float],
+    limit: int = 10,
+    filters: Optional[Dict[str, Any]] = None,
+) -> List[Dict[str, Any]]:
+    """Return the top `limit` chunks by cosine similarity among rows matching `filters`.
+
+    Supported filters: doc_ids, prefilter_doc_ids (those documents plus any without
+    a summary vector), source_ids, source_type (resolved via manifests), speaker,
+    start_ms_from, start_ms_to and scope ({user_id, project_id, session_id}; rows
+    without a scope are treated as global).
+    """
+    with get_conn() as conn:
+        compiled = chunk_filter_sql(conn, filters)
+        if compiled is None:
+            return []
+        where, params = compiled
+        model = _active_model(conn)
+        # Only compare against vectors from the active model; NULL marks rows written before versioning.
+        model_where = _join_where(where, "(embedding_model IS NULL OR embedding_model = " + ("?" if conn.is_sqlite else "%s") + ")")
+        model_params = params + [model]
+        vec_dim = _pgvector_dim(conn)
+        if vec_dim and len(query_embedding) == vec_dim:
+            # Postgres + pgvector: ANN search runs in the database instead of pulling every row.
+            return _search_pgvector(conn, query_embedding, limit, model_where, model_params)
+    settings = load_settings()
+    if settings.embedding_shards_enabled:
+        return _search_shards(query_embedding, limit, model, where=where, params=params)
+    if settings.embedding_quantization == "int8":
+        quantized = _search_int8(
+            query_embedding,
+            limit,
+            rerank_factor=int(settings.embedding_rerank_factor),
+            model=model,
+            where=where,
+            params=params,
+        )
+        if quantized is not None:
+            return quantized
+        # First search in this process: answer exactly while the index builds in the background.
+    top = _stream_top_k(query_embedding, limit, model_where, model_params)
+    rows = _load_rows_by_keys([key for _score, key in top], with_embedding=False)
+    return [_as_result(rows[key], score) for score, key in top if key in rows]
+
+
+def load_vectors(keys: List[Tuple[str, str]]) -> Dict[Tuple[str, str], List[float]]:
+    """Stored vectors of the active model for (doc_id, segment_id) keys; unknown keys are omitted."""
+    out: Dict[Tuple[str, str], List[float]] = {}
+    if not keys:
+        return out
     with get_conn() as conn:
         cur = conn.cursor()
-        if conn.is_sqlite:
+        ph = "?" if conn.is_sqlite else "%s"
+        model = _active_model(conn)
+        for start in range(0, len(keys), 200):
+            batch = keys[start : start + 200]
+            where = " OR ".join([f"(doc_id={ph} AND segment_id={ph})"] * len(batch))
+            params: List[object] = []
+            for doc_id, segment_id in batch:
+                params.extend([doc_id, segment_id])
             cur.execute(
-                "SELECT doc_id, segment_id, start_ms, end_ms, speaker, text, embedding, source_refs FROM embeddings"
+                "SELECT doc_id, segment_id, embedding FROM embeddings "
+                f"WHERE (embedding_model IS NULL OR embedding_model = {ph}) AND ({where})",
+                (model, *params),
+            )
+            for row in cur.fetchall():
+                emb = _json_loads(row[2])
+                if isinstance(emb, list) and emb:
+                    out[(str(row[0]), str(row[1]))] = [float(x) for x in emb]
+    return out
+
+
+def get_doc_embedding_hash(doc_id: str) -> Optional[str]:
+    with get_conn() as conn:
+        cur = conn.cursor()
+        ph = "?" if conn.is_sqlite else "%s"
+        cur.execute(
+            f"SELECT text_hash FROM doc_embeddings WHERE doc_id={ph} AND (embedding_model IS NULL OR embedding_model={ph})",
+            (doc_id, _active_model(conn)),
+        )
+        row = cur.fetchone()
+    return str(row[0]) if row else None
+
+
+def upsert_doc_embedding(row: Dict[str, Any]) -> None:
+    """Store one document-level (summary) vector; keyed by doc_id."""
+    payload = (
+        row["doc_id"],
+        row["source_id"],
+        row["source_version"],
+        row["summary"],
+        row["text_hash"],
+        _json_dumps(row["embedding"]),
+        str(row.get("embedding_model") or get_active_embedding_model()),
+        len(row["embedding"]),
+    )
+    with get_conn() as conn:
+        cur = conn.cursor()
+        if conn.is_sqlite:
+            sql = (
+                "INSERT INTO doc_embeddings (doc_id, source_id, source_version, summary, text_hash, embedding, embedding_model, embedding_dim, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP) "
+                "ON CONFLICT(doc_id) DO UPDATE SET source_id=excluded.source_id, source_version=excluded.source_version, "
+                "summary=excluded.summary, text_hash=excluded.text_hash, embedding=excluded.embedding, "
+                "embedding_model=excluded.embedding_model, embedding_dim=excluded.embedding_dim, updated_at=CURRENT_TIMESTAMP"
             )
         else:
+            sql = (
+                "INSERT INTO doc_embeddings (doc_id, source_id, source_version, summary, text_hash, embedding, embedding_model, embedding_dim, updated_at) "
+                "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, now()) "
+                "ON CONFLICT (doc_id) DO UPDATE SET source_id=EXCLUDED.source_id, source_version=EXCLUDED.source_version, "
+                "summary=EXCLUDED.summary, text_hash=EXCLUDED.text_hash, embedding=EXCLUDED.embedding, "
+                "embedding_model=EXCLUDED.embedding_model, embedding_dim=EXCLUDED.embedding_dim, updated_at=now()"
+            )
+        cur.execute(sql, payload)
+        bump_generation(conn)
+        conn.commit()
+
+
+def search_doc_embeddings(
+    query_embedding: List[float],
+    limit: int,
+    doc_ids: Optional[List[str]] = None,
+    filters: Optional[Dict[str, Any]] = None,
+) -> List[Tuple[str, float]]:
+    """Top `limit` (doc_id, cosine) pairs over document summary vectors of the active model.
+
+    `filters` takes the chunk filters of `search_embeddings`: doc_ids, source_ids and
+    source_type apply to the document row, while speaker, start_ms_from/to and scope
+    keep only documents with at least one matching chunk.
+    """
+    query = [float(x) for x in query_embedding]
+    if limit <= 0 or not any(query) or (doc_ids is not None and not doc_ids):
+        return []
+    filters = dict(filters or {})
+    if doc_ids is not None:
+        filters["doc_ids"] = doc_ids
+    doc_keys = ("doc_ids", "source_ids", "source_type")
+    with get_conn() as conn:
+        cur = conn.cursor()
+        ph = "?" if conn.is_sqlite else "%s"
+        doc_filter = chunk_filter_sql(conn, {key: filters[key] for key in doc_keys if key in filters})
+        chunk_filter = chunk_filter_sql(conn, {key: value for key, value in filters.items() if key not in doc_keys})
+        if doc_filter is None or chunk_filter is None:
+            return []
+        where = f"(embedding_model IS NULL OR embedding_model = {ph})"
+        params: List[object] = [_active_model(conn)]
+        where = _join_where(doc_filter[0], where)
+        params = doc_filter[1] + params
+        if chunk_filter[0]:
+            # Unqualified columns in the chunk clauses resolve to the embeddings row.
+            where += (
+                " AND EXISTS (SELECT 1 FROM embeddings WHERE embeddings.doc_id = doc_embeddings.doc_id "
+                f"AND {chunk_filter[0]})"
+            )
+            params.extend(chunk_filter[1])
+        cur.execute(f"SELECT doc_id, embedding FROM doc_embeddings WHERE {where}", tuple(params))
+        rows = cur.fetchall()
+    scored = []
+    for doc_id, raw in rows:
+        emb = _json_loads(raw)
+        if isinstance(emb, list) and len(emb) == len(query):
+            scored.append((str(doc_id), _cosine(query, emb)))
+    return heapq.nlargest(limit, scored, key=lambda item: item[1])
+
+
+def upsert_memory_embeddings(rows: List[Dict[str, Any]]) -> int:
+    """Store memory vectors in one transaction; each row carries memory_id, memory_type, scope ids and text_hash."""
+    if not rows:
+        return 0
+    model = get_active_embedding_model()
+    payload = [
+        (
+            row["memory_id"],
+            row["memory_type"],
+            row.get("user_id"),
+            row.get("project_id"),
+            row.get("session_id"),
+            row["text_hash"],
+            _json_dumps(row["embedding"]),
+            str(row.get("embedding_model") or model),
+            len(row["embedding"]),
+        )
+        for row in rows
+    ]
+    with get_conn() as conn:
+        cur = conn.cursor()
+        if conn.is_sqlite:
+            sql = (
+                "INSERT INTO memory_embeddings (memory_id, memory_type, user_id, project_id, session_id, text_hash, embedding, "
+                "embedding_model, embedding_dim, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP) "
+                "ON CONFLICT(memory_id) DO UPDATE SET memory_type=excluded.memory_type, user_id=excluded.user_id, "
+                "project_id=excluded.project_id, session_id=excluded.session_id, text_hash=excluded.text_hash, "
+                "embedding=excluded.embedding, embedding_model=excluded.embedding_model, embedding_dim=excluded.embedding_dim, "
+                "updated_at=CURRENT_TIMESTAMP"
+            )
+        else:
+            vec_dim = _pgvector_dim(conn)
+            sql = (
+                "INSERT INTO memory_embeddings (memory_id, memory_type, user_id, project_id, session_id, text_hash, embedding, "
+                "embedding_model, embedding_dim, updated_at"
+                + (", embedding_vec) " if vec_dim else ") ")
+                + "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, now()"
+                + (", CAST(%s AS vector)) " if vec_dim else ") ")
+                + "ON CONFLICT (memory_id) DO UPDATE SET memory_type=EXCLUDED.memory_type, user_id=EXCLUDED.user_id, "
+                "project_id=EXCLUDED.project_id, session_id=EXCLUDED.session_id, text_hash=EXCLUDED.text_hash, "
+                "embedding=EXCLUDED.embedding, embedding_model=EXCLUDED.embedding_model, embedding_dim=EXCLUDED.embedding_dim, "
+                "updated_at=now()" + (", embedding_vec=EXCLUDED.embedding_vec" if vec_dim else "")
+            )
+            if vec_dim:
+                payload = [
+                    item + (_vector_literal(row["embedding"]) if len(row["embedding"]) == vec_dim else None,)
+                    for item, row in zip(payload, rows)
+                ]
+        cur.executemany(sql, payload)
+        conn.commit()
+    return len(payload)
+
+
+def search_memory_embeddings(
+    query_embedding: List[float],
+    limit: int,
+    memory_type: Optional[str] = None,
+    scope: Optional[Dict[str, str]] = None,
+) -> List[Tuple[str, float]]:
+    """Top `limit` (memory_id, cosine) pairs, filtered by memory_type and exact scope ids in SQL.
+
+    Runs as a pgvector ANN query when the column is available, otherwise as a
+    streamed exact scan over the rows that pass the filters.
+    """
+    with get_conn() as conn:
+        ph = "?" if conn.is_sqlite else "%s"
+        clauses = [f"embedding_model = {ph}"]
+        params: List[object] = [_active_model(conn)]
+        if memory_type:
+            clauses.append(f"memory_type = {ph}")
+            params.append(memory_type)
+        for key in SCOPE_KEYS:
+            if scope and scope.get(key):
+                clauses.append(f"{key} = {ph}")
+                params.append(scope[key])
+        vec_dim = _pgvector_dim(conn)
+        if vec_dim and len(query_embedding) == vec_dim and limit > 0:
+            literal = _vector_literal(query_embedding)
+            cur = conn.cursor()
             cur.execute(
-                "SELECT doc_id, segment_id, start_ms, end_ms, speaker, text, embedding, source_refs FROM embeddings"
+                "SELECT memory_id, 1 - (embedding_vec <=> CAST(%s AS vector)) AS score FROM memory_embeddings "
+                f"WHERE embedding_vec IS NOT NULL AND {' AND '.join(clauses)} "
+                "ORDER BY embedding_vec <=> CAST(%s AS vector) LIMIT %s",
+                (literal, *params, literal, int(limit)),
+            )
+            return [(str(row[0]), float(row[1] or 0.0)) for row in cur.fetchall()]
+    top = _stream_top_k(query_embedding, limit, " AND ".join(clauses), params, table="memory_embeddings", key_columns=("memory_id",))
+    return [(key[0], score) for score, key in top]
+
+
+def adjacent_chunks(
+    hits: List[Tuple[str, str, Optional[int], Optional[int]]],
+    seconds: float = 0.0,
+    chunks: int = 0,
+) -> Dict[Tuple[str, str], List[Dict[str, Any]]]:
+    """Timed chunks around each (doc_id, segment_id, start_ms, end_ms) hit, in one batched query.
+
+    With `seconds`, neighbours are chunks of the same doc starting within the hit's span
+    widened by that many seconds; otherwise `chunks` neighbours on each side by start
+    time. Results are keyed by hit and ordered by start_ms; the hit itself is excluded.
+    """
+    timed = [hit for hit in hits if hit[0] and hit[2] is not None]
+    out: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+    if not timed or (seconds <= 0 and chunks <= 0):
+        return out
+    columns = "doc_id, segment_id, start_ms, end_ms, speaker, text, source_refs"
+    with get_conn() as conn:
+        cur = conn.cursor()
+        ph = "?" if conn.is_sqlite else "%s"
+        params: List[object] = []
+        if seconds > 0:
+            pad = int(seconds * 1000)
+            branches = []
+            for doc_id, segment_id, start_ms, end_ms in timed:
+                # One indexed range scan on (doc_id, start_ms) per hit.
+                branches.append(
+                    f"SELECT {ph} AS hit_doc, {ph} AS hit_segment, {columns} FROM embeddings "
+                    f"WHERE doc_id={ph} AND start_ms >= {ph} AND start_ms < {ph}"
+                )
+                params.extend([doc_id, segment_id, doc_id, int(start_ms) - pad, int(end_ms if end_ms is not None else start_ms) + pad])
+            sql = " UNION ALL ".join(branches)
+        else:
+            doc_ids = sorted({hit[0] for hit in timed})
+            hit_where = " OR ".join([f"(doc_id={ph} AND segment_id={ph})"] * len(timed))
+            sql = (
+                f"WITH ordered AS (SELECT {columns}, "
+                "ROW_NUMBER() OVER (PARTITION BY doc_id ORDER BY start_ms, segment_id) AS pos "
+                f"FROM embeddings WHERE doc_id IN ({', '.join([ph] * len(doc_ids))}) AND start_ms IS NOT NULL), "
+                f"hits AS (SELECT doc_id, segment_id, pos FROM ordered WHERE {hit_where}) "
+                "SELECT h.doc_id AS hit_doc, h.segment_id AS hit_segment, "
+                "o.doc_id, o.segment_id, o.start_ms, o.end_ms, o.speaker, o.text, o.source_refs "
+                f"FROM hits h JOIN ordered o ON o.doc_id = h.doc_id AND o.pos BETWEEN h.pos - {ph} AND h.pos + {ph}"
             )
+            params.extend(doc_ids)
+            for doc_id, segment_id, _start, _end in timed:
+                params.extend([doc_id, segment_id])
+            params.extend([int(chunks), int(chunks)])
+        cur.execute(sql, tuple(params))
         for row in cur.fetchall():
-            rows.append(
+            key = (str(row[0]), str(row[1]))
+            if str(row[3]) == key[1] and str(row[2]) == key[0]:
+                continue
+            out.setdefault(key, []).append(
                 {
+                    "doc_id": row[2],
+                    "segment_id": row[3],
+                    "start_ms": row[4],
+                    "end_ms": row[5],
+                    "speaker": row[6],
+                    "text": row[7],
+                    "source_refs": _json_loads(row[8]) or {},
+                }
+            )
+    for rows in out.values():
+        rows.sort(key=lambda item: (int(item.get("start_ms") or 0), str(item.get("segment_id"))))
+    return out
+
+
+def _join_where(*clauses: str) -> str:
+    return " AND ".join(clause for clause in clauses if clause)
+
+
+def _id_list(value: object) -> Optional[List[str]]:
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = [value]
+    if not isinstance(value, (list, tuple, set, frozenset)):
+        return None
+    out: List[str] = []
+    for item in value:
+        text = str(item or "").strip()
+        if text and text not in out:
+            out.append(text)
+    return out
+
+
+def _source_ids_for_type(conn: Any, source_type: str) -> List[str]:
+    cur = conn.cursor()
+    if conn.is_sqlite:
+        cur.execute(
+            "SELECT DISTINCT source_id FROM manifests WHERE json_extract(manifest_json, '$.source_type') = ?",
+            (source_type,),
+        )
+    else:
+        cur.execute(
+            "SELECT DISTINCT source_id FROM manifests WHERE manifest_json->>'source_type' = %s",
+            (source_type,),
+        )
+    return [str(row[0]) for row in cur.fetchall() if row[0]]
+
+
+def chunk_filter_sql(conn: Any, filters: Optional[Dict[str, Any]]) -> Optional[Tuple[str, List[object]]]:
+    """Compile structured filters into a WHERE fragment; None means no row can match.
+
+    Usable on any table with the chunk columns (doc_id, source_id, speaker, start_ms, source_refs).
+    """
+    if not filters:
+        return "", []
+    ph = "?" if conn.is_sqlite else "%s"
+    clauses: List[str] = []
+    params: List[object] = []
+
+    doc_ids = _id_list(filters.get("doc_ids"))
+    source_ids = _id_list(filters.get("source_ids"))
+    source_type = str(filters.get("source_type") or "").strip()
+    if source_type:
+        typed = _source_ids_for_type(conn, source_type)
+        source_ids = typed if source_ids is None else [sid for sid in source_ids if sid in set(typed)]
+    for column, values in (("doc_id", doc_ids), ("source_id", source_ids)):
+        if values is None:
+            continue
+        if not values:
+            return None
+        clauses.append(f"{column} IN ({', '.join([ph] * len(values))})")
+        params.extend(values)
+    ranked = _id_list(filters.get("prefilter_doc_ids"))
+    if ranked:
+        # Allow-list bounded by the prefilter size; documents without a summary vector
+        # cannot be ranked, so they stay searchable through the subquery instead of a
+        # parameter list that grows with the corpus.
+        clauses.append(
+            f"(doc_id IN ({', '.join([ph] * len(ranked))}) OR doc_id NOT IN "
+            f"(SELECT doc_id FROM doc_embeddings WHERE embedding_model IS NULL OR embedding_model = {ph}))"
+        )
+        params.extend(ranked)
+        params.append(_active_model(conn))
+
+    speaker = str(filters.get("speaker") or "").strip()
+    if speaker:
+        clauses.append(f"LOWER(speaker) = {ph}")
+        params.append(speaker.lower())
+    for key, op in (("start_ms_from", ">="), ("start_ms_to", "<=")):
+        value = filters.get(key)
+        if value is None or value == "":
+            continue
+        clauses.append(f"start_ms {op} {ph}")
+        params.append(int(value))
+
+    raw_scope = filters.get("scope")
+    scope = normalize_scope(**{k: raw_scope.get(k) for k in SCOPE_KEYS}) if isinstance(raw_scope, dict) else {}
+    for key, value in scope.items():
+        if conn.is_sqlite:
+            expr = f"COALESCE(json_extract(source_refs, '$.{key}'), json_extract(source_refs, '$.scope.{key}'))"
+        else:
+            expr = f"COALESCE(source_refs->>'{key}', source_refs->'scope'->>'{key}')"
+        clauses.append(f"({expr} IS NULL OR {expr} = {ph})")
+        params.append(value)
+
+    return " AND ".join(clauses), params
+
+
+@dataclass
+class _Int8Index:
+    """Per-vector scaled int8 codes for every stored embedding, kept contiguous in memory."""
+
+    # Embeddings generation read before the rows were scanned.
+    generation: Optional[int]
+    keys: List[Tuple[str, str]] = field(default_factory=list)
+    positions: Dict[Tuple[str, str], int] = field(default_factory=dict)
+    offsets: array = field(default_factory=lambda: array("q", [0]))
+    codes: array = field(default_factory=lambda: array("b"))
+    norms: array = field(default_factory=lambda: array("f"))
+
+    def add(self, key: Tuple[str, str], vector: List[float]) -> None:
+        codes = quantize_int8(vector)
+        norm = math.sqrt(sum(c * c for c in codes))
+        pos = self.positions.get(key)
+        if pos is not None and self.offsets[pos + 1] - self.offsets[pos] == len(codes):
+            self.codes[self.offsets[pos] : self.offsets[pos + 1]] = codes
+            self.norms[pos] = norm
+            return
+        # Append in this order so a concurrent top_k never sees a key without its codes.
+        self.codes.extend(codes)
+        self.norms.append(norm)
+        self.offsets.append(len(self.codes))
+        self.keys.append(key)
+        self.positions[key] = len(self.keys) - 1
+
+    def top_k(self, query: List[float], k: int, allowed: Optional[Iterable[int]] = None) -> List[Tuple[float, int]]:
+        qn = math.sqrt(sum(x * x for x in query))
+        if qn == 0.0 or k <= 0:
+            return []
+        dim = len(query)
+        offsets = self.offsets
+        codes = self.codes
+        norms = self.norms
+
+        def scored() -> Iterable[Tuple[float, int]]:
+            for idx in range(len(self.keys)) if allowed is None else allowed:
+                start = offsets[idx]
+                end = offsets[idx + 1]
+                norm = norms[idx]
+                if end - start != dim or norm == 0.0:
+                    continue
+                # Cosine is invariant to the per-vector scale, so the raw codes are enough here.
+                dot = sum(map(operator.mul, query, codes[start:end]))
+                yield dot / (qn * norm), idx
+
+        return heapq.nlargest(k, scored())
+
+    def memory_bytes(self) -> int:
+        return (
+            self.codes.buffer_info()[1] * self.codes.itemsize
+            + self.offsets.buffer_info()[1] * self.offsets.itemsize
+            + self.norms.buffer_info()[1] * self.norms.itemsize
+        )
+
+
+def quantize_int8(vector: Iterable[float]) -> array:
+    values = [float(x) for x in vector]
+    peak = max((abs(x) for x in values), default=0.0)
+    if peak == 0.0:
+        return array("b", [0] * len(values))
+    scale = 127.0 / peak
+    return array("b", [max(-127, min(127, int(round(x * scale)))) for x in values])
+
+
+def quantized_index_stats() -> Dict[str, object]:
+    settings = load_settings()
+    key = f"{settings.postgres_dsn}|{get_active_embedding_model()}"
+    with _INT8_LOCK:
+        index = _INT8_INDEXES.get(key)
+    if index is None:
+        return {"enabled": settings.embedding_quantization == "int8", "vectors": 0, "code_bytes": 0}
+    vectors = len(index.keys)
+    dims = len(index.codes)
+    return {
+        "enabled": settings.embedding_quantization == "int8",
+        "vectors": vectors,
+        "code_bytes": index.memory_bytes(),
+        # Bytes a float32 copy of the same vectors would need.
+        "float32_bytes": dims * 4,
+    }
+
+
+def warm_quantized_index(model: Optional[str] = None) -> int:
+    """Build the int8 index for `model` (default: the active model) now; returns its vector count."""
+    use_model = model or get_active_embedding_model()
+    settings = load_settings()
+    return len(_build_int8_index(settings.postgres_dsn, use_model).keys)
+
+
+def _int8_index(model: str) -> Optional[_Int8Index]:
+    """The cached int8 index, or None before the first build finishes.
+
+    The freshness check is a single read of the embeddings generation, which only
+    chunk-vector writes, deletes and model switches move; a missing or stale
+    index is rebuilt on a background thread while searches keep using the cached
+    one (shortlists are re-scored against the stored float vectors).
+    """
+    settings = load_settings()
+    key = f"{settings.postgres_dsn}|{model}"
+    with _INT8_LOCK:
+        current = _INT8_INDEXES.get(key)
+    generation = current_generation(EMBEDDINGS_GENERATION)
+    if current is None or generation is None or current.generation != generation:
+        _schedule_int8_build(settings.postgres_dsn, model)
+    return current
+
+
+def _schedule_int8_build(dsn: str, model: str) -> None:
+    key = f"{dsn}|{model}"
+    with _INT8_LOCK:
+        if key in _INT8_BUILDING:
+            return
+        _INT8_BUILDING.add(key)
+
+    def runner() -> None:
+        try:
+            _build_int8_index(dsn, model)
+        except Exception:
+            pass
+        finally:
+            with _INT8_LOCK:
+                _INT8_BUILDING.discard(key)
+
+    threading.Thread(target=runner, name="embedding-int8-index", daemon=True).start()
+
+
+def _build_int8_index(dsn: str, model: str) -> _Int8Index:
+    with get_conn(dsn) as conn:
+        cur = conn.cursor()
+        ph = "?" if conn.is_sqlite else "%s"
+        index = _Int8Index(generation=read_generation(conn, EMBEDDINGS_GENERATION))
+        # Server-side cursor on Postgres so pages are not all buffered client-side.
+        cur = conn.cursor(name="embedding_int8_build")
+        cur.execute(
+            f"SELECT doc_id, segment_id, embedding FROM embeddings WHERE embedding_model IS NULL OR embedding_model = {ph}",
+            (model,),
+        )
+        while True:
+            batch = cur.fetchmany(_SCAN_PAGE_SIZE)
+            if not batch:
+                break
+            for row in batch:
+                vector = _json_loads(row[2])
+                if isinstance(vector, list) and vector:
+                    index.add((str(row[0]), str(row[1])), vector)
+    with _INT8_LOCK:
+        _INT8_INDEXES[f"{dsn}|{model}"] = index
+    return index
+
+
+def _patch_int8_index(model: str, key: Tuple[str, str], vector: List[float], generation: int) -> None:
+    """Apply this process's own upsert to the cached index.
+
+    When the upsert was the only change since the index was built (its bump moved the
+    embeddings generation by one), the patched index is current and needs no rebuild.
+    """
+    with _INT8_LOCK:
+        index = _INT8_INDEXES.get(f"{load_settings().postgres_dsn}|{model}")
+        if index is not None:
+            index.add(key, [float(x) for x in vector])
+            if index.generation == generation - 1:
+                index.generation = generation
+
+
+def _load_rows_by_keys(
+    keys: List[Tuple[str, str]],
+    with_embedding: bool = True,
+) -> Dict[Tuple[str, str], Dict[str, Any]]:
+    out: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    if not keys:
+        return out
+    with get_conn() as conn:
+        cur = conn.cursor()
+        ph = "?" if conn.is_sqlite else "%s"
+        for start in range(0, len(keys), 200):
+            batch = keys[start : start + 200]
+            where = " OR ".join([f"(doc_id={ph} AND segment_id={ph})"] * len(batch))
+            params: List[object] = []
+            for doc_id, segment_id in batch:
+                params.extend([doc_id, segment_id])
+            cur.execute(
+                "SELECT doc_id, segment_id, start_ms, end_ms, speaker, text, source_refs, tokens"
+                + (", embedding" if with_embedding else "")
+                + f" FROM embeddings WHERE {where}",
+                tuple(params),
+            )
+            for row in cur.fetchall():
+                out[(str(row[0]), str(row[1]))] = {
                     "doc_id": row[0],
                     "segment_id": row[1],
                     "start_ms": row[2],
                     "end_ms": row[3],
                     "speaker": row[4],
                     "text": row[5],
-                    "embedding": _json_loads(row[6]),
-                    "source_refs": _json_loads(row[7]) or {},
+                    "source_refs": _json_loads(row[6]) or {},
+                    "tokens": str(row[7] or "").split(),
+                    "embedding": _json_loads(row[8]) if with_embedding else None,
                 }
-            )
-    return rows
+    return out
 
 
-def search_embeddings(
+def _allowed_positions(index: _Int8Index, where: str, params: List[object]) -> List[int]:
+    allowed: List[int] = []
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute(f"SELECT doc_id, segment_id FROM embeddings WHERE {where}", tuple(params))
+        for row in cur.fetchall():
+            pos = index.positions.get((str(row[0]), str(row[1])))
+            if pos is not None:
+                allowed.append(pos)
+    allowed.sort()
+    return allowed
+
+
+def _search_int8(
     query_embedding: List[float],
-    limit: int = 10,
-) -> List[Dict[str, Any]]:
-    rows = _load_embeddings()
-    if not rows:
+    limit: int,
+    rerank_factor: int,
+    model: str,
+    where: str = "",
+    params: Optional[List[object]] = None,
+) -> Optional[List[Dict[str, Any]]]:
+    index = _int8_index(model)
+    if index is None:
+        return None
+    query = [float(x) for x in query_embedding]
+    # Filters become a position mask over the index, so only matching vectors are scored.
+    allowed = _allowed_positions(index, where, list(params or [])) if where else None
+    candidates = index.top_k(query, max(limit, limit * max(1, rerank_factor)), allowed=allowed)
+    if not candidates:
         return []
+    # Re-score the shortlist against full-precision vectors read back from the store.
+    rows = _load_rows_by_keys([index.keys[idx] for _score, idx in candidates])
     scored: List[Tuple[float, Dict[str, Any]]] = []
-    for row in rows:
+    for row in rows.values():
         emb = row.get("embedding")
         if not isinstance(emb, list):
             continue
-        score = _cosine(query_embedding, emb)
-        scored.append((score, row))
+        scored.append((_cosine(query, emb), row))
     scored.sort(key=lambda item: item[0], reverse=True)
-    results = []
-    for score, row in scored[:limit]:
-        results.append(
-            {
-                "doc_id": row.get("doc_id"),
-                "segment_id": row.get("segment_id"),
-                "start_ms": row.get("start_ms"),
-                "end_ms": row.get("end_ms"),
-                "speaker": row.get("speaker"),
-                "text_snippet": row.get("text"),
-                "score": score,
-                "source_refs": row.get("source_refs") or {},
-            }
-        )
-    return results
+    return [_as_result(row, score) for score, row in scored[:limit]]
+
+
+def _search_shards(
+    query_embedding: List[float],
+    limit: int,
+    model: str,
+    where: str = "",
+    params: Optional[List[object]] = None,
+) -> List[Dict[str, Any]]:
+    allowed = None
+    if where:
+        with get_conn() as conn:
+            cur = conn.cursor()
+            cur.execute(f"SELECT doc_id, segment_id FROM embeddings WHERE {where}", tuple(params or []))
+            allowed = {(str(row[0]), str(row[1])) for row in cur.fetchall()}
+    query = [float(x) for x in query_embedding]
+    top = vector_shards.search_shards(query, limit, model, allowed=allowed)
+    rows = _load_rows_by_keys([key for _score, key in top], with_embedding=False)
+    return [_as_result(rows[key], score) for score, key in top if key in rows]
@@ -0,0 +1,127 @@
+"""Bounded LRU (plus optional on-disk) cache for query embeddings."""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from app.clients.ollama_client import embed
+from app.core.config import load_settings
+from app.core.ids import sha256_text
+from app.core.textnorm import normalize_whitespace
+
+
+CACHE_REL_DIR = "cache/query_embeddings"
+
+_LOCK = threading.Lock()
+_CACHE: "OrderedDict[Tuple[str, str], List[float]]" = OrderedDict()
+_STATS: Dict[str, int] = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+
+def normalize_query(query: object) -> str:
+    # Case is kept: embedding models distinguish names and acronyms by casing.
+    return normalize_whitespace(str(query or ""))
+
+
+def embed_query(query: str, model: Optional[str] = None) -> List[float]:
+    """Embed a retrieval query, reusing earlier vectors for the same (model, query)."""
+    settings = load_settings()
+    use_model = model or settings.ollama_model_embed
+    normalized = normalize_query(query)
+    max_items = max(0, int(settings.query_embedding_cache_size))
+    key = (use_model, normalized)
+
+    if max_items > 0:
+        with _LOCK:
+            cached = _CACHE.get(key)
+            if cached is not None:
+                _CACHE.move_to_end(key)
+                _STATS["hits"] += 1
+                return list(cached)
+
+    if settings.query_embedding_cache_disk:
+        from_disk = _read_disk(key)
+        if from_disk is not None:
+            with _LOCK:
+                _STATS["disk_hits"] += 1
+            _remember(key, from_disk, max_items)
+            return list(from_disk)
+
+    with _LOCK:
+        _STATS["misses"] += 1
+    # Embed exactly the keyed text so a cached vector always matches what a miss would compute.
+    vector = embed(normalized, model=use_model)
+    _remember(key, vector, max_items)
+    if settings.query_embedding_cache_disk:
+        _write_disk(key, vector)
+    return list(vector)
+
+
+def query_cache_stats() -> Dict[str, object]:
+    settings = load_settings()
+    with _LOCK:
+        stats: Dict[str, object] = dict(_STATS)
+        stats["size"] = len(_CACHE)
+    stats["max_size"] = max(0, int(settings.query_embedding_cache_size))
+    stats["disk_enabled"] = bool(settings.query_embedding_cache_disk)
+    lookups = int(stats["hits"]) + int(stats["disk_hits"]) + int(stats["misses"])
+    stats["hit_rate"] = round((int(stats["hits"]) + int(stats["disk_hits"])) / lookups, 6) if lookups else 0.0
+    return stats
+
+
+def clear_query_cache() -> None:
+    with _LOCK:
+        _CACHE.clear()
+        for name in _STATS:
+            _STATS[name] = 0
+
+
+def _remember(key: Tuple[str, str], vector: List[float], max_items: int) -> None:
+    if max_items <= 0:
+        return
+    with _LOCK:
+        _CACHE[key] = list(vector)
+        _CACHE.move_to_end(key)
+        while len(_CACHE) > max_items:
+            _CACHE.popitem(last=False)
+            _STATS["evictions"] += 1
+
+
+def _disk_path(key: Tuple[str, str]) -> Path:
+    settings = load_settings()
+    digest = sha256_text(f"{key[0]}\n{key[1]}")
+    return settings.artifact_root / CACHE_REL_DIR / digest[:2] / f"{digest}.json"
+
+
+def _read_disk(key: Tuple[str, str]) -> Optional[List[float]]:
+    path = _disk_path(key)
+    if not path.exists():
+        return None
+    try:
+        payload = json.loads(path.read_text(encoding="utf-8"))
+    except Exception:
+        return None
+    if not isinstance(payload, dict) or payload.get("model") != key[0] or payload.get("query") != key[1]:
+        return None
+    vector = payload.get("embedding")
+    if not isinstance(vector, list) or not vector:
+        return None
+    return [float(x) for x in vector]
+
+
+def _write_disk(key: Tuple[str, str], vector: List[float]) -> None:
+    path = _disk_path(key)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(
+            json.dumps({"model": key[0], "query": key[1], "embedding": vector}, ensure_ascii=True),
+            encoding="utf-8",
+        )
+        tmp.replace(path)
+    except Exception:
+        pass
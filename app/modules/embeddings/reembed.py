@@ -0,0 +1,213 @@
+"""Background re-embedding into shadow columns, followed by an atomic model switch."""
+
+from __future__ import annotations
+
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from app.clients.ollama_client import embed
+from app.core.config import load_settings
+from app.modules.embeddings.embed_doc_summary import schedule_doc_summary_backfill
+from app.modules.embeddings.embedding_store import (
+    _pgvector_dim,
+    get_active_embedding_model,
+    set_active_embedding_model,
+)
+from app.modules.memory.memory_embed import schedule_memory_embedding
+from app.queue.db import get_conn
+from app.queue.jobs import enqueue_job
+from app.queue.logs import log_run
+
+
+JOB_TYPE = "reembed"
+JOB_LANE = "oss20b"
+JOB_SOURCE_ID = "embeddings:reembed"
+
+
+def start_reembed(model: Optional[str] = None) -> str:
+    """Queue a migration of every embedding to `model` (defaults to OLLAMA_MODEL_EMBED).
+
+    Returns the existing job id when a migration to the same model is already
+    queued or running; a migration to another model must finish first.
+    """
+    settings = load_settings()
+    target = str(model or settings.ollama_model_embed).strip()
+    if not target:
+        raise ValueError("reembed needs a target model")
+    active = _active_reembed_job()
+    if active is not None:
+        job_id, running_target = active
+        if running_target != target:
+            raise ValueError(f"reembed to {running_target} is still in progress")
+        return job_id
+    return enqueue_job(JOB_TYPE, JOB_LANE, JOB_SOURCE_ID, target)
+
+
+def _active_reembed_job(queued_only: bool = False) -> Optional[tuple[str, str]]:
+    statuses = "('queued')" if queued_only else "('queued', 'running')"
+    with get_conn() as conn:
+        cur = conn.cursor()
+        ph = "?" if conn.is_sqlite else "%s"
+        cur.execute(
+            f"SELECT job_id, source_version FROM jobs WHERE job_type={ph} AND status IN {statuses} "
+            "ORDER BY created_at LIMIT 1",
+            (JOB_TYPE,),
+        )
+        row = cur.fetchone()
+    return (str(row[0]), str(row[1])) if row else None
+
+
+def reembed_status(model: Optional[str] = None) -> Dict[str, object]:
+    settings = load_settings()
+    target = str(model or settings.ollama_model_embed)
+    with get_conn() as conn:
+        cur = conn.cursor()
+        ph = "?" if conn.is_sqlite else "%s"
+        cur.execute(
+            "SELECT COUNT(*), "
+            f"SUM(CASE WHEN embedding_model = {ph} THEN 1 ELSE 0 END), "
+            f"SUM(CASE WHEN embedding_next_model = {ph} THEN 1 ELSE 0 END) "
+            "FROM embeddings",
+            (target, target),
+        )
+        row = cur.fetchone() or (0, 0, 0)
+    total = int(row[0] or 0)
+    current = int(row[1] or 0)
+    staged = int(row[2] or 0)
+    return {
+        "active_model": get_active_embedding_model(),
+        "target_model": target,
+        "total": total,
+        "on_target": current,
+        "staged": staged,
+        "pending": max(0, total - current - staged),
+    }
+
+
+def handle_job(job: Dict[str, object]) -> None:
+    settings = load_settings()
+    target = str(job.get("source_version") or settings.ollama_model_embed)
+    lane = str(job.get("lane") or JOB_LANE)
+    batch_size = max(1, int(settings.reembed_batch_size))
+
+    run_id = log_run(
+        lane=lane,
+        component="reembed",
+        input_json={"target_model": target, "batch_size": batch_size},
+    )
+
+    rows = _pending_rows(target, batch_size)
+    staged = 0
+    for row in rows:
+        vector = embed(str(row["text"]), model=target)
+        staged += _stage_vector(row, vector, target)
+
+    if len(rows) >= batch_size:
+        # More work left: yield the worker and come back after the throttle interval.
+        next_run_at = datetime.now(timezone.utc) + timedelta(seconds=max(0.0, float(settings.reembed_interval_seconds)))
+        requeued = _continue_chain(lane, target, next_run_at)
+        log_run(
+            lane=lane,
+            component="reembed",
+            input_json={"run_id": run_id},
+            output_json={"staged": staged, "switched": False, "requeued": requeued},
+        )
+        return
+
+    switched = _switch_model(target)
+    output: Dict[str, object] = {"staged": staged, "switched": switched, "requeued": False}
+    if switched:
+        # Memory and summary vectors still carry the old model; search filters them out until re-embedded.
+        output["memory_embed_scheduled"] = schedule_memory_embedding()
+        output["doc_summaries_scheduled"] = schedule_doc_summary_backfill()
+    else:
+        # Rows were written with the old model while this batch ran; pick them up next round.
+        output["requeued"] = _continue_chain(lane, target)
+    log_run(
+        lane=lane,
+        component="reembed",
+        input_json={"run_id": run_id},
+        output_json=output,
+    )
+
+
+def _continue_chain(lane: str, target: str, next_run_at: Optional[datetime] = None) -> bool:
+    """Queue the next link unless another reembed job is already queued (one chain at a time)."""
+    if _active_reembed_job(queued_only=True) is not None:
+        return False
+    enqueue_job(JOB_TYPE, lane, JOB_SOURCE_ID, target, next_run_at=next_run_at)
+    return True
+
+
+def _pending_rows(target: str, limit: int) -> List[Dict[str, Any]]:
+    with get_conn() as conn:
+        cur = conn.cursor()
+        ph = "?" if conn.is_sqlite else "%s"
+        cur.execute(
+            "SELECT doc_id, segment_id, text, text_hash FROM embeddings "
+            f"WHERE (embedding_model IS NULL OR embedding_model <> {ph}) "
+            f"AND (embedding_next_model IS NULL OR embedding_next_model <> {ph}) "
+            f"ORDER BY doc_id, segment_id LIMIT {ph}",
+            (target, target, int(limit)),
+        )
+        return [
+            {"doc_id": row[0], "segment_id": row[1], "text": row[2], "text_hash": row[3]}
+            for row in cur.fetchall()
+        ]
+
+
+def _stage_vector(row: Dict[str, Any], vector: List[float], target: str) -> int:
+    with get_conn() as conn:
+        cur = conn.cursor()
+        ph = "?" if conn.is_sqlite else "%s"
+        # text_hash guard: if the chunk changed meanwhile, upsert_embedding has cleared the shadow and it stays pending.
+        cur.execute(
+            f"UPDATE embeddings SET embedding_next={ph}, embedding_next_model={ph} "
+            f"WHERE doc_id={ph} AND segment_id={ph} AND text_hash={ph}",
+            (json.dumps(vector, ensure_ascii=True), target, row["doc_id"], row["segment_id"], row["text_hash"]),
+        )
+        conn.commit()
+        return int(cur.rowcount or 0)
+
+
+def _switch_model(target: str) -> bool:
+    """Promote staged vectors and the active model in one transaction; False if rows are still pending."""
+    with get_conn() as conn:
+        cur = conn.cursor()
+        if conn.is_sqlite:
+            cur.execute(
+                "UPDATE embeddings SET embedding=embedding_next, embedding_model=embedding_next_model, "
+                "embedding_dim=json_array_length(embedding_next), embedding_next=NULL, embedding_next_model=NULL, "
+                "updated_at=CURRENT_TIMESTAMP WHERE embedding_next_model=?",
+                (target,),
+            )
+            cur.execute(
+                "SELECT COUNT(*) FROM embeddings WHERE embedding_model IS NULL OR embedding_model <> ?",
+                (target,),
+            )
+        else:
+            vec_dim = _pgvector_dim(conn)
+            vec_set = (
+                ", embedding_vec=CASE WHEN jsonb_array_length(embedding_next) = %s "
+                "THEN CAST(CAST(embedding_next AS TEXT) AS vector) ELSE NULL END"
+                if vec_dim
+                else ""
+            )
+            cur.execute(
+                "UPDATE embeddings SET embedding=embedding_next, embedding_model=embedding_next_model, "
+                "embedding_dim=jsonb_array_length(embedding_next), embedding_next=NULL, embedding_next_model=NULL, "
+                f"updated_at=now(){vec_set} WHERE embedding_next_model=%s",
+                ((vec_dim, target) if vec_dim else (target,)),
+            )
+            cur.execute(
+                "SELECT COUNT(*) FROM embeddings WHERE embedding_model IS NULL OR embedding_model <> %s",
+                (target,),
+            )
+        remaining = int((cur.fetchone() or (0,))[0] or 0)
+        if remaining:
+            conn.rollback()
+            return False
+        set_active_embedding_model(conn, target)
+        conn.commit()
+    return True
@@ -0,0 +1,322 @@
+"""Per-source float32 vector shards, memory-mapped for search.
+
+Each (source_id, source_version) gets `embeddings/vectors.f32` (native-endian
+float32, row-major) plus `embeddings/vectors.json` (ids, dim, norms and the DB
+signature the shard was built from) under its artifact directory. Shards are
+opened with mmap so concurrent processes share pages through the OS cache.
+
+`upsert_embedding` deletes a source's sidecar, so a present sidecar means a current
+shard. Search never builds shards itself: a missing one is rebuilt on a background
+thread while that source is scored straight from the embeddings table.
+"""
+
+from __future__ import annotations
+
+import heapq
+import json
+import math
+import mmap
+import operator
+import os
+import threading
+from array import array
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.core.config import load_settings
+from app.core.storage import artifact_dir
+from app.queue.db import get_conn
+from app.queue.generation import EMBEDDINGS_GENERATION, current_generation
+
+
+SHARD_REL_DIR = "embeddings"
+VECTORS_NAME = "vectors.f32"
+SIDECAR_NAME = "vectors.json"
+
+_LOCK = threading.Lock()
+_OPEN: Dict[str, "_Shard"] = {}
+# dsn -> (embeddings generation, source versions present in embeddings)
+_SOURCES: Dict[str, Tuple[int, List[Tuple[str, str]]]] = {}
+_BUILDING: Set[str] = set()
+
+
+@dataclass
+class _Shard:
+    path: str
+    stamp: Tuple[int, int]
+    signature: List[object]
+    model: Optional[str]
+    dim: int
+    ids: List[Tuple[str, str]]
+    norms: List[float]
+    handle: Any
+    mapped: Optional[mmap.mmap]
+    view: Optional[memoryview]
+
+    def close(self) -> None:
+        try:
+            if self.view is not None:
+                self.view.release()
+            if self.mapped is not None:
+                self.mapped.close()
+        except BufferError:
+            # A concurrent search still holds a slice; the mapping is freed when it finishes.
+            pass
+        self.handle.close()
+
+
+def shard_dir(source_id: str, source_version: str) -> Path:
+    return artifact_dir(source_id, source_version) / SHARD_REL_DIR
+
+
+def source_signature(conn: Any, source_id: str, source_version: str) -> List[object]:
+    """(row count, last update) of one source version in the embeddings table."""
+    cur = conn.cursor()
+    ph = "?" if conn.is_sqlite else "%s"
+    cur.execute(
+        f"SELECT COUNT(*), MAX(updated_at) FROM embeddings WHERE source_id={ph} AND source_version={ph}",
+        (source_id, source_version),
+    )
+    row = cur.fetchone() or (0, None)
+    return [int(row[0] or 0), str(row[1]) if row[1] is not None else None]
+
+
+def invalidate_shard(source_id: str, source_version: str) -> None:
+    path = shard_dir(source_id, source_version) / SIDECAR_NAME
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
+    except OSError:
+        pass
+
+
+def build_shard(source_id: str, source_version: str, model: str) -> Optional[Path]:
+    """Write the shard for one source version and embedding model; returns its directory."""
+    with get_conn() as conn:
+        signature = source_signature(conn, str(source_id), str(source_version))
+        cur = conn.cursor()
+        ph = "?" if conn.is_sqlite else "%s"
+        cur.execute(
+            f"SELECT doc_id, segment_id, embedding FROM embeddings WHERE source_id={ph} AND source_version={ph} "
+            f"AND (embedding_model IS NULL OR embedding_model = {ph}) ORDER BY doc_id, segment_id",
+            (source_id, source_version, model),
+        )
+        rows = cur.fetchall()
+    target = shard_dir(source_id, source_version)
+    if not rows:
+        invalidate_shard(source_id, source_version)
+        return None
+
+    values = array("f")
+    ids: List[List[str]] = []
+    norms: List[float] = []
+    dim = 0
+    for row in rows:
+        vector = row[2]
+        if isinstance(vector, (bytes, bytearray)):
+            vector = vector.decode("utf-8")
+        if isinstance(vector, str):
+            vector = json.loads(vector)
+        if not isinstance(vector, list) or not vector:
+            continue
+        if not dim:
+            dim = len(vector)
+        if len(vector) != dim:
+            continue
+        values.extend(float(x) for x in vector)
+        ids.append([str(row[0]), str(row[1])])
+        norms.append(math.sqrt(sum(float(x) * float(x) for x in vector)))
+
+    target.mkdir(parents=True, exist_ok=True)
+    suffix = f".{os.getpid()}.tmp"
+    vectors_path = target / VECTORS_NAME
+    sidecar_path = target / SIDECAR_NAME
+    tmp_vectors = vectors_path.with_name(VECTORS_NAME + suffix)
+    tmp_sidecar = sidecar_path.with_name(SIDECAR_NAME + suffix)
+    with tmp_vectors.open("wb") as handle:
+        values.tofile(handle)
+    tmp_sidecar.write_text(
+        json.dumps(
+            {"dim": dim, "count": len(ids), "model": model, "signature": signature, "ids": ids, "norms": norms}
+        ),
+        encoding="utf-8",
+    )
+    # Sidecar last: a shard is only valid once its sidecar points at complete vectors.
+    tmp_vectors.replace(vectors_path)
+    tmp_sidecar.replace(sidecar_path)
+    with get_conn() as conn:
+        current = source_signature(conn, str(source_id), str(source_version))
+    if current != signature:
+        # An upsert landed while the rows were read; its invalidation may predate this sidecar.
+        invalidate_shard(source_id, source_version)
+        return None
+    return target
+
+
+def schedule_shard_build(source_id: str, source_version: str, model: str) -> None:
+    """Build one shard on a background thread (at most one build per shard at a time)."""
+    key = f"{shard_dir(source_id, source_version)}|{model}"
+    with _LOCK:
+        if key in _BUILDING:
+            return
+        _BUILDING.add(key)
+
+    def runner() -> None:
+        try:
+            build_shard(source_id, source_version, model)
+        except Exception:
+            pass
+        finally:
+            with _LOCK:
+                _BUILDING.discard(key)
+
+    threading.Thread(target=runner, name="embedding-shard-build", daemon=True).start()
+
+
+def shard_builds_pending() -> int:
+    with _LOCK:
+        return len(_BUILDING)
+
+
+def _open_shard(source_id: str, source_version: str) -> Optional[_Shard]:
+    target = shard_dir(source_id, source_version)
+    sidecar_path = target / SIDECAR_NAME
+    vectors_path = target / VECTORS_NAME
+    try:
+        stat = sidecar_path.stat()
+    except FileNotFoundError:
+        return None
+    key = str(target)
+    stamp = (int(stat.st_mtime_ns), int(stat.st_size))
+    with _LOCK:
+        current = _OPEN.get(key)
+        if current is not None and current.stamp == stamp:
+            return current
+    try:
+        meta = json.loads(sidecar_path.read_text(encoding="utf-8"))
+        handle = vectors_path.open("rb")
+    except Exception:
+        return None
+    size = os.fstat(handle.fileno()).st_size
+    dim = int(meta.get("dim") or 0)
+    ids = [(str(a), str(b)) for a, b in meta.get("ids") or []]
+    if size != len(ids) * dim * 4:
+        handle.close()
+        return None
+    mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+    shard = _Shard(
+        path=key,
+        stamp=stamp,
+        signature=list(meta.get("signature") or []),
+        model=meta.get("model"),
+        dim=dim,
+        ids=ids,
+        norms=[float(x) for x in meta.get("norms") or []],
+        handle=handle,
+        mapped=mapped,
+        view=memoryview(mapped).cast("f") if mapped is not None else None,
+    )
+    with _LOCK:
+        previous = _OPEN.pop(key, None)
+        _OPEN[key] = shard
+    if previous is not None:
+        previous.close()
+    return shard
+
+
+def close_shards() -> None:
+    with _LOCK:
+        shards = list(_OPEN.values())
+        _OPEN.clear()
+    for shard in shards:
+        shard.close()
+
+
+def search_shards(
+    query: List[float],
+    k: int,
+    model: str,
+    allowed: Optional[Set[Tuple[str, str]]] = None,
+) -> List[Tuple[float, Tuple[str, str]]]:
+    """Exact cosine top-k over every source; sources without a current shard are scanned from the table."""
+    qn = math.sqrt(sum(x * x for x in query))
+    if qn == 0.0 or k <= 0:
+        return []
+    dim = len(query)
+
+    def scored() -> Iterable[Tuple[float, Tuple[str, str]]]:
+        for source_id, source_version in _current_sources():
+            shard = _open_shard(source_id, source_version)
+            if shard is None or shard.model != model:
+                schedule_shard_build(source_id, source_version, model)
+                yield from _scan_source(source_id, source_version, model, query, qn, allowed)
+                continue
+            if shard.view is None or shard.dim != dim:
+                continue
+            view = shard.view
+            for idx, key in enumerate(shard.ids):
+                if allowed is not None and key not in allowed:
+                    continue
+                norm = shard.norms[idx]
+                if norm == 0.0:
+                    continue
+                start = idx * dim
+                dot = sum(map(operator.mul, query, view[start : start + dim]))
+                yield dot / (qn * norm), key
+
+    return heapq.nlargest(k, scored())
+
+
+def _current_sources() -> List[Tuple[str, str]]:
+    """Source versions with embeddings, re-listed only when the embeddings generation moves."""
+    dsn = load_settings().postgres_dsn
+    generation = current_generation(EMBEDDINGS_GENERATION)
+    with _LOCK:
+        cached = _SOURCES.get(dsn)
+    if cached is not None and generation is not None and cached[0] == generation:
+        return cached[1]
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT DISTINCT source_id, source_version FROM embeddings")
+        sources = [(str(row[0]), str(row[1])) for row in cur.fetchall()]
+    if generation is not None:
+        with _LOCK:
+            _SOURCES[dsn] = (generation, sources)
+    return sources
+
+
+def _scan_source(
+    source_id: str,
+    source_version: str,
+    model: str,
+    query: List[float],
+    qn: float,
+    allowed: Optional[Set[Tuple[str, str]]],
+) -> Iterable[Tuple[float, Tuple[str, str]]]:
+    dim = len(query)
+    with get_conn() as conn:
+        cur = conn.cursor()
+        ph = "?" if conn.is_sqlite else "%s"
+        cur.execute(
+            f"SELECT doc_id, segment_id, embedding FROM embeddings WHERE source_id={ph} AND source_version={ph} "
+            f"AND (embedding_model IS NULL OR embedding_model = {ph})",
+            (source_id, source_version, model),
+        )
+        rows = cur.fetchall()
+    for row in rows:
+        key = (str(row[0]), str(row[1]))
+        if allowed is not None and key not in allowed:
+            continue
+        vector = row[2]
+        if isinstance(vector, (bytes, bytearray)):
+            vector = vector.decode("utf-8")
+        if isinstance(vector, str):
+            vector = json.loads(vector)
+        if not isinstance(vector, list) or len(vector) != dim:
+            continue
+        norm = math.sqrt(sum(float(x) * float(x) for x in vector))
+        if norm == 0.0:
+            continue
+        yield sum(map(operator.mul, query, (float(x) for x in vector))) / (qn * norm), key
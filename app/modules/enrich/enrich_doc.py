@@ -12,6 +12,7 @@ from app.core.models import EnrichDocOutput
 from app.core.prompts import render_prompt
 from app.core.storage import artifact_path, read_artifact, write_artifact
 from app.core.timeutil import utc_now
+from app.queue.jobs import enqueue_job
 from app.queue.logs import log_run
 
 
@@ -78,3 +79,5 @@ def handle_job(job: Dict[str, object]) -> None:
             error=str(exc),
         )
         raise
+
+    enqueue_job("embed_doc_summary", "oss20b", source_id, source_version)
@@ -6,7 +6,9 @@ import shutil
 
 from app.core.ids import safe_source_id
 from app.core.storage import artifact_root
+from app.modules.retrieve.chunk_index import delete_chunk_index
 from app.queue.db import get_conn
+from app.queue.generation import EMBEDDINGS_GENERATION, bump_generation
 
 
 def delete_source(source_id: str) -> dict[str, int | bool]:
@@ -19,6 +21,7 @@ def delete_source(source_id: str) -> dict[str, int | bool]:
         cur.execute(f"SELECT COUNT(*) FROM embeddings WHERE source_id = {ph}", (source_id,))
         embeddings_deleted: int = cur.fetchone()[0]
         cur.execute(f"DELETE FROM embeddings WHERE source_id = {ph}", (source_id,))
+        cur.execute(f"DELETE FROM doc_embeddings WHERE source_id = {ph}", (source_id,))
 
         # Count and delete jobs
         cur.execute(f"SELECT COUNT(*) FROM jobs WHERE source_id = {ph}", (source_id,))
@@ -30,8 +33,12 @@ def delete_source(source_id: str) -> dict[str, int | bool]:
         manifests_deleted: int = cur.fetchone()[0]
         cur.execute(f"DELETE FROM manifests WHERE source_id = {ph}", (source_id,))
 
+        bump_generation(conn)
+        bump_generation(conn, EMBEDDINGS_GENERATION)
         conn.commit()
 
+    delete_chunk_index(source_id)
+
     # Remove artifact directory
     art_path = artifact_root() / safe_source_id(source_id)
     artifacts_removed = art_path.exists()
@@ -16,6 +16,9 @@ from app.core.logging import configure_logging
 from app.core.textnorm import normalize_identifier, normalize_user_text
 from app.modules.graph.graph_retrieve import retrieve as graph_retrieve
 from app.modules.retrieve.retrieve_snowflake import retrieve
+from app.modules.retrieve.fanout import require_source, retrieve_timeout, run_sources
+from app.modules.retrieve.result_cache import result_cache_stats
+from app.modules.embeddings.query_cache import query_cache_stats
 from app.modules.swarm.analyze import analyze
 from app.modules.swarm.route import route_question
 from app.modules.swarm.synthesize import synthesize
@@ -538,6 +541,7 @@ def _tool_dashboard_stats(args: Dict[str, Any]) -> Dict[str, Any]:
             "memory_percent": _pct(memory_total, target_memory),
         },
         "queue": jobs,
+        "caches": {"query_embeddings": query_cache_stats(), "retrieve_results": result_cache_stats()},
         "updated_at": datetime.now(timezone.utc).isoformat(),
     }
 
@@ -1018,13 +1022,17 @@ def _tool_ask(args: Dict[str, Any]) -> Dict[str, Any]:
     plan = route_question(question)
     plan_filters = dict(plan.filters or {})
     plan_filters.update(scope)
-    evidence = retrieve(question, limit=plan.retrieve_top_k, filters=plan_filters)
-    graph_evidence = []
-    try:
-        graph_evidence = graph_retrieve(question, limit=plan.retrieve_top_k, hops=1)
-    except Exception:
-        graph_evidence = []
-    combined = evidence + (graph_evidence or [])
+    outputs, report = run_sources(
+        {
+            "retrieve": lambda: retrieve(question, limit=plan.retrieve_top_k, filters=plan_filters),
+            "graph": lambda: graph_retrieve(question, limit=plan.retrieve_top_k, hops=1),
+        },
+        timeouts={"retrieve": retrieve_timeout()},
+    )
+    # Graph evidence is optional; answering without retrieval would synthesize from nothing.
+    require_source(report, "retrieve")
+    evidence = outputs.get("retrieve") or []
+    combined = evidence + (outputs.get("graph") or [])
     try:
         inject_session_resume_evidence(combined, session_id=str(session_id) if session_id else None)
     except Exception:
@@ -0,0 +1,93 @@
+"""Write-behind buffer for memory access counts.
+
+Recall records which memories it returned here instead of updating memory_items
+on every read; the buffer is written in one batched transaction by
+`flush_access()`, which runs from the context-handoff background thread, when the
+buffer grows past its size/age limits, and at interpreter exit.
+"""
+
+from __future__ import annotations
+
+import atexit
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+from app.core.config import load_settings
+from app.modules.memory.policy import now_iso
+from app.queue.db import get_conn
+
+
+# dsn -> memory_id -> (pending hits, last access iso timestamp)
+_PENDING: Dict[str, Dict[str, Tuple[int, str]]] = {}
+_LOCK = threading.Lock()
+_STATE = {"oldest": 0.0, "atexit": False}
+
+
+def record_access(memory_ids: Iterable[str]) -> None:
+    ids = [str(memory_id) for memory_id in memory_ids if str(memory_id or "").strip()]
+    if not ids:
+        return
+    settings = load_settings()
+    stamp = now_iso()
+    with _LOCK:
+        bucket = _PENDING.setdefault(settings.postgres_dsn, {})
+        for memory_id in ids:
+            hits, _last = bucket.get(memory_id, (0, stamp))
+            bucket[memory_id] = (hits + 1, stamp)
+        if not _STATE["oldest"]:
+            _STATE["oldest"] = time.monotonic()
+        if not _STATE["atexit"]:
+            atexit.register(flush_access)
+            _STATE["atexit"] = True
+        pending = sum(len(items) for items in _PENDING.values())
+        age = time.monotonic() - float(_STATE["oldest"])
+    interval = float(settings.memory_access_flush_seconds)
+    if interval <= 0 or age >= interval or pending >= int(settings.memory_access_flush_max_pending):
+        flush_access()
+
+
+def pending_access(memory_id: str, dsn: Optional[str] = None) -> Tuple[int, Optional[str]]:
+    """Buffered (hits, last_accessed_at) not yet written for `memory_id`."""
+    key = dsn or load_settings().postgres_dsn
+    with _LOCK:
+        hits, last = _PENDING.get(key, {}).get(str(memory_id), (0, None))
+    return hits, last
+
+
+def flush_access() -> int:
+    """Write every buffered access in one transaction per database; returns the number of rows updated."""
+    with _LOCK:
+        snapshot = {dsn: items for dsn, items in _PENDING.items() if items}
+        _PENDING.clear()
+        _STATE["oldest"] = 0.0
+    written = 0
+    for dsn, items in snapshot.items():
+        try:
+            written += _write(dsn, items)
+        except Exception:
+            _requeue(dsn, items)
+    return written
+
+
+def _write(dsn: str, items: Dict[str, Tuple[int, str]]) -> int:
+    with get_conn(dsn) as conn:
+        cur = conn.cursor()
+        ph = "?" if conn.is_sqlite else "%s"
+        cur.executemany(
+            f"UPDATE memory_items SET access_count=COALESCE(access_count, 0)+{ph}, last_accessed_at={ph} WHERE memory_id={ph}",
+            [(hits, last, memory_id) for memory_id, (hits, last) in items.items()],
+        )
+        conn.commit()
+    return len(items)
+
+
+def _requeue(dsn: str, items: Dict[str, Tuple[int, str]]) -> None:
+    # Keep failed updates (e.g. the writer lock timed out) for the next flush.
+    with _LOCK:
+        bucket = _PENDING.setdefault(dsn, {})
+        for memory_id, (hits, last) in items.items():
+            newer_hits, newer_last = bucket.get(memory_id, (0, last))
+            bucket[memory_id] = (hits + newer_hits, max(last, newer_last))
+        if not _STATE["oldest"]:
+            _STATE["oldest"] = time.monotonic()
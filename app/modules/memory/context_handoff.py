@@ -5,11 +5,13 @@ from __future__ import annotations
 import json
 import re
 import threading
+import time
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Optional
 
 from app.core.config import load_settings
+from app.modules.memory.access_log import flush_access
 from app.modules.memory.policy import now_utc
 from app.modules.memory.memory_write import write_memory
 from app.queue.db import get_conn
@@ -159,6 +161,7 @@ def stop_background_checkpoint(handle: Optional[Dict[str, object]]) -> None:
         stop_event.set()
     if isinstance(thread, threading.Thread):
         thread.join(timeout=1.0)
+    flush_access()
 
 
 def reset_session_resume_tracking() -> None:
@@ -460,7 +463,15 @@ def _background_checkpoint_loop(stop_event: threading.Event, interval_seconds: i
         refresh_handoff()
     except Exception:
         pass
-    while not stop_event.wait(interval_seconds):
+    flush_every = float(load_settings().memory_access_flush_seconds)
+    wait_seconds = min(interval_seconds, flush_every) if flush_every > 0 else interval_seconds
+    next_refresh = time.monotonic() + interval_seconds
+    while not stop_event.wait(wait_seconds):
+        # Recall access counts are written from here so read paths never take the writer lock.
+        flush_access()
+        if time.monotonic() < next_refresh:
+            continue
+        next_refresh = time.monotonic() + interval_seconds
         try:
             refresh_handoff()
         except Exception:
@@ -2,17 +2,21 @@
 
 from __future__ import annotations
 
-import json
 from datetime import timedelta
-from typing import Dict, List, Optional, Tuple
+from functools import partial
+from typing import Callable, Dict, List, Optional
 
 from app.core.config import load_settings
-from app.modules.memory.policy import now_iso, now_utc, parse_iso
-from app.modules.memory.scope import normalize_scope, scope_from_source_refs, scope_matches
-from app.queue.db import get_conn
+from app.modules.memory.policy import now_iso, now_utc
+from app.modules.memory.retrieval_feedback import backfill_retrieval_boosts, prune_retrieval_boosts
+from app.modules.memory.scope import normalize_scope, scope_where
+from app.queue.db import ConnWrapper, get_conn
 from app.queue.logs import log_run
 
 
+DELETE_BATCH_SIZE = 500
+
+
 def run_memory_maintenance(
     user_id: Optional[str] = None,
     project_id: Optional[str] = None,
@@ -20,65 +24,38 @@ def run_memory_maintenance(
 ) -> Dict[str, object]:
     settings = load_settings()
     scope = normalize_scope(user_id=user_id, project_id=project_id, session_id=session_id)
-    now = now_utc()
-    feedback_cutoff = now - timedelta(days=int(settings.memory_maintenance_feedback_retention_days))
-
-    rows = _load_rows()
-    scanned = 0
-    delete_expired: List[str] = []
-    feedback_rows: List[Tuple[str, object, Dict[str, object]]] = []
-    delete_feedback_old: List[str] = []
+    now = now_iso()
+    feedback_cutoff = (now_utc() - timedelta(days=int(settings.memory_maintenance_feedback_retention_days))).isoformat()
+    keep_limit = max(1, int(settings.retrieval_feedback_history_limit))
     max_deletes = max(10, int(settings.memory_maintenance_max_delete_per_run))
 
-    for memory_id, source_refs, created_at, expires_at, pinned_until in rows:
-        refs = _json_loads(source_refs) or {}
-        refs = refs if isinstance(refs, dict) else {}
-        if not scope_matches(refs, scope):
-            continue
-        scanned += 1
-
-        if _is_expired_and_not_pinned(expires_at=expires_at, pinned_until=pinned_until, now=now):
-            delete_expired.append(memory_id)
-            continue
-
-        if str(refs.get("kind") or "") != "retrieval_feedback":
-            continue
-        feedback_rows.append((memory_id, created_at, refs))
-        created_dt = parse_iso(created_at)
-        if created_dt is not None and created_dt < feedback_cutoff:
-            delete_feedback_old.append(memory_id)
-
-    # Keep latest feedback history window to bound drift/size even when old items are recent.
-    overflow_ids = _feedback_overflow_ids(
-        feedback_rows=feedback_rows,
-        keep_limit=max(1, int(settings.retrieval_feedback_history_limit)),
-    )
-
-    # Preserve order of reasons, de-duplicate IDs, and cap total delete budget per run.
-    deleted_reasons: Dict[str, str] = {}
-    for memory_id in delete_expired:
-        deleted_reasons.setdefault(memory_id, "expired")
-    for memory_id in delete_feedback_old:
-        deleted_reasons.setdefault(memory_id, "feedback_retention")
-    for memory_id in overflow_ids:
-        deleted_reasons.setdefault(memory_id, "feedback_overflow")
-
-    all_delete_ids = list(deleted_reasons.keys())[:max_deletes]
-    _delete_rows(all_delete_ids)
-
+    # Each pass selects ids through an index and deletes them in bounded batches, in
+    # priority order, until the per-run delete budget is spent.
     deleted_breakdown = {"expired": 0, "feedback_retention": 0, "feedback_overflow": 0}
-    for memory_id in all_delete_ids:
-        reason = deleted_reasons.get(memory_id) or "expired"
-        deleted_breakdown[reason] = int(deleted_breakdown.get(reason) or 0) + 1
+    for reason in ("expired", "feedback_retention", "feedback_overflow"):
+        budget = max_deletes - sum(deleted_breakdown.values())
+        if budget <= 0:
+            break
+        deleted_breakdown[reason] = _delete_in_batches(
+            partial(_select_ids, reason=reason, scope=scope, now=now, feedback_cutoff=feedback_cutoff, keep_limit=keep_limit),
+            budget,
+        )
+
+    # retrieval_boosts is derived from feedback memories: seed it once after an upgrade,
+    # then age it out on the same retention window.
+    boosts_backfilled = backfill_retrieval_boosts()
+    boosts_pruned = prune_retrieval_boosts(feedback_cutoff, scope)
 
     return {
-        "generated_at": now_iso(),
+        "generated_at": now,
         "scope": scope,
-        "scanned_items": scanned,
-        "deleted_total": len(all_delete_ids),
+        "scanned_items": _count_rows(scope),
+        "deleted_total": sum(deleted_breakdown.values()),
         "deleted_breakdown": deleted_breakdown,
+        "boosts_backfilled": boosts_backfilled,
+        "boosts_pruned": boosts_pruned,
         "feedback_retention_days": int(settings.memory_maintenance_feedback_retention_days),
-        "feedback_keep_limit": int(settings.retrieval_feedback_history_limit),
+        "feedback_keep_limit": keep_limit,
         "max_delete_per_run": max_deletes,
     }
 
@@ -101,89 +78,77 @@ def handle_job(job: Dict[str, object]) -> None:
         raise
 
 
-def _load_rows() -> List[Tuple[str, object, object, object, object]]:
-    with get_conn() as conn:
-        cur = conn.cursor()
-        if conn.is_sqlite:
-            cur.execute(
-                "SELECT memory_id, source_refs, created_at, expires_at, pinned_until "
-                "FROM memory_items ORDER BY created_at DESC"
-            )
-        else:
-            cur.execute(
-                "SELECT memory_id, source_refs, created_at, expires_at, pinned_until "
-                "FROM memory_items ORDER BY created_at DESC"
-            )
-        rows = cur.fetchall()
-    out: List[Tuple[str, object, object, object, object]] = []
-    for row in rows:
-        out.append((str(row[0] or ""), row[1], row[2], row[3], row[4]))
-    return out
-
-
-def _feedback_overflow_ids(
-    feedback_rows: List[Tuple[str, object, Dict[str, object]]],
+def _select_ids(
+    conn: ConnWrapper,
+    limit: int,
+    reason: str,
+    scope: Dict[str, str],
+    now: str,
+    feedback_cutoff: str,
     keep_limit: int,
 ) -> List[str]:
-    if not feedback_rows:
-        return []
-    # Rows are globally sorted by created_at DESC from _load_rows.
-    # Keep the newest N feedback items per scope to avoid cross-tenant pruning.
-    seen_by_scope: Dict[str, int] = {}
-    overflow: List[str] = []
-    for memory_id, _created_at, refs in feedback_rows:
-        scope = scope_from_source_refs(refs)
-        scope_key = "|".join(
-            [
-                str(scope.get("user_id") or ""),
-                str(scope.get("project_id") or ""),
-                str(scope.get("session_id") or ""),
-            ]
+    """Up to `limit` memory ids due for deletion for `reason`, selected through the memory_items indexes."""
+    cur = conn.cursor()
+    ph = "?" if conn.is_sqlite else "%s"
+    clauses, params = scope_where(scope, ph)
+    scope_sql = "".join(f" AND {clause}" for clause in clauses)
+    if reason == "expired":
+        cur.execute(
+            f"SELECT memory_id FROM memory_items WHERE expires_at <= {ph} "
+            f"AND (pinned_until IS NULL OR pinned_until < {ph}){scope_sql} LIMIT {ph}",
+            tuple([now, now] + params + [limit]),
         )
-        seen = int(seen_by_scope.get(scope_key) or 0)
-        if seen >= keep_limit:
-            if str(memory_id).strip():
-                overflow.append(str(memory_id))
-            continue
-        seen_by_scope[scope_key] = seen + 1
-    return overflow
-
-
-def _delete_rows(memory_ids: List[str]) -> None:
-    ids = [str(x).strip() for x in memory_ids if str(x).strip()]
-    if not ids:
-        return
+    elif reason == "feedback_retention":
+        cur.execute(
+            f"SELECT memory_id FROM memory_items WHERE kind='retrieval_feedback' AND created_at < {ph}{scope_sql} "
+            f"LIMIT {ph}",
+            tuple([feedback_cutoff] + params + [limit]),
+        )
+    else:
+        # Keep the newest N feedback items per scope to avoid cross-tenant pruning.
+        cur.execute(
+            "SELECT memory_id FROM ("
+            "SELECT memory_id, ROW_NUMBER() OVER ("
+            "PARTITION BY COALESCE(user_id, ''), COALESCE(project_id, ''), COALESCE(session_id, '') "
+            "ORDER BY created_at DESC, memory_id DESC) AS rn "
+            f"FROM memory_items WHERE kind='retrieval_feedback'{scope_sql}"
+            f") ranked WHERE rn > {ph} LIMIT {ph}",
+            tuple(params + [keep_limit, limit]),
+        )
+    return [str(row[0]) for row in cur.fetchall() if str(row[0] or "").strip()]
+
+
+def _delete_in_batches(select: Callable[[ConnWrapper, int], List[str]], budget: int) -> int:
+    deleted = 0
+    while deleted < budget:
+        batch = min(DELETE_BATCH_SIZE, budget - deleted)
+        with get_conn() as conn:
+            ids = select(conn, batch)
+            _delete_ids(conn, ids)
+        deleted += len(ids)
+        if len(ids) < batch:
+            break
+    return deleted
+
+
+def _count_rows(scope: Dict[str, str]) -> int:
     with get_conn() as conn:
         cur = conn.cursor()
-        if conn.is_sqlite:
-            placeholders = ", ".join(["?"] * len(ids))
-            cur.execute(f"DELETE FROM memory_items WHERE memory_id IN ({placeholders})", tuple(ids))
-        else:
-            placeholders = ", ".join(["%s"] * len(ids))
-            cur.execute(f"DELETE FROM memory_items WHERE memory_id IN ({placeholders})", tuple(ids))
-        conn.commit()
-
-
-def _is_expired_and_not_pinned(expires_at: object, pinned_until: object, now: object) -> bool:
-    expiry = parse_iso(expires_at)
-    if expiry is None:
-        return False
-    pin = parse_iso(pinned_until)
-    if pin is not None and now <= pin:
-        return False
-    return now >= expiry
-
-
-def _json_loads(value: object) -> object:
-    if value is None:
-        return None
-    if isinstance(value, (dict, list)):
-        return value
-    if isinstance(value, (bytes, bytearray)):
-        value = value.decode("utf-8")
-    if isinstance(value, str):
-        try:
-            return json.loads(value)
-        except Exception:
-            return None
-    return None
+        ph = "?" if conn.is_sqlite else "%s"
+        clauses, params = scope_where(scope, ph)
+        where_sql = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        cur.execute(f"SELECT COUNT(*) FROM memory_items{where_sql}", tuple(params))
+        row = cur.fetchone()
+    return int(row[0] if row else 0)
+
+
+def _delete_ids(conn: ConnWrapper, memory_ids: List[str]) -> None:
+    if not memory_ids:
+        return
+    cur = conn.cursor()
+    ph = "?" if conn.is_sqlite else "%s"
+    placeholders = ", ".join([ph] * len(memory_ids))
+    cur.execute(f"DELETE FROM memory_items WHERE memory_id IN ({placeholders})", tuple(memory_ids))
+    cur.execute(f"DELETE FROM memory_embeddings WHERE memory_id IN ({placeholders})", tuple(memory_ids))
+    cur.execute(f"DELETE FROM memory_slots WHERE memory_id IN ({placeholders})", tuple(memory_ids))
+    conn.commit()
@@ -0,0 +1,131 @@
+"""Background embedding of memory items for semantic recall."""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, List
+
+from app.clients.ollama_client import embed
+from app.core.config import load_settings
+from app.core.ids import sha256_text
+from app.modules.embeddings.embedding_store import get_active_embedding_model, upsert_memory_embeddings
+from app.modules.memory.scope import scope_from_source_refs
+from app.queue.db import get_conn
+from app.queue.jobs import enqueue_job
+from app.queue.logs import log_run
+
+
+JOB_TYPE = "memory_embed"
+JOB_LANE = "oss20b"
+JOB_SOURCE_ID = "memory:embeddings"
+
+
+def schedule_memory_embedding() -> bool:
+    """Queue a memory_embed job unless one is already waiting; one job drains every pending memory."""
+    settings = load_settings()
+    if not (settings.embeddings_enabled and settings.memory_embeddings_enabled):
+        return False
+    with get_conn() as conn:
+        cur = conn.cursor()
+        ph = "?" if conn.is_sqlite else "%s"
+        cur.execute(
+            f"SELECT 1 FROM jobs WHERE job_type={ph} AND status='queued' LIMIT 1",
+            (JOB_TYPE,),
+        )
+        if cur.fetchone() is not None:
+            return False
+    enqueue_job(JOB_TYPE, JOB_LANE, JOB_SOURCE_ID, "pending")
+    return True
+
+
+def memory_embedding_text(text: object, topics: object, entities: object) -> str:
+    parts = [str(text or "").strip()]
+    for values in (topics, entities):
+        if isinstance(values, list):
+            parts.extend(str(value).strip() for value in values if str(value).strip())
+    return " ".join(part for part in parts if part)
+
+
+def handle_job(job: Dict[str, object]) -> None:
+    settings = load_settings()
+    if not (settings.embeddings_enabled and settings.memory_embeddings_enabled):
+        return
+    lane = str(job.get("lane") or JOB_LANE)
+    batch_size = int(settings.memory_embed_batch_size)
+    model = get_active_embedding_model()
+
+    run_id = log_run(lane=lane, component="memory_embed", input_json={"model": model, "batch_size": batch_size})
+    try:
+        pending = _pending_memories(model, batch_size)
+        rows: List[Dict[str, Any]] = []
+        for item in pending:
+            text = memory_embedding_text(item["text"], item["topics"], item["entities"])
+            if not text:
+                continue
+            scope = scope_from_source_refs(item["source_refs"])
+            rows.append(
+                {
+                    "memory_id": item["memory_id"],
+                    "memory_type": item["memory_type"],
+                    "user_id": scope.get("user_id"),
+                    "project_id": scope.get("project_id"),
+                    "session_id": scope.get("session_id"),
+                    "text_hash": sha256_text(text),
+                    "embedding": embed(text, model=model),
+                    "embedding_model": model,
+                }
+            )
+        stored = upsert_memory_embeddings(rows)
+    except Exception as exc:
+        log_run(lane=lane, component="memory_embed", input_json={"run_id": run_id}, error=str(exc))
+        raise
+
+    requeued = len(pending) >= batch_size
+    if requeued:
+        enqueue_job(JOB_TYPE, lane, JOB_SOURCE_ID, "pending")
+    log_run(
+        lane=lane,
+        component="memory_embed",
+        input_json={"run_id": run_id},
+        output_json={"embedded": stored, "requeued": requeued},
+    )
+
+
+def _pending_memories(model: str, limit: int) -> List[Dict[str, Any]]:
+    """Memories with no vector from `model` yet, oldest first.
+
+    Memories with blank text are left out: they never get a vector, so selecting
+    them would fill every batch and requeue the job forever.
+    """
+    with get_conn() as conn:
+        cur = conn.cursor()
+        ph = "?" if conn.is_sqlite else "%s"
+        cur.execute(
+            "SELECT m.memory_id, m.memory_type, m.text, m.topics, m.entities, m.source_refs FROM memory_items m "
+            f"LEFT JOIN memory_embeddings e ON e.memory_id = m.memory_id AND e.embedding_model = {ph} "
+            f"WHERE e.memory_id IS NULL AND TRIM(COALESCE(m.text, '')) <> '' ORDER BY m.created_at LIMIT {ph}",
+            (model, int(limit)),
+        )
+        rows = cur.fetchall()
+    return [
+        {
+            "memory_id": str(row[0]),
+            "memory_type": str(row[1] or "working"),
+            "text": row[2],
+            "topics": _json_loads(row[3]),
+            "entities": _json_loads(row[4]),
+            "source_refs": _json_loads(row[5]),
+        }
+        for row in rows
+    ]
+
+
+def _json_loads(value: object) -> object:
+    if value is None or isinstance(value, (dict, list)):
+        return value
+    if isinstance(value, (bytes, bytearray)):
+        value = value.decode("utf-8")
+    try:
+        return json.loads(str(value))
+    except Exception:
+        return None
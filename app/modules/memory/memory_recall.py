@@ -3,21 +3,30 @@
 from __future__ import annotations
 
 import json
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
 from app.clients.snowflake_client import SnowflakeClient
+from app.core.config import load_settings
+from app.modules.embeddings.embedding_store import (
+    get_active_embedding_model,
+    search_memory_embeddings,
+)
+from app.modules.embeddings.query_cache import embed_query
+from app.modules.memory.access_log import pending_access, record_access
 from app.modules.memory.policy import (
     TYPE_WEIGHT,
     clamp_float,
+    match_terms,
     normalize_memory_type,
-    now_iso,
     now_utc,
     overlap_score,
     parse_iso,
     recency_score,
     tokens,
 )
-from app.modules.memory.scope import normalize_scope, scope_matches
+from app.modules.memory.router import parse_slot_question
+from app.modules.memory.scope import normalize_scope, scope_matches, scope_where
+from app.modules.memory.slots import lookup_slot
 from app.queue.db import get_conn
 
 
@@ -31,31 +40,45 @@ def recall(
     session_id: Optional[str] = None,
     include_long_term: bool = False,
     client: Optional[SnowflakeClient] = None,
+    query_tokens: Optional[List[str]] = None,
 ) -> List[Dict[str, object]]:
     q = str(query or "").strip()
     if not q:
         return []
 
-    q_tokens = tokens(q)
-    candidate_limit = max(limit * 5, 20)
+    q_tokens = list(query_tokens) if query_tokens is not None else tokens(q)
+    # Scope and kind are filtered in SQL, so only expiry can still drop candidates.
+    candidate_limit = max(limit * 2, 10)
     scope = normalize_scope(user_id=user_id, project_id=project_id, session_id=session_id)
-    local = _query_local(q, memory_type=memory_type, limit=candidate_limit)
-    if scope:
-        local = [item for item in local if _scope_matches(item, scope)]
     memory_kind = _normalize_memory_kind_filter(memory_kind)
-    if memory_kind:
-        local = [item for item in local if _memory_kind_matches(item, memory_kind)]
+    filters = {"memory_type": memory_type, "memory_kind": memory_kind, "scope": scope}
+    local = _query_local(q, q_tokens, limit=candidate_limit, **filters)
+    semantic = _semantic_scores(q, limit, memory_type=memory_type, scope=scope)
+    if semantic:
+        seen = {str(item.get("memory_id")) for item in local}
+        local.extend(_load_local([memory_id for memory_id in semantic if memory_id not in seen], **filters))
+        for item in local:
+            item["semantic_score"] = semantic.get(str(item.get("memory_id")), 0.0)
 
     ranked_local: List[Dict[str, object]] = []
     for item in local:
         if _is_expired(item):
             continue
+        hits, last_accessed_at = pending_access(str(item.get("memory_id")))
+        if hits:
+            # Count accesses still waiting in the write-behind buffer.
+            item["access_count"] = int(item.get("access_count") or 0) + hits
+            item["last_accessed_at"] = last_accessed_at
         score = _score_local_item(item, q_tokens)
         item["recall_score"] = score
         ranked_local.append(item)
-    ranked_local.sort(key=lambda r: float(r.get("recall_score", 0.0)), reverse=True)
+    slot_item = _current_slot_item(q, q_tokens, scope, memory_type=memory_type, memory_kind=memory_kind)
+    if slot_item is not None:
+        ranked_local = [item for item in ranked_local if item.get("memory_id") != slot_item.get("memory_id")]
+        ranked_local.append(slot_item)
+    ranked_local.sort(key=_rank_key, reverse=True)
     selected_local = ranked_local[:limit]
-    _touch_local([str(item.get("memory_id")) for item in selected_local if item.get("memory_id")])
+    record_access([str(item.get("memory_id")) for item in selected_local if item.get("memory_id")])
 
     if include_long_term:
         remote = _query_long_term(
@@ -73,54 +96,177 @@ def recall(
         for item in remote:
             item["recall_score"] = _score_remote_item(item, q_tokens)
         selected_local.extend(remote)
-        selected_local.sort(key=lambda r: float(r.get("recall_score", 0.0)), reverse=True)
+        selected_local.sort(key=_rank_key, reverse=True)
 
     return selected_local[:limit]
 
 
-def _query_local(query: str, memory_type: Optional[str], limit: int) -> List[Dict[str, object]]:
-    like_query = f"%{query}%"
-    params: List[object]
+def _rank_key(item: Dict[str, object]) -> Tuple[bool, float]:
+    # The current holder of an asked-for slot answers the question directly.
+    return bool(item.get("slot_match")), float(item.get("recall_score", 0.0))
+
+
+def _current_slot_item(
+    query: str,
+    query_tokens: List[str],
+    scope: Dict[str, str],
+    memory_type: Optional[str],
+    memory_kind: Optional[str],
+) -> Optional[Dict[str, object]]:
+    slot = parse_slot_question(query)
+    if not slot:
+        return None
+    current = lookup_slot(slot, scope, memory_kind=memory_kind or "semantic")
+    if current is None:
+        return None
+    items = _load_local([current["memory_id"]], memory_type=memory_type)
+    if not items or _is_expired(items[0]):
+        return None
+    item = items[0]
+    item["slot_match"] = True
+    item["memory_slot"] = slot
+    item["memory_value"] = current["memory_value"]
+    item["recall_score"] = _score_local_item(item, query_tokens)
+    return item
+
+
+_POLICY_COLUMNS = (
+    "memory_id, memory_type, text, topics, entities, source_refs, created_at, "
+    "importance, confidence, access_count, last_accessed_at, expires_at, pinned_until"
+)
+MAX_MATCH_TERMS = 32
+SEMANTIC_MIN_SIMILARITY = 0.35
+
+
+def _filter_sql(
+    placeholder: str,
+    memory_type: Optional[str],
+    memory_kind: Optional[str],
+    scope: Optional[Dict[str, str]],
+    alias: str = "",
+) -> Tuple[List[str], List[object]]:
+    prefix = f"{alias}." if alias else ""
+    clauses, params = scope_where(scope or {}, placeholder, alias=alias)
     if memory_type:
-        normalized_type = normalize_memory_type(memory_type)
-        where_sql = "memory_type=? AND (text LIKE ? OR topics LIKE ? OR entities LIKE ?)"
-        params = [normalized_type, like_query, like_query, like_query, limit]
-    else:
-        where_sql = "text LIKE ? OR topics LIKE ? OR entities LIKE ?"
-        params = [like_query, like_query, like_query, limit]
+        clauses.append(f"{prefix}memory_type = {placeholder}")
+        params.append(normalize_memory_type(memory_type))
+    if memory_kind:
+        clauses.append(f"{prefix}memory_kind = {placeholder}")
+        params.append(memory_kind)
+    return clauses, params
+
+
+def _query_local(
+    query: str,
+    query_tokens: List[str],
+    memory_type: Optional[str],
+    limit: int,
+    memory_kind: Optional[str] = None,
+    scope: Optional[Dict[str, str]] = None,
+) -> List[Dict[str, object]]:
+    """Top `limit` memories by full-text rank (BM25 / ts_rank_cd) over text, topics and entities.
 
+    Any query term may match. Falls back to a substring scan when the index is
+    unavailable (SQLite without FTS5, or an un-migrated Postgres table).
+    """
+    terms = match_terms(query_tokens, limit=MAX_MATCH_TERMS)
+    if not terms:
+        return []
     with get_conn() as conn:
         cur = conn.cursor()
-        if conn.is_sqlite:
-            sql_new = (
-                "SELECT memory_id, memory_type, text, topics, entities, source_refs, created_at, "
-                "importance, confidence, access_count, last_accessed_at, expires_at, pinned_until "
-                f"FROM memory_items WHERE ({where_sql}) LIMIT ?"
-            )
-            sql_old = (
-                "SELECT memory_id, memory_type, text, topics, entities, source_refs, created_at "
-                f"FROM memory_items WHERE ({where_sql}) LIMIT ?"
-            )
-        else:
-            where_sql_pg = where_sql.replace("?", "%s").replace("LIKE", "ILIKE")
-            sql_new = (
-                "SELECT memory_id, memory_type, text, topics, entities, source_refs, created_at, "
-                "importance, confidence, access_count, last_accessed_at, expires_at, pinned_until "
-                f"FROM memory_items WHERE ({where_sql_pg}) LIMIT %s"
-            )
-            sql_old = (
-                "SELECT memory_id, memory_type, text, topics, entities, source_refs, created_at "
-                f"FROM memory_items WHERE ({where_sql_pg}) LIMIT %s"
-            )
-
         try:
-            cur.execute(sql_new, tuple(params))
-            rows = cur.fetchall()
-            return [_row_to_item(row, has_policy_fields=True) for row in rows]
+            if conn.is_sqlite:
+                columns = ", ".join(f"m.{name.strip()}" for name in _POLICY_COLUMNS.split(","))
+                clauses, filter_params = _filter_sql("?", memory_type, memory_kind, scope, alias="m")
+                filter_sql = "".join(f" AND {clause}" for clause in clauses)
+                cur.execute(
+                    f"SELECT {columns} FROM memory_fts JOIN memory_items m ON m.memory_id = memory_fts.memory_id "
+                    f"WHERE memory_fts MATCH ?{filter_sql} ORDER BY bm25(memory_fts) LIMIT ?",
+                    tuple([" OR ".join(f'"{term}"' for term in terms)] + filter_params + [limit]),
+                )
+            else:
+                match = " | ".join(terms)
+                clauses, filter_params = _filter_sql("%s", memory_type, memory_kind, scope)
+                filter_sql = "".join(f" AND {clause}" for clause in clauses)
+                cur.execute(
+                    f"SELECT {_POLICY_COLUMNS} FROM memory_items WHERE tsv @@ to_tsquery('simple', %s){filter_sql} "
+                    "ORDER BY ts_rank_cd(tsv, to_tsquery('simple', %s)) DESC LIMIT %s",
+                    tuple([match] + filter_params + [match, limit]),
+                )
+            return [_row_to_item(row, has_policy_fields=True) for row in cur.fetchall()]
         except Exception:
-            cur.execute(sql_old, tuple(params))
-            rows = cur.fetchall()
-            return [_row_to_item(row, has_policy_fields=False) for row in rows]
+            conn.rollback()
+    return _query_local_like(query, memory_type, limit, memory_kind=memory_kind, scope=scope)
+
+
+def _query_local_like(
+    query: str,
+    memory_type: Optional[str],
+    limit: int,
+    memory_kind: Optional[str] = None,
+    scope: Optional[Dict[str, str]] = None,
+) -> List[Dict[str, object]]:
+    like_query = f"%{query}%"
+    with get_conn() as conn:
+        cur = conn.cursor()
+        ph = "?" if conn.is_sqlite else "%s"
+        like = "LIKE" if conn.is_sqlite else "ILIKE"
+        clauses, params = _filter_sql(ph, memory_type, memory_kind, scope)
+        clauses.append(f"(text {like} {ph} OR topics {like} {ph} OR entities {like} {ph})")
+        params.extend([like_query, like_query, like_query, limit])
+        where_sql = " AND ".join(clauses)
+        cur.execute(f"SELECT {_POLICY_COLUMNS} FROM memory_items WHERE {where_sql} LIMIT {ph}", tuple(params))
+        return [_row_to_item(row, has_policy_fields=True) for row in cur.fetchall()]
+
+
+def _semantic_scores(
+    query: str,
+    limit: int,
+    memory_type: Optional[str],
+    scope: Dict[str, str],
+) -> Dict[str, float]:
+    """memory_id -> rescaled cosine for the nearest memory vectors; empty when none are stored."""
+    settings = load_settings()
+    if not (settings.embeddings_enabled and settings.memory_embeddings_enabled):
+        return {}
+    try:
+        vector = embed_query(query, model=get_active_embedding_model())
+        hits = search_memory_embeddings(
+            vector,
+            max(limit * 2, 8),
+            memory_type=normalize_memory_type(memory_type) if memory_type else None,
+            scope=scope,
+        )
+    except Exception:
+        return {}
+    out: Dict[str, float] = {}
+    for memory_id, similarity in hits:
+        # Unrelated texts still score well above zero; only similarity past the floor counts.
+        rescaled = (float(similarity) - SEMANTIC_MIN_SIMILARITY) / (1.0 - SEMANTIC_MIN_SIMILARITY)
+        if rescaled > 0.0:
+            out[memory_id] = round(min(1.0, rescaled), 6)
+    return out
+
+
+def _load_local(
+    memory_ids: List[str],
+    memory_type: Optional[str] = None,
+    memory_kind: Optional[str] = None,
+    scope: Optional[Dict[str, str]] = None,
+) -> List[Dict[str, object]]:
+    if not memory_ids:
+        return []
+    with get_conn() as conn:
+        cur = conn.cursor()
+        ph = "?" if conn.is_sqlite else "%s"
+        clauses, params = _filter_sql(ph, memory_type, memory_kind, scope)
+        filter_sql = "".join(f" AND {clause}" for clause in clauses)
+        cur.execute(
+            f"SELECT {_POLICY_COLUMNS} FROM memory_items "
+            f"WHERE memory_id IN ({', '.join([ph] * len(memory_ids))}){filter_sql}",
+            tuple(list(memory_ids) + params),
+        )
+        return [_row_to_item(row, has_policy_fields=True) for row in cur.fetchall()]
 
 
 def _row_to_item(row: object, has_policy_fields: bool) -> Dict[str, object]:
@@ -213,7 +359,7 @@ def _query_long_term(
 
 
 def _score_local_item(item: Dict[str, object], query_tokens: List[str]) -> float:
-    text_score = overlap_score(query_tokens, item.get("text"))
+    text_score = max(overlap_score(query_tokens, item.get("text")), clamp_float(item.get("semantic_score"), default=0.0))
     topic_score = overlap_score(query_tokens, " ".join(item.get("topics") or []))
     entity_score = overlap_score(query_tokens, " ".join(item.get("entities") or []))
     meta_score = max(topic_score, entity_score)
@@ -240,31 +386,6 @@ def _score_remote_item(item: Dict[str, object], query_tokens: List[str]) -> floa
     return round((0.65 * text_score + 0.35 * recency_score(item.get("created_at"))) * type_weight, 6)
 
 
-def _touch_local(memory_ids: List[str]) -> None:
-    if not memory_ids:
-        return
-    placeholders_sqlite = ", ".join(["?"] * len(memory_ids))
-    placeholders_pg = ", ".join(["%s"] * len(memory_ids))
-    with get_conn() as conn:
-        cur = conn.cursor()
-        try:
-            if conn.is_sqlite:
-                cur.execute(
-                    f"UPDATE memory_items SET access_count=COALESCE(access_count, 0)+1, last_accessed_at=? "
-                    f"WHERE memory_id IN ({placeholders_sqlite})",
-                    tuple([now_iso()] + memory_ids),
-                )
-            else:
-                cur.execute(
-                    f"UPDATE memory_items SET access_count=COALESCE(access_count, 0)+1, last_accessed_at=%s "
-                    f"WHERE memory_id IN ({placeholders_pg})",
-                    tuple([now_iso()] + memory_ids),
-                )
-            conn.commit()
-        except Exception:
-            pass
-
-
 def _is_expired(item: Dict[str, object]) -> bool:
     expiry = parse_iso(item.get("expires_at"))
     if expiry is None:
@@ -2,11 +2,10 @@
 
 from __future__ import annotations
 
-import json
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
-from app.modules.memory.policy import now_iso, now_utc, parse_iso
-from app.modules.memory.scope import normalize_scope, scope_matches
+from app.modules.memory.policy import now_iso
+from app.modules.memory.scope import normalize_scope, scope_where
 from app.queue.db import get_conn
 
 
@@ -16,75 +15,38 @@ def get_memory_stats(
     session_id: Optional[str] = None,
 ) -> Dict[str, object]:
     scope = normalize_scope(user_id=user_id, project_id=project_id, session_id=session_id)
-    rows = _load_memory_rows()
-    filtered: List[Dict[str, object]] = []
-    for row in rows:
-        refs = row.get("source_refs")
-        if not scope_matches(refs, scope):
-            continue
-        filtered.append(row)
-
-    total = len(filtered)
-    now = now_utc()
-    active = 0
+    groups = _aggregate(scope)
+
+    total = 0
     expired = 0
     by_type: Dict[str, int] = {}
     by_kind: Dict[str, int] = {}
-
     superseded_items = 0
     supersede_actions = 0
     supersede_links = 0
-
     feedback_items = 0
     feedback_signals_total = 0
     feedback_cited_total = 0
     feedback_missed_total = 0
 
-    for row in filtered:
-        memory_type = str(row.get("memory_type") or "unknown").strip().lower() or "unknown"
-        by_type[memory_type] = by_type.get(memory_type, 0) + 1
-
-        refs = row.get("source_refs")
-        refs = refs if isinstance(refs, dict) else {}
-
-        memory_kind = str(refs.get("memory_kind") or "").strip().lower()
-        if memory_kind in {"semantic", "episodic", "procedural"}:
-            by_kind[memory_kind] = by_kind.get(memory_kind, 0) + 1
-        else:
-            by_kind["unknown"] = by_kind.get("unknown", 0) + 1
-
-        expiry = parse_iso(row.get("expires_at"))
-        if expiry is None or now < expiry:
-            active += 1
-        else:
-            expired += 1
-
-        if str(refs.get("superseded_by") or "").strip():
-            superseded_items += 1
-        supersedes = refs.get("supersedes")
-        if isinstance(supersedes, list):
-            links = [str(x).strip() for x in supersedes if str(x).strip()]
-            if links:
-                supersede_actions += 1
-                supersede_links += len(set(links))
-
-        if str(refs.get("kind") or "") != "retrieval_feedback":
-            continue
-        feedback_items += 1
-        signals = refs.get("signals")
-        if isinstance(signals, list):
-            feedback_signals_total += len(signals)
-            for signal in signals:
-                if not isinstance(signal, dict):
-                    continue
-                outcome = str(signal.get("outcome") or "").strip().lower()
-                if outcome == "cited":
-                    feedback_cited_total += 1
-                elif outcome == "missed":
-                    feedback_missed_total += 1
-        else:
-            feedback_cited_total += _safe_int(refs.get("cited_count"))
-            feedback_missed_total += _safe_int(refs.get("missed_count"))
+    for row in groups:
+        count = _safe_int(row[2])
+        memory_type = str(row[0] or "unknown").strip().lower() or "unknown"
+        by_type[memory_type] = by_type.get(memory_type, 0) + count
+        memory_kind = str(row[1] or "").strip().lower()
+        if memory_kind not in {"semantic", "episodic", "procedural"}:
+            memory_kind = "unknown"
+        by_kind[memory_kind] = by_kind.get(memory_kind, 0) + count
+
+        total += count
+        expired += _safe_int(row[3])
+        superseded_items += _safe_int(row[4])
+        supersede_actions += _safe_int(row[5])
+        supersede_links += _safe_int(row[6])
+        feedback_items += _safe_int(row[7])
+        feedback_signals_total += _safe_int(row[8])
+        feedback_cited_total += _safe_int(row[9])
+        feedback_missed_total += _safe_int(row[10])
 
     supersede_rate = _ratio(superseded_items, total)
     feedback_hit_rate = _ratio(feedback_cited_total, feedback_signals_total)
@@ -93,7 +55,7 @@ def get_memory_stats(
         "scope": scope,
         "totals": {
             "memory_items": total,
-            "active_items": active,
+            "active_items": total - expired,
             "expired_items": expired,
         },
         "by_memory_type": dict(sorted(by_type.items())),
@@ -114,25 +76,40 @@ def get_memory_stats(
     }
 
 
-def _load_memory_rows() -> List[Dict[str, object]]:
+def feedback_counts(source_refs: object) -> Tuple[int, int, int]:
+    """(signals, cited, missed) for a retrieval_feedback memory; stored in its counter columns at write time."""
+    refs = source_refs if isinstance(source_refs, dict) else {}
+    if str(refs.get("kind") or "") != "retrieval_feedback":
+        return 0, 0, 0
+    signals = refs.get("signals")
+    if not isinstance(signals, list):
+        return 0, _safe_int(refs.get("cited_count")), _safe_int(refs.get("missed_count"))
+    outcomes = [
+        str(signal.get("outcome") or "").strip().lower() for signal in signals if isinstance(signal, dict)
+    ]
+    return len(signals), outcomes.count("cited"), outcomes.count("missed")
+
+
+def _aggregate(scope: Dict[str, str]) -> List[Tuple[object, ...]]:
+    """One GROUP BY over the indexed scope columns and per-row counters; no source_refs parsing."""
     with get_conn() as conn:
         cur = conn.cursor()
-        if conn.is_sqlite:
-            cur.execute("SELECT memory_type, source_refs, expires_at FROM memory_items")
-        else:
-            cur.execute("SELECT memory_type, source_refs, expires_at FROM memory_items")
-        rows = cur.fetchall()
-
-    out: List[Dict[str, object]] = []
-    for row in rows:
-        out.append(
-            {
-                "memory_type": row[0],
-                "source_refs": _json_loads(row[1]) or {},
-                "expires_at": row[2],
-            }
+        ph = "?" if conn.is_sqlite else "%s"
+        clauses, params = scope_where(scope, ph)
+        where_sql = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        feedback = "CASE WHEN kind = 'retrieval_feedback' THEN {0} ELSE 0 END"
+        cur.execute(
+            "SELECT memory_type, memory_kind, COUNT(*), "
+            f"SUM(CASE WHEN expires_at <= {ph} THEN 1 ELSE 0 END), "
+            "SUM(CASE WHEN COALESCE(superseded_by, '') <> '' THEN 1 ELSE 0 END), "
+            "SUM(CASE WHEN supersedes_count > 0 THEN 1 ELSE 0 END), "
+            "SUM(supersedes_count), "
+            f"SUM({feedback.format(1)}), SUM({feedback.format('signal_count')}), "
+            f"SUM({feedback.format('cited_count')}), SUM({feedback.format('missed_count')}) "
+            f"FROM memory_items{where_sql} GROUP BY memory_type, memory_kind",
+            tuple([now_iso()] + params),
         )
-    return out
+        return [tuple(row) for row in cur.fetchall()]
 
 
 def _ratio(numerator: int, denominator: int) -> float:
@@ -146,18 +123,3 @@ def _safe_int(value: object) -> int:
         return int(value or 0)
     except Exception:
         return 0
-
-
-def _json_loads(value: object) -> object:
-    if value is None:
-        return None
-    if isinstance(value, (dict, list)):
-        return value
-    if isinstance(value, (bytes, bytearray)):
-        value = value.decode("utf-8")
-    if isinstance(value, str):
-        try:
-            return json.loads(value)
-        except Exception:
-            return None
-    return None
@@ -4,7 +4,8 @@ from __future__ import annotations
 
 import json
 import uuid
-from typing import Dict, List, Optional
+from datetime import timezone
+from typing import Any, Callable, Dict, List, Optional
 
 from app.clients.snowflake_client import SnowflakeClient, merge_memory_sql
 from app.modules.memory.policy import (
@@ -17,9 +18,12 @@ from app.modules.memory.policy import (
     now_utc,
     parse_iso,
 )
+from app.modules.memory.memory_embed import schedule_memory_embedding
+from app.modules.memory.memory_stats import feedback_counts
 from app.modules.memory.router import normalize_memory_kind, route_memory
-from app.modules.memory.scope import apply_scope_to_source_refs, normalize_scope, scope_matches
-from app.queue.db import get_conn
+from app.modules.memory.scope import apply_scope_to_source_refs, normalize_scope, scope_from_source_refs, scope_where
+from app.modules.memory.slots import set_current_slot
+from app.queue.db import ConnWrapper, get_conn
 from app.queue.logs import log_run
 
 
@@ -46,168 +50,276 @@ def write_memory(
     project_id: Optional[str] = None,
     session_id: Optional[str] = None,
 ) -> Dict[str, object]:
-    memory_id = str(uuid.uuid4())
+    return write_memories(
+        [
+            {
+                "memory_type": memory_type,
+                "text": text,
+                "topics": topics,
+                "entities": entities,
+                "source_refs": source_refs,
+                "importance": importance,
+                "confidence": confidence,
+                "expires_at": expires_at,
+                "pinned_until": pinned_until,
+                "publish_long_term": publish_long_term,
+                "memory_kind": memory_kind,
+                "memory_slot": memory_slot,
+                "memory_value": memory_value,
+                "overwrite_conflicts": overwrite_conflicts,
+                "user_id": user_id,
+                "project_id": project_id,
+                "session_id": session_id,
+            }
+        ]
+    )[0]
+
+
+def write_memories(
+    items: List[Dict[str, Any]],
+    route: bool = True,
+    embed: bool = True,
+    before_commit: Optional[Callable[[ConnWrapper], None]] = None,
+) -> List[Dict[str, object]]:
+    """Write many memories in one transaction; returns one receipt per item, in order.
+
+    Each item takes the keyword arguments of `write_memory`, plus optional
+    `memory_id`/`created_at` to keep an imported memory's identity and
+    `access_count`/`last_accessed_at` to keep its access history. Slot conflicts
+    are resolved in item order, long-term rows are published with a single MERGE,
+    and the batch is logged as one run_log entry. `route=False` trusts the given
+    kind/slot/value instead of running the router; `embed=False` skips scheduling
+    the memory_embed job. `before_commit` runs on the same connection just before
+    the commit, so derived rows land in the same transaction as the memories.
+    """
+    prepared = [_prepare_memory(route=route, **item) for item in items]
+    if not prepared:
+        return []
+
+    receipts: List[Dict[str, object]] = []
+    with get_conn() as conn:
+        _insert_memories(conn, prepared)
+        for memory in prepared:
+            supersede_result: Dict[str, object] = {}
+            if memory["memory_slot"] and memory["memory_value"] and not memory["source_refs"].get("superseded_by"):
+                set_current_slot(
+                    conn,
+                    memory["stored_scope"],
+                    memory["memory_kind"],
+                    memory["memory_slot"],
+                    memory["memory_id"],
+                    memory["memory_value"],
+                    created_at=memory["created_at"],
+                )
+                if memory["overwrite_conflicts"]:
+                    # Writes without overwrite leave earlier holders live, so every one of them conflicts.
+                    supersede_result = _supersede_conflicting_memories(
+                        conn=conn,
+                        memory_id=memory["memory_id"],
+                        scope=memory["stored_scope"],
+                        memory_kind=memory["memory_kind"],
+                        memory_slot=memory["memory_slot"],
+                        memory_value=memory["memory_value"],
+                    )
+            receipts.append(
+                {
+                    "memory_id": memory["memory_id"],
+                    "memory_type": memory["memory_type"],
+                    "memory_kind": memory["memory_kind"],
+                    "superseded_count": int(supersede_result.get("count") or 0),
+                    "superseded_ids": [
+                        str(x) for x in supersede_result.get("superseded_ids") or [] if str(x).strip()
+                    ],
+                    "published": False,
+                    "error": None,
+                }
+            )
+        if before_commit is not None:
+            before_commit(conn)
+        conn.commit()
+
+    publish = [idx for idx, memory in enumerate(prepared) if memory["publish_long_term"]]
+    publish_error: Optional[str] = None
+    if publish:
+        rows = [
+            {
+                "memory_id": prepared[idx]["memory_id"],
+                "category": prepared[idx]["memory_type"],
+                "text": prepared[idx]["text"],
+                "topics": prepared[idx]["topics"],
+                "entities": prepared[idx]["entities"],
+                "source_refs": prepared[idx]["source_refs"],
+                "created_at": prepared[idx]["created_at"],
+            }
+            for idx in publish
+        ]
+        sql = merge_memory_sql(rows)
+        try:
+            client = SnowflakeClient()
+            client.execute_sql(sql)
+        except Exception as exc:
+            publish_error = str(exc)
+        for idx in publish:
+            receipts[idx]["published"] = publish_error is None
+            if publish_error is not None:
+                receipts[idx]["error"] = publish_error
+                receipts[idx]["sql"] = sql
+
+    if embed:
+        try:
+            schedule_memory_embedding()
+        except Exception:
+            # Semantic recall catches up on the next write; the memories themselves are stored.
+            pass
+
+    log_run(
+        lane="io",
+        component="memory_write",
+        input_json={
+            "count": len(prepared),
+            "memory_ids": [memory["memory_id"] for memory in prepared],
+            "memory_types": sorted({memory["memory_type"] for memory in prepared}),
+        },
+        output_json={
+            "written": len(receipts),
+            "superseded": sum(int(receipt["superseded_count"]) for receipt in receipts),
+            "published": sum(1 for receipt in receipts if receipt["published"]),
+        },
+        error=publish_error,
+    )
+    return receipts
+
+
+def _prepare_memory(
+    memory_type: MemoryType,
+    text: str,
+    topics: Optional[List[str]] = None,
+    entities: Optional[List[str]] = None,
+    source_refs: Optional[Dict[str, object]] = None,
+    importance: float = 0.5,
+    confidence: float = 0.7,
+    expires_at: Optional[str] = None,
+    pinned_until: Optional[str] = None,
+    publish_long_term: bool = False,
+    memory_kind: Optional[str] = None,
+    memory_slot: Optional[str] = None,
+    memory_value: Optional[str] = None,
+    overwrite_conflicts: bool = False,
+    user_id: Optional[str] = None,
+    project_id: Optional[str] = None,
+    session_id: Optional[str] = None,
+    memory_id: Optional[str] = None,
+    created_at: Optional[str] = None,
+    access_count: Optional[int] = None,
+    last_accessed_at: Optional[str] = None,
+    route: bool = True,
+) -> Dict[str, Any]:
+    """Route, normalize and scope one memory into the row `_insert_memories` stores."""
     memory_type = normalize_memory_type(memory_type)
     text = normalize_text(text)
     topics = normalize_list(topics)
     entities = normalize_list(entities)
     source_refs = dict(source_refs or {})
     scope = normalize_scope(user_id=user_id, project_id=project_id, session_id=session_id)
-    route = route_memory(text=text, memory_type_hint=memory_type, preferred_kind=memory_kind)
-    memory_kind = normalize_memory_kind(memory_kind, default=str(route.get("memory_kind") or "semantic"))
-    memory_slot = normalize_text(memory_slot or route.get("memory_slot") or "", max_len=64) or None
-    memory_value = normalize_text(memory_value or route.get("memory_value") or "", max_len=280) or None
+    routed: Dict[str, object] = {}
+    if route:
+        routed = route_memory(text=text, memory_type_hint=memory_type, preferred_kind=memory_kind)
+    memory_kind = normalize_memory_kind(memory_kind, default=str(routed.get("memory_kind") or "semantic"))
+    memory_slot = normalize_text(memory_slot or routed.get("memory_slot") or "", max_len=64) or None
+    memory_value = normalize_text(memory_value or routed.get("memory_value") or "", max_len=280) or None
     source_refs.setdefault("memory_kind", memory_kind)
-    source_refs.setdefault("memory_router_reason", str(route.get("reason") or ""))
-    source_refs.setdefault("memory_router_confidence", float(route.get("confidence") or 0.0))
+    if route:
+        source_refs.setdefault("memory_router_reason", str(routed.get("reason") or ""))
+        source_refs.setdefault("memory_router_confidence", float(routed.get("confidence") or 0.0))
     if memory_slot:
         source_refs.setdefault("memory_slot", memory_slot)
     if memory_value:
         source_refs.setdefault("memory_value", memory_value)
     source_refs = apply_scope_to_source_refs(source_refs, scope)
-    created_at_dt = now_utc()
-    created_at = created_at_dt.isoformat()
-    importance = clamp_float(importance, default=0.5)
-    confidence = clamp_float(confidence, default=0.7)
+    created_at_dt = (parse_iso(created_at) or now_utc()).astimezone(timezone.utc)
+    # Stored in UTC so maintenance can compare the ISO strings in SQL.
     expiry = parse_iso(expires_at)
-    expires_at = expiry.isoformat() if expiry else default_expiry(memory_type, created_at_dt)
     pin_dt = parse_iso(pinned_until)
-    pinned_until = pin_dt.isoformat() if pin_dt else None
-
-    with get_conn() as conn:
-        cur = conn.cursor()
-        inserted = False
-        if conn.is_sqlite:
-            try:
-                cur.execute(
-                    "INSERT INTO memory_items (memory_id, memory_type, text, topics, entities, source_refs, "
-                    "importance, confidence, access_count, last_accessed_at, expires_at, pinned_until, created_at) "
-                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, 0, ?, ?, ?, CURRENT_TIMESTAMP)",
-                    (
-                        memory_id,
-                        memory_type,
-                        text,
-                        _json_dumps(topics),
-                        _json_dumps(entities),
-                        _json_dumps(source_refs),
-                        importance,
-                        confidence,
-                        created_at,
-                        expires_at,
-                        pinned_until,
-                    ),
-                )
-                inserted = True
-            except Exception:
-                inserted = False
-            if not inserted:
-                cur.execute(
-                    "INSERT INTO memory_items (memory_id, memory_type, text, topics, entities, source_refs, created_at) "
-                    "VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)",
-                    (
-                        memory_id,
-                        memory_type,
-                        text,
-                        _json_dumps(topics),
-                        _json_dumps(entities),
-                        _json_dumps(source_refs),
-                    ),
-                )
-        else:
-            try:
-                cur.execute(
-                    "INSERT INTO memory_items (memory_id, memory_type, text, topics, entities, source_refs, "
-                    "importance, confidence, access_count, last_accessed_at, expires_at, pinned_until, created_at) "
-                    "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, 0, %s, %s, %s, now())",
-                    (
-                        memory_id,
-                        memory_type,
-                        text,
-                        _json_dumps(topics),
-                        _json_dumps(entities),
-                        _json_dumps(source_refs),
-                        importance,
-                        confidence,
-                        created_at,
-                        expires_at,
-                        pinned_until,
-                    ),
-                )
-                inserted = True
-            except Exception:
-                inserted = False
-            if not inserted:
-                cur.execute(
-                    "INSERT INTO memory_items (memory_id, memory_type, text, topics, entities, source_refs, created_at) "
-                    "VALUES (%s, %s, %s, %s, %s, %s, now())",
-                    (
-                        memory_id,
-                        memory_type,
-                        text,
-                        _json_dumps(topics),
-                        _json_dumps(entities),
-                        _json_dumps(source_refs),
-                    ),
-                )
-        conn.commit()
-
-    superseded_count = 0
-    superseded_ids: List[str] = []
-    if overwrite_conflicts and memory_slot and memory_value:
-        supersede_result = _supersede_conflicting_memories(
-            memory_id=memory_id,
-            memory_slot=memory_slot,
-            memory_value=memory_value,
-            memory_kind=memory_kind,
-            scope=scope,
-        )
-        superseded_count = int(supersede_result.get("count") or 0)
-        superseded_ids = [str(x) for x in supersede_result.get("superseded_ids") or [] if str(x).strip()]
-
-    receipt = {
-        "memory_id": memory_id,
+    accessed_dt = parse_iso(last_accessed_at)
+    try:
+        access_count = max(0, int(access_count or 0))
+    except (TypeError, ValueError):
+        access_count = 0
+    return {
+        "memory_id": str(memory_id or "").strip() or str(uuid.uuid4()),
         "memory_type": memory_type,
+        "text": text,
+        "topics": topics,
+        "entities": entities,
+        "source_refs": source_refs,
+        "importance": clamp_float(importance, default=0.5),
+        "confidence": clamp_float(confidence, default=0.7),
+        "created_at": created_at_dt.isoformat(),
+        "access_count": access_count,
+        "last_accessed_at": accessed_dt.astimezone(timezone.utc).isoformat() if accessed_dt else created_at_dt.isoformat(),
+        "expires_at": expiry.astimezone(timezone.utc).isoformat() if expiry else default_expiry(memory_type, created_at_dt),
+        "pinned_until": pin_dt.astimezone(timezone.utc).isoformat() if pin_dt else None,
         "memory_kind": memory_kind,
-        "superseded_count": superseded_count,
-        "superseded_ids": superseded_ids,
-        "published": False,
-        "error": None,
+        "memory_slot": memory_slot,
+        "memory_value": memory_value,
+        # Same scope recall/maintenance would read back from source_refs, as indexed columns.
+        "stored_scope": scope_from_source_refs(source_refs),
+        "publish_long_term": bool(publish_long_term),
+        "overwrite_conflicts": bool(overwrite_conflicts),
     }
 
-    run_id = log_run(
-        lane="io",
-        component="memory_write",
-        input_json={"memory_id": memory_id, "memory_type": memory_type},
-    )
 
-    if publish_long_term:
-        row = {
-            "memory_id": memory_id,
-            "category": memory_type,
-            "text": text,
-            "topics": topics,
-            "entities": entities,
-            "source_refs": source_refs,
-            "created_at": created_at,
-        }
-        sql = merge_memory_sql([row])
-        try:
-            client = SnowflakeClient()
-            client.execute_sql(sql)
-            receipt["published"] = True
-        except Exception as exc:
-            receipt["error"] = str(exc)
-            receipt["sql"] = sql
-
-    log_run(
-        lane="io",
-        component="memory_write",
-        input_json={"run_id": run_id},
-        output_json=receipt,
-        error=receipt.get("error"),
-    )
-
-    return receipt
+def _insert_memories(conn: ConnWrapper, prepared: List[Dict[str, Any]]) -> None:
+    cur = conn.cursor()
+    ph = "?" if conn.is_sqlite else "%s"
+    rows = []
+    for memory in prepared:
+        scope = memory["stored_scope"]
+        rows.append(
+            (
+                memory["memory_id"],
+                memory["memory_type"],
+                memory["text"],
+                _json_dumps(memory["topics"]),
+                _json_dumps(memory["entities"]),
+                _json_dumps(memory["source_refs"]),
+                memory["created_at"],
+                memory["importance"],
+                memory["confidence"],
+                memory["access_count"],
+                memory["last_accessed_at"],
+                memory["expires_at"],
+                memory["pinned_until"],
+                scope.get("user_id"),
+                scope.get("project_id"),
+                scope.get("session_id"),
+                memory["memory_kind"],
+                memory["memory_slot"],
+                str(memory["source_refs"].get("kind") or "") or None,
+                str(memory["source_refs"].get("superseded_by") or "") or None,
+                len(memory["source_refs"].get("supersedes") or []),
+                # Feedback counters memory_stats sums.
+                *feedback_counts(memory["source_refs"]),
+            )
+        )
+    try:
+        cur.executemany(
+            "INSERT INTO memory_items (memory_id, memory_type, text, topics, entities, source_refs, created_at, "
+            "importance, confidence, access_count, last_accessed_at, expires_at, pinned_until, "
+            "user_id, project_id, session_id, memory_kind, memory_slot, kind, superseded_by, supersedes_count, "
+            "signal_count, cited_count, missed_count) "
+            f"VALUES ({', '.join([ph] * 24)})",
+            rows,
+        )
+    except Exception:
+        # Older schemas without the policy columns.
+        if not conn.is_sqlite:
+            conn.rollback()
+        cur.executemany(
+            "INSERT INTO memory_items (memory_id, memory_type, text, topics, entities, source_refs, created_at) "
+            f"VALUES ({', '.join([ph] * 7)})",
+            [row[:7] for row in rows],
+        )
 
 
 def _json_dumps(value: object) -> str:
@@ -230,107 +342,87 @@ def _json_loads(value: object) -> object:
 
 
 def _supersede_conflicting_memories(
+    conn: ConnWrapper,
     memory_id: str,
+    scope: Dict[str, str],
+    memory_kind: str,
     memory_slot: str,
     memory_value: str,
-    memory_kind: str,
-    scope: Dict[str, str],
 ) -> Dict[str, object]:
-    like_pattern = f'%\"memory_slot\"%{memory_slot}%'
+    """Mark every live holder of the slot with another value superseded by `memory_id`, inside the caller's transaction.
+
+    Holders are matched with `scope_matches` semantics: every scope id the writer
+    sets must match, so a user-level overwrite also supersedes that user's
+    session-scoped holders, while a session-scoped one stays inside its session.
+    """
     updates: List[tuple[str, str]] = []
     superseded_ids: List[str] = []
     new_timeline_events: List[Dict[str, object]] = []
     now = now_iso()
     reason_code = SUPERSEDE_REASON_SLOT_VALUE_CONFLICT
-    with get_conn() as conn:
-        cur = conn.cursor()
-        if conn.is_sqlite:
-            cur.execute(
-                "SELECT memory_id, source_refs FROM memory_items "
-                "WHERE memory_id <> ? AND source_refs LIKE ? ORDER BY created_at DESC LIMIT 60",
-                (memory_id, like_pattern),
-            )
-        else:
-            cur.execute(
-                "SELECT memory_id, source_refs FROM memory_items "
-                "WHERE memory_id <> %s AND CAST(source_refs AS TEXT) ILIKE %s ORDER BY created_at DESC LIMIT 60",
-                (memory_id, like_pattern),
-            )
+    cur = conn.cursor()
+    ph = "?" if conn.is_sqlite else "%s"
+    clauses, scope_params = scope_where(scope, ph)
+    scope_sql = "".join(f" AND {clause}" for clause in clauses)
+    cur.execute(
+        "SELECT memory_id, source_refs FROM memory_items "
+        f"WHERE memory_slot = {ph} AND COALESCE(memory_kind, 'semantic') = {ph}{scope_sql} "
+        f"AND memory_id <> {ph} AND COALESCE(superseded_by, '') = '' ORDER BY created_at, memory_id",
+        (memory_slot, memory_kind, *scope_params, memory_id),
+    )
 
-        rows = cur.fetchall()
-        for row in rows:
-            old_id = str(row[0] or "")
-            refs = _json_loads(row[1]) or {}
-            if not isinstance(refs, dict):
-                continue
-            if str(refs.get("memory_slot") or "") != memory_slot:
-                continue
-            if str(refs.get("memory_kind") or "semantic") != memory_kind:
-                continue
-            if not scope_matches(refs, scope):
-                continue
-            previous_value = normalize_text(refs.get("memory_value") or "", max_len=280)
-            if not previous_value or previous_value == memory_value:
-                continue
-            refs["superseded_by"] = memory_id
-            refs["superseded_at"] = now
-            refs["supersede_reason_code"] = reason_code
-            _append_revision_event(
-                refs,
-                {
-                    "event": "superseded",
-                    "at": now,
-                    "reason_code": reason_code,
-                    "counterpart_memory_id": memory_id,
-                    "memory_slot": memory_slot,
-                    "previous_value": previous_value,
-                    "new_value": memory_value,
-                },
-            )
-            updates.append((old_id, _json_dumps(refs)))
-            superseded_ids.append(old_id)
-            new_timeline_events.append(
-                {
-                    "event": "supersedes",
-                    "at": now,
-                    "reason_code": reason_code,
-                    "counterpart_memory_id": old_id,
-                    "memory_slot": memory_slot,
-                    "previous_value": previous_value,
-                    "new_value": memory_value,
-                }
-            )
+    for row in cur.fetchall():
+        old_id = str(row[0] or "")
+        refs = _json_loads(row[1]) or {}
+        if not isinstance(refs, dict):
+            continue
+        previous_value = normalize_text(refs.get("memory_value") or "", max_len=280)
+        if not previous_value or previous_value == memory_value:
+            continue
+        refs["superseded_by"] = memory_id
+        refs["superseded_at"] = now
+        refs["supersede_reason_code"] = reason_code
+        _append_revision_event(
+            refs,
+            {
+                "event": "superseded",
+                "at": now,
+                "reason_code": reason_code,
+                "counterpart_memory_id": memory_id,
+                "memory_slot": memory_slot,
+                "previous_value": previous_value,
+                "new_value": memory_value,
+            },
+        )
+        updates.append((old_id, _json_dumps(refs)))
+        superseded_ids.append(old_id)
+        new_timeline_events.append(
+            {
+                "event": "supersedes",
+                "at": now,
+                "reason_code": reason_code,
+                "counterpart_memory_id": old_id,
+                "memory_slot": memory_slot,
+                "previous_value": previous_value,
+                "new_value": memory_value,
+            }
+        )
 
-        for old_id, refs_json in updates:
-            try:
-                if conn.is_sqlite:
-                    cur.execute(
-                        "UPDATE memory_items SET source_refs=?, expires_at=? WHERE memory_id=?",
-                        (refs_json, now, old_id),
-                    )
-                else:
-                    cur.execute(
-                        "UPDATE memory_items SET source_refs=%s, expires_at=%s WHERE memory_id=%s",
-                        (refs_json, now, old_id),
-                    )
-            except Exception:
-                # Older schemas may not have expires_at; keep supersede metadata anyway.
-                if conn.is_sqlite:
-                    cur.execute("UPDATE memory_items SET source_refs=? WHERE memory_id=?", (refs_json, old_id))
-                else:
-                    cur.execute("UPDATE memory_items SET source_refs=%s WHERE memory_id=%s", (refs_json, old_id))
-
-        if superseded_ids:
-            _update_new_memory_revision_trail(
-                conn=conn,
-                cur=cur,
-                memory_id=memory_id,
-                superseded_ids=superseded_ids,
-                reason_code=reason_code,
-                timeline_events=new_timeline_events,
-            )
-        if updates or superseded_ids:
-            conn.commit()
+    for old_id, refs_json in updates:
+        cur.execute(
+            f"UPDATE memory_items SET source_refs={ph}, expires_at={ph}, superseded_by={ph} WHERE memory_id={ph}",
+            (refs_json, now, memory_id, old_id),
+        )
+
+    if superseded_ids:
+        _update_new_memory_revision_trail(
+            conn=conn,
+            cur=cur,
+            memory_id=memory_id,
+            superseded_ids=superseded_ids,
+            reason_code=reason_code,
+            timeline_events=new_timeline_events,
+        )
     return {
         "count": len(updates),
         "superseded_ids": superseded_ids,
@@ -361,10 +453,17 @@ def _update_new_memory_revision_trail(
         _append_revision_event(refs, event, max_items=80)
 
     refs_json = _json_dumps(refs)
+    supersedes_count = len(refs.get("supersedes") or [])
     if conn.is_sqlite:
-        cur.execute("UPDATE memory_items SET source_refs=? WHERE memory_id=?", (refs_json, memory_id))
+        cur.execute(
+            "UPDATE memory_items SET source_refs=?, supersedes_count=? WHERE memory_id=?",
+            (refs_json, supersedes_count, memory_id),
+        )
     else:
-        cur.execute("UPDATE memory_items SET source_refs=%s WHERE memory_id=%s", (refs_json, memory_id))
+        cur.execute(
+            "UPDATE memory_items SET source_refs=%s, supersedes_count=%s WHERE memory_id=%s",
+            (refs_json, supersedes_count, memory_id),
+        )
 
 
 def _append_unique_strings(refs: Dict[str, object], key: str, values: List[str], max_items: int) -> None:
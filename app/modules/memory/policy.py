@@ -4,7 +4,7 @@ from __future__ import annotations
 
 import re
 from datetime import datetime, timedelta, timezone
-from typing import Iterable, List, Optional
+from typing import AbstractSet, Iterable, List, Optional
 
 
 TYPE_WEIGHT = {
@@ -90,11 +90,33 @@ def tokens(text: object) -> List[str]:
     return _TOKEN_RE.findall(str(text or "").lower())
 
 
+def token_set(text: object) -> List[str]:
+    """Sorted distinct tokens of `text`; the form stored next to chunks at ingest."""
+    return sorted(set(tokens(text)))
+
+
+def match_terms(raw: Iterable[str], limit: int = 32) -> List[str]:
+    """Distinct query terms safe to splice into an FTS5 MATCH / tsquery expression."""
+    out: List[str] = []
+    for term in raw:
+        # Tokens are [a-z0-9]-style words already; drop anything that could break MATCH/tsquery syntax.
+        cleaned = "".join(ch for ch in str(term) if ch.isalnum())
+        if cleaned and cleaned not in out:
+            out.append(cleaned)
+        if len(out) >= limit:
+            break
+    return out
+
+
 def overlap_score(query_tokens: List[str], text: object) -> float:
     if not query_tokens:
         return 0.0
-    haystack = set(tokens(text))
-    if not haystack:
+    return set_overlap_score(query_tokens, set(tokens(text)))
+
+
+def set_overlap_score(query_tokens: List[str], haystack: AbstractSet[str]) -> float:
+    """overlap_score against a precomputed token set, without re-tokenizing the text."""
+    if not query_tokens or not haystack:
         return 0.0
     hits = sum(1 for t in query_tokens if t in haystack)
     return hits / len(query_tokens)
@@ -4,14 +4,18 @@ from __future__ import annotations
 
 import json
 import math
+from datetime import datetime
 from typing import Any, Dict, List, Optional, Tuple
 
 from app.core.config import load_settings
 from app.core.textnorm import normalize_user_text
-from app.modules.memory.memory_write import write_memory
+from app.modules.memory.memory_write import write_memories
 from app.modules.memory.policy import now_utc, parse_iso, tokens
-from app.modules.memory.scope import normalize_scope, scope_matches
-from app.queue.db import get_conn
+from app.modules.memory.scope import SCOPE_KEYS, normalize_scope, scope_where
+from app.queue.db import ConnWrapper, get_conn
+
+# Union of query tokens kept per boost row (each feedback contributes at most 10).
+MAX_BOOST_QUERY_TOKENS = 30
 
 
 def record_retrieval_feedback(
@@ -67,27 +71,46 @@ def record_retrieval_feedback(
         f"Cited={cited_count}, missed={missed_count}, evidence_considered={len(signals)}. "
         f"Answer snapshot: {normalize_user_text(answer_text, max_len=220)}"
     )
-    receipt = write_memory(
-        memory_type="working",
-        text=summary,
-        topics=["retrieval_feedback"] + query_tokens[:3],
-        entities=[],
-        source_refs={
-            "kind": "retrieval_feedback",
-            "query": q,
-            "query_tokens": query_tokens,
-            "query_cluster": query_cluster,
-            "signals": signals,
-            "cited_count": cited_count,
-            "missed_count": missed_count,
-        },
-        importance=0.58 + (0.22 * ratio),
-        confidence=0.72,
-        publish_long_term=False,
-        memory_kind="procedural",
-        user_id=scope.get("user_id"),
-        project_id=scope.get("project_id"),
-        session_id=scope.get("session_id"),
+    half_life_hours = float(settings.retrieval_feedback_decay_half_life_hours)
+
+    def update_boosts(conn: ConnWrapper) -> None:
+        # Same transaction as the feedback memory, so a replay from memories never double counts.
+        _update_boosts(
+            conn,
+            scope=scope,
+            query_cluster=query_cluster,
+            query_tokens=query_tokens,
+            signals=signals,
+            at=now_utc(),
+            half_life_hours=half_life_hours,
+        )
+
+    [receipt] = write_memories(
+        [
+            {
+                "memory_type": "working",
+                "text": summary,
+                "topics": ["retrieval_feedback"] + query_tokens[:3],
+                "entities": [],
+                "source_refs": {
+                    "kind": "retrieval_feedback",
+                    "query": q,
+                    "query_tokens": query_tokens,
+                    "query_cluster": query_cluster,
+                    "signals": signals,
+                    "cited_count": cited_count,
+                    "missed_count": missed_count,
+                },
+                "importance": 0.58 + (0.22 * ratio),
+                "confidence": 0.72,
+                "publish_long_term": False,
+                "memory_kind": "procedural",
+                "user_id": scope.get("user_id"),
+                "project_id": scope.get("project_id"),
+                "session_id": scope.get("session_id"),
+            }
+        ],
+        before_commit=update_boosts,
     )
     return {
         "memory_id": receipt.get("memory_id"),
@@ -103,69 +126,54 @@ def apply_retrieval_feedback(
     user_id: Optional[str] = None,
     project_id: Optional[str] = None,
     session_id: Optional[str] = None,
+    query_tokens: Optional[List[str]] = None,
+    scale: float = 1.0,
 ) -> None:
+    """Add decayed cited/missed boosts to `final_score`; `scale` matches them to the fusion method's score spread."""
     settings = load_settings()
     if not settings.memory_enabled or not settings.retrieval_feedback_enabled:
         return
     if not rows:
         return
 
-    q_tokens = tokens(query)
+    q_tokens = list(query_tokens) if query_tokens is not None else tokens(query)
     if not q_tokens:
         return
 
+    doc_ids = sorted({str(row.get("doc_id") or "").strip() for row in rows} - {""})
+    if not doc_ids:
+        return
     scope = normalize_scope(user_id=user_id, project_id=project_id, session_id=session_id)
-    feedback_items = _load_feedback_items(
-        limit=max(1, int(settings.retrieval_feedback_history_limit)),
-        scope=scope,
-    )
-    if not feedback_items:
+    boosts = _load_boosts(doc_ids, scope)
+    if not boosts:
         return
 
     by_segment: Dict[Tuple[str, str], float] = {}
     by_doc: Dict[str, float] = {}
     min_overlap = max(0.0, float(settings.retrieval_feedback_min_token_overlap))
-    cluster_cap = max(1, int(settings.retrieval_feedback_cluster_cap))
-    cluster_counts: Dict[str, int] = {}
-    for item in feedback_items:
-        refs = item.get("source_refs") if isinstance(item.get("source_refs"), dict) else {}
-        query_tokens = refs.get("query_tokens") if isinstance(refs, dict) else []
-        if not isinstance(query_tokens, list):
-            continue
-        overlap = _token_overlap(q_tokens, [str(tok) for tok in query_tokens])
+    cluster_cap = float(max(1, int(settings.retrieval_feedback_cluster_cap)))
+    half_life_hours = float(settings.retrieval_feedback_decay_half_life_hours)
+    for boost in boosts:
+        overlap = _token_overlap(q_tokens, boost["query_tokens"])
         if overlap < min_overlap:
             continue
-        cluster = _query_cluster_key(query_tokens)
-        if cluster_counts.get(cluster, 0) >= cluster_cap:
-            continue
-        decay_weight = _decay_weight(
-            created_at=item.get("created_at"),
-            half_life_hours=float(settings.retrieval_feedback_decay_half_life_hours),
-        )
+        decay_weight = _decay_weight(created_at=boost["updated_at"], half_life_hours=half_life_hours)
         if decay_weight <= 0.0:
             continue
-        signals = refs.get("signals") if isinstance(refs, dict) else []
-        if not isinstance(signals, list):
-            continue
-        cluster_counts[cluster] = cluster_counts.get(cluster, 0) + 1
-        for signal in signals:
-            if not isinstance(signal, dict):
-                continue
-            doc_id = str(signal.get("doc_id") or "").strip()
-            segment_id = str(signal.get("segment_id") or "").strip()
-            if not doc_id:
-                continue
-            outcome = str(signal.get("outcome") or "").strip().lower()
-            if outcome == "cited":
-                delta = float(settings.retrieval_feedback_cited_boost) * overlap * decay_weight
-            elif outcome == "missed":
-                delta = -float(settings.retrieval_feedback_missed_penalty) * overlap * decay_weight
-            else:
-                continue
-            if segment_id:
-                key = (doc_id, segment_id)
-                by_segment[key] = by_segment.get(key, 0.0) + delta
-            by_doc[doc_id] = by_doc.get(doc_id, 0.0) + (0.5 * delta)
+        # Every feedback adds at most 1 per outcome, so the cap bounds how many answers of one
+        # query cluster can move a segment.
+        cited = min(cluster_cap, boost["cited_weight"] * decay_weight)
+        missed = min(cluster_cap, boost["missed_weight"] * decay_weight)
+        delta = (
+            float(settings.retrieval_feedback_cited_boost) * cited
+            - float(settings.retrieval_feedback_missed_penalty) * missed
+        ) * overlap * scale
+        doc_id = boost["doc_id"]
+        segment_id = boost["segment_id"]
+        if segment_id:
+            key = (doc_id, segment_id)
+            by_segment[key] = by_segment.get(key, 0.0) + delta
+        by_doc[doc_id] = by_doc.get(doc_id, 0.0) + (0.5 * delta)
 
     if not by_segment and not by_doc:
         return
@@ -183,39 +191,145 @@ def apply_retrieval_feedback(
         row["final_score"] = round(max(0.0, base + boost), 6)
 
 
-def _load_feedback_items(limit: int, scope: Dict[str, str]) -> List[Dict[str, object]]:
-    like_pattern = '%"kind"%retrieval_feedback%'
-    fetch_limit = max(limit, limit * 4)
-    with get_conn() as conn:
-        cur = conn.cursor()
-        if conn.is_sqlite:
-            cur.execute(
-                "SELECT source_refs, created_at FROM memory_items "
-                "WHERE memory_type=? AND source_refs LIKE ? "
-                "ORDER BY created_at DESC LIMIT ?",
-                ("working", like_pattern, fetch_limit),
-            )
-        else:
-            cur.execute(
-                "SELECT source_refs, created_at FROM memory_items "
-                "WHERE memory_type=%s AND CAST(source_refs AS TEXT) ILIKE %s "
-                "ORDER BY created_at DESC LIMIT %s",
-                ("working", like_pattern, fetch_limit),
-            )
-        rows = cur.fetchall()
-
-    out: List[Dict[str, object]] = []
+def backfill_retrieval_boosts(conn: Optional[ConnWrapper] = None) -> int:
+    """Replay stored feedback memories into an empty retrieval_boosts table; returns the number replayed."""
+    if conn is None:
+        with get_conn() as own:
+            return backfill_retrieval_boosts(own)
+    settings = load_settings()
+    cur = conn.cursor()
+    ph = "?" if conn.is_sqlite else "%s"
+    cur.execute("SELECT 1 FROM retrieval_boosts LIMIT 1")
+    if cur.fetchone() is not None:
+        return 0
+    cur.execute(
+        "SELECT source_refs, created_at, user_id, project_id, session_id FROM memory_items "
+        f"WHERE kind={ph} ORDER BY created_at",
+        ("retrieval_feedback",),
+    )
+    rows = cur.fetchall()
+    replayed = 0
     for row in rows:
         refs = _json_loads(row[0]) or {}
-        if not isinstance(refs, dict):
+        if not isinstance(refs, dict) or not isinstance(refs.get("signals"), list):
             continue
-        if str(refs.get("kind") or "") != "retrieval_feedback":
+        query_tokens = [str(tok) for tok in refs.get("query_tokens") or []]
+        _update_boosts(
+            conn,
+            scope={key: str(value) for key, value in zip(SCOPE_KEYS, tuple(row)[2:5]) if value},
+            query_cluster=str(refs.get("query_cluster") or _query_cluster_key(query_tokens)),
+            query_tokens=query_tokens,
+            signals=refs["signals"],
+            at=parse_iso(row[1]) or now_utc(),
+            half_life_hours=float(settings.retrieval_feedback_decay_half_life_hours),
+        )
+        replayed += 1
+    conn.commit()
+    return replayed
+
+
+def prune_retrieval_boosts(cutoff: str, scope: Dict[str, str]) -> int:
+    """Drop boosts whose last feedback is older than `cutoff` (the feedback retention window)."""
+    with get_conn() as conn:
+        cur = conn.cursor()
+        ph = "?" if conn.is_sqlite else "%s"
+        clauses, params = scope_where(scope, ph)
+        scope_sql = "".join(f" AND {clause}" for clause in clauses)
+        cur.execute(f"DELETE FROM retrieval_boosts WHERE updated_at < {ph}{scope_sql}", tuple([cutoff] + params))
+        deleted = int(cur.rowcount or 0)
+        conn.commit()
+    return max(0, deleted)
+
+
+def _update_boosts(
+    conn: ConnWrapper,
+    scope: Dict[str, str],
+    query_cluster: str,
+    query_tokens: List[str],
+    signals: List[Dict[str, object]],
+    at: datetime,
+    half_life_hours: float,
+) -> None:
+    """Decay each touched (scope, cluster, segment) weight to `at`, then add this feedback's outcomes."""
+    events: Dict[Tuple[str, str], Tuple[float, float]] = {}
+    for signal in signals:
+        if not isinstance(signal, dict):
             continue
-        if not scope_matches(refs, scope):
+        doc_id = str(signal.get("doc_id") or "").strip()
+        outcome = str(signal.get("outcome") or "").strip().lower()
+        if not doc_id or outcome not in {"cited", "missed"}:
             continue
-        out.append({"source_refs": refs, "created_at": row[1]})
-        if len(out) >= limit:
-            break
+        key = (doc_id, str(signal.get("segment_id") or "").strip())
+        cited, missed = events.get(key, (0.0, 0.0))
+        events[key] = (cited + (outcome == "cited"), missed + (outcome == "missed"))
+    if not events:
+        return
+
+    scope_key = [str(scope.get(key) or "") for key in SCOPE_KEYS]
+    doc_ids = sorted({doc_id for doc_id, _segment_id in events})
+    cur = conn.cursor()
+    ph = "?" if conn.is_sqlite else "%s"
+    cur.execute(
+        "SELECT doc_id, segment_id, cited_weight, missed_weight, updated_at, query_tokens FROM retrieval_boosts "
+        f"WHERE user_id={ph} AND project_id={ph} AND session_id={ph} AND query_cluster={ph} "
+        f"AND doc_id IN ({', '.join([ph] * len(doc_ids))})",
+        tuple(scope_key + [query_cluster] + doc_ids),
+    )
+    existing = {
+        (str(row[0]), str(row[1])): (float(row[2] or 0.0), float(row[3] or 0.0), row[4], _parse_tokens(row[5]))
+        for row in cur.fetchall()
+    }
+
+    values = []
+    for (doc_id, segment_id), (cited, missed) in events.items():
+        old_cited, old_missed, old_at, old_tokens = existing.get((doc_id, segment_id), (0.0, 0.0, None, []))
+        decay = _decay_weight(old_at, half_life_hours, now=at) if old_at is not None else 0.0
+        # Every query of the cluster that touched the segment keeps matching; the newest tokens come first.
+        merged = list(dict.fromkeys(list(query_tokens) + old_tokens))[:MAX_BOOST_QUERY_TOKENS]
+        values.append(
+            tuple(scope_key)
+            + (query_cluster, doc_id, segment_id, json.dumps(merged, ensure_ascii=True))
+            + (old_cited * decay + cited, old_missed * decay + missed, at.isoformat())
+        )
+    cur.executemany(
+        "INSERT INTO retrieval_boosts (user_id, project_id, session_id, query_cluster, doc_id, segment_id, "
+        f"query_tokens, cited_weight, missed_weight, updated_at) VALUES ({', '.join([ph] * 10)}) "
+        "ON CONFLICT (user_id, project_id, session_id, query_cluster, doc_id, segment_id) DO UPDATE SET "
+        "query_tokens=excluded.query_tokens, cited_weight=excluded.cited_weight, "
+        "missed_weight=excluded.missed_weight, updated_at=excluded.updated_at",
+        values,
+    )
+
+
+def _load_boosts(doc_ids: List[str], scope: Dict[str, str]) -> List[Dict[str, Any]]:
+    with get_conn() as conn:
+        cur = conn.cursor()
+        ph = "?" if conn.is_sqlite else "%s"
+        clauses, params = scope_where(scope, ph)
+        scope_sql = "".join(f" AND {clause}" for clause in clauses)
+        cur.execute(
+            "SELECT query_tokens, doc_id, segment_id, cited_weight, missed_weight, updated_at FROM retrieval_boosts "
+            f"WHERE doc_id IN ({', '.join([ph] * len(doc_ids))}){scope_sql}",
+            tuple(list(doc_ids) + params),
+        )
+        rows = cur.fetchall()
+
+    parsed_tokens: Dict[str, List[str]] = {}
+    out: List[Dict[str, Any]] = []
+    for row in rows:
+        raw = row[0] if isinstance(row[0], str) else json.dumps(row[0])
+        if raw not in parsed_tokens:
+            parsed_tokens[raw] = _parse_tokens(row[0])
+        out.append(
+            {
+                "query_tokens": parsed_tokens[raw],
+                "doc_id": str(row[1]),
+                "segment_id": str(row[2] or ""),
+                "cited_weight": float(row[3] or 0.0),
+                "missed_weight": float(row[4] or 0.0),
+                "updated_at": row[5],
+            }
+        )
     return out
 
 
@@ -259,18 +373,23 @@ def _query_cluster_key(query_tokens: List[str]) -> str:
     return "|".join(cleaned[:4])
 
 
-def _decay_weight(created_at: object, half_life_hours: float) -> float:
+def _decay_weight(created_at: object, half_life_hours: float, now: Optional[datetime] = None) -> float:
     if half_life_hours <= 0.0:
         return 1.0
     created_dt = parse_iso(created_at)
     if created_dt is None:
         return 1.0
-    age_hours = max(0.0, (now_utc() - created_dt).total_seconds() / 3600.0)
+    age_hours = max(0.0, ((now or now_utc()) - created_dt).total_seconds() / 3600.0)
     if age_hours <= 0.0:
         return 1.0
     return math.pow(0.5, age_hours / half_life_hours)
 
 
+def _parse_tokens(value: object) -> List[str]:
+    loaded = _json_loads(value)
+    return [str(tok) for tok in loaded] if isinstance(loaded, list) else []
+
+
 def _json_loads(value: object) -> object:
     if value is None:
         return None
@@ -64,6 +64,15 @@ _MY_SLOT_SV_RE = re.compile(
 _PREFERENCE_RE = re.compile(r"\bi\s+(?:prefer|like|love)\s+(?P<value>.+)$", re.IGNORECASE)
 _PREFERENCE_SV_RE = re.compile(r"\bjag\s+(?:föredrar|gillar|älskar)\s+(?P<value>.+)$", re.IGNORECASE)
 _DEFAULT_RE = re.compile(r"\bdefault\s+(?P<slot>[a-z0-9 _-]{2,40})\s*(?:is|=)\s*(?P<value>.+)$", re.IGNORECASE)
+_SLOT_QUESTION_RE = re.compile(
+    r"\bwhat(?:\s+is|'s)\s+my\s+(?P<slot>[a-z0-9 _-]{2,40}?)\s*\??$",
+    re.IGNORECASE,
+)
+_SLOT_QUESTION_SV_RE = re.compile(
+    r"\bvad\s+är\s+(?:min|mitt|mina)\s+(?P<slot>[a-z0-9åäö _-]{2,40}?)\s*\??$",
+    re.IGNORECASE,
+)
+_PREFERENCE_QUESTION_RE = re.compile(r"\b(?:what\s+do\s+i\s+(?:prefer|like)|vad\s+föredrar\s+jag)\b", re.IGNORECASE)
 
 
 def normalize_memory_kind(value: object, default: str = "semantic") -> str:
@@ -94,6 +103,20 @@ def parse_explicit_remember(question: object) -> Optional[Dict[str, Optional[str
     return {"text": rest, "memory_kind": None}
 
 
+def parse_slot_question(question: object) -> Optional[str]:
+    """Slot asked about by "what is my X?" / "vad är min X?", normalized like written slots."""
+    text = normalize_user_text(question, max_len=400)
+    if not text:
+        return None
+    for pattern in (_SLOT_QUESTION_RE, _SLOT_QUESTION_SV_RE):
+        match = pattern.search(text)
+        if match:
+            return _normalize_slot(match.group("slot"))
+    if _PREFERENCE_QUESTION_RE.search(text):
+        return "preference"
+    return None
+
+
 def route_memory(
     text: object,
     memory_type_hint: Optional[str] = None,
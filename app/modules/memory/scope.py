@@ -2,7 +2,7 @@
 
 from __future__ import annotations
 
-from typing import Dict
+from typing import Dict, List, Tuple
 
 from app.core.textnorm import normalize_identifier
 
@@ -68,3 +68,16 @@ def scope_matches(source_refs: object, scope: Dict[str, str]) -> bool:
         if item_scope.get(key) != value:
             return False
     return True
+
+
+def scope_where(scope: Dict[str, str], placeholder: str, alias: str = "") -> Tuple[List[str], List[object]]:
+    """SQL predicates on the memory_items scope columns with `scope_matches` semantics."""
+    prefix = f"{alias}." if alias else ""
+    clauses: List[str] = []
+    params: List[object] = []
+    for key in SCOPE_KEYS:
+        value = scope.get(key) if scope else None
+        if value:
+            clauses.append(f"{prefix}{key} = {placeholder}")
+            params.append(value)
+    return clauses, params
@@ -0,0 +1,88 @@
+"""Current-value index for slotted memories ("my editor is ...").
+
+`memory_slots` maps (scope, memory_kind, memory_slot) to the memory that currently
+holds the slot. `write_memory` moves the pointer in the same transaction as the
+insert, so reading the current value is a primary-key lookup. Writes without
+`overwrite_conflicts` leave earlier holders live, so an overwrite supersedes them
+through the indexed memory_slot column rather than through the pointer.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, List, Optional
+
+from app.modules.memory.policy import now_iso
+from app.modules.memory.scope import SCOPE_KEYS
+from app.queue.db import ConnWrapper, get_conn
+
+
+def current_slot(
+    conn: ConnWrapper,
+    scope: Dict[str, str],
+    memory_kind: str,
+    memory_slot: str,
+) -> Optional[Dict[str, str]]:
+    cur = conn.cursor()
+    ph = "?" if conn.is_sqlite else "%s"
+    cur.execute(
+        "SELECT memory_id, memory_value, updated_at FROM memory_slots "
+        f"WHERE user_id={ph} AND project_id={ph} AND session_id={ph} AND memory_kind={ph} AND memory_slot={ph}",
+        tuple(_scope_key(scope) + [memory_kind, memory_slot]),
+    )
+    row = cur.fetchone()
+    if row is None:
+        return None
+    return {
+        "memory_id": str(row[0]),
+        "memory_slot": memory_slot,
+        "memory_kind": memory_kind,
+        "memory_value": str(row[1] or ""),
+        "updated_at": str(row[2] or ""),
+    }
+
+
+def set_current_slot(
+    conn: ConnWrapper,
+    scope: Dict[str, str],
+    memory_kind: str,
+    memory_slot: str,
+    memory_id: str,
+    memory_value: str,
+    created_at: Optional[str] = None,
+) -> Optional[Dict[str, str]]:
+    """Point the slot at `memory_id` inside the caller's transaction; returns the previous holder.
+
+    With `created_at`, a holder created later keeps the slot (an imported older
+    memory must not displace a newer local value).
+    """
+    previous = current_slot(conn, scope, memory_kind, memory_slot)
+    cur = conn.cursor()
+    ph = "?" if conn.is_sqlite else "%s"
+    if previous and created_at and previous["memory_id"] != memory_id:
+        cur.execute(
+            f"SELECT 1 FROM memory_items WHERE memory_id = {ph} AND created_at > {ph}",
+            (previous["memory_id"], created_at),
+        )
+        if cur.fetchone() is not None:
+            return previous
+    cur.execute(
+        "INSERT INTO memory_slots (user_id, project_id, session_id, memory_kind, memory_slot, memory_id, memory_value, updated_at) "
+        f"VALUES ({', '.join([ph] * 8)}) "
+        "ON CONFLICT (user_id, project_id, session_id, memory_kind, memory_slot) DO UPDATE SET "
+        "memory_id=excluded.memory_id, memory_value=excluded.memory_value, updated_at=excluded.updated_at",
+        tuple(_scope_key(scope) + [memory_kind, memory_slot, memory_id, memory_value, now_iso()]),
+    )
+    return previous
+
+
+def lookup_slot(
+    memory_slot: str,
+    scope: Dict[str, str],
+    memory_kind: str = "semantic",
+) -> Optional[Dict[str, str]]:
+    with get_conn() as conn:
+        return current_slot(conn, scope, memory_kind, memory_slot)
+
+
+def _scope_key(scope: Dict[str, str]) -> List[str]:
+    return [str((scope or {}).get(key) or "") for key in SCOPE_KEYS]
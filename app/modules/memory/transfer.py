@@ -0,0 +1,215 @@
+"""Streaming JSONL export/import of memory_items.
+
+Export walks memory_items in (created_at, memory_id) order through a server-side
+cursor, one JSON object per line, so memory use stays flat however large the table
+is; `after` resumes behind the last exported memory_id. Import reads lines lazily
+and writes them through `write_memories` one committed batch at a time, keeping
+memory ids, timestamps and access counters; an imported slot value only becomes
+current when it is newer than the local holder. `skip_lines` resumes behind the
+last committed batch.
+"""
+
+from __future__ import annotations
+
+import json
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, TextIO
+
+from app.modules.memory.memory_write import write_memories
+from app.modules.memory.policy import normalize_memory_type
+from app.modules.memory.scope import normalize_scope, scope_where
+from app.queue.db import get_conn
+
+
+EXPORT_PAGE_SIZE = 1000
+IMPORT_BATCH_SIZE = 500
+EXPORT_COLUMNS = (
+    "memory_id",
+    "memory_type",
+    "text",
+    "topics",
+    "entities",
+    "source_refs",
+    "importance",
+    "confidence",
+    "expires_at",
+    "pinned_until",
+    "created_at",
+    "access_count",
+    "last_accessed_at",
+    "user_id",
+    "project_id",
+    "session_id",
+    "memory_kind",
+    "memory_slot",
+)
+_JSON_COLUMNS = {"topics", "entities", "source_refs"}
+
+
+def export_memories(
+    out: TextIO,
+    after: Optional[str] = None,
+    page_size: int = EXPORT_PAGE_SIZE,
+    user_id: Optional[str] = None,
+    project_id: Optional[str] = None,
+    session_id: Optional[str] = None,
+) -> Dict[str, object]:
+    """Write memory_items to `out` as JSONL, oldest first; returns counts and the resume id."""
+    scope = normalize_scope(user_id=user_id, project_id=project_id, session_id=session_id)
+    exported = 0
+    last_id: Optional[str] = None
+    with get_conn() as conn:
+        ph = "?" if conn.is_sqlite else "%s"
+        clauses, params = scope_where(scope, ph)
+        if after:
+            cur = conn.cursor()
+            cur.execute(f"SELECT created_at FROM memory_items WHERE memory_id = {ph}", (after,))
+            row = cur.fetchone()
+            if row is None:
+                raise ValueError(f"Unknown memory_id to resume after: {after}")
+            clauses.append(f"(created_at > {ph} OR (created_at = {ph} AND memory_id > {ph}))")
+            params.extend([row[0], row[0], after])
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        # Server-side cursor on Postgres so pages are not all buffered client-side.
+        cur = conn.cursor(name="memory_export")
+        cur.execute(
+            f"SELECT {', '.join(EXPORT_COLUMNS)} FROM memory_items{where} ORDER BY created_at, memory_id",
+            tuple(params),
+        )
+        while True:
+            page = cur.fetchmany(max(1, int(page_size)))
+            if not page:
+                break
+            for row in page:
+                record = _record_from_row(row)
+                out.write(json.dumps(record, ensure_ascii=True, sort_keys=True) + "\n")
+                last_id = str(record["memory_id"])
+                exported += 1
+    return {"exported": exported, "last_memory_id": last_id}
+
+
+def import_memories(
+    lines: Iterable[str],
+    skip_lines: int = 0,
+    batch_size: int = IMPORT_BATCH_SIZE,
+    route: bool = True,
+    embed: bool = True,
+    on_batch: Optional[Callable[[int], None]] = None,
+) -> Dict[str, object]:
+    """Write exported JSONL through `write_memories` in committed batches.
+
+    Lines up to `skip_lines` are skipped and memory_ids already stored are left
+    alone, so a rerun is idempotent. `on_batch` receives the number of input lines
+    covered by each committed batch, i.e. the `skip_lines` to resume from.
+    """
+    counts = {"imported": 0, "existing": 0, "invalid": 0}
+    batch: List[Dict[str, object]] = []
+    line_no = 0
+    size = max(1, int(batch_size))
+    for line_no, line in enumerate(lines, start=1):
+        if line_no <= skip_lines or not line.strip():
+            continue
+        item = _item_from_line(line)
+        if item is None:
+            counts["invalid"] += 1
+            continue
+        batch.append(item)
+        if len(batch) >= size:
+            _flush(batch, counts, route, embed)
+            batch = []
+            if on_batch is not None:
+                on_batch(line_no)
+    if batch:
+        _flush(batch, counts, route, embed)
+        if on_batch is not None:
+            on_batch(line_no)
+    return {**counts, "next_skip_lines": max(line_no, int(skip_lines))}
+
+
+def _flush(batch: List[Dict[str, object]], counts: Dict[str, int], route: bool, embed: bool) -> None:
+    stored = _existing_ids([str(item["memory_id"]) for item in batch])
+    fresh: List[Dict[str, object]] = []
+    for item in batch:
+        if item["memory_id"] in stored:
+            continue
+        # Duplicate ids within one file keep the first line.
+        stored.add(str(item["memory_id"]))
+        fresh.append(item)
+    counts["existing"] += len(batch) - len(fresh)
+    if fresh:
+        write_memories(fresh, route=route, embed=embed)
+        counts["imported"] += len(fresh)
+
+
+def _existing_ids(memory_ids: List[str]) -> set[str]:
+    if not memory_ids:
+        return set()
+    with get_conn() as conn:
+        ph = "?" if conn.is_sqlite else "%s"
+        cur = conn.cursor()
+        cur.execute(
+            f"SELECT memory_id FROM memory_items WHERE memory_id IN ({', '.join([ph] * len(memory_ids))})",
+            tuple(memory_ids),
+        )
+        return {str(row[0]) for row in cur.fetchall()}
+
+
+def _record_from_row(row: object) -> Dict[str, object]:
+    record: Dict[str, object] = {}
+    for column, value in zip(EXPORT_COLUMNS, tuple(row)):
+        if column in _JSON_COLUMNS:
+            value = _json_loads(value)
+        elif isinstance(value, datetime):
+            value = value.isoformat()
+        record[column] = value
+    return record
+
+
+def _item_from_line(line: str) -> Optional[Dict[str, object]]:
+    try:
+        record = json.loads(line)
+    except Exception:
+        return None
+    if not isinstance(record, dict):
+        return None
+    memory_id = str(record.get("memory_id") or "").strip()
+    text = str(record.get("text") or "").strip()
+    if not memory_id or not text:
+        return None
+    source_refs = record.get("source_refs") if isinstance(record.get("source_refs"), dict) else {}
+    return {
+        "memory_id": memory_id,
+        "created_at": record.get("created_at"),
+        "access_count": record.get("access_count"),
+        "last_accessed_at": record.get("last_accessed_at"),
+        "memory_type": normalize_memory_type(record.get("memory_type")),
+        "text": text,
+        "topics": record.get("topics") if isinstance(record.get("topics"), list) else [],
+        "entities": record.get("entities") if isinstance(record.get("entities"), list) else [],
+        "source_refs": source_refs,
+        "importance": record.get("importance", 0.5),
+        "confidence": record.get("confidence", 0.7),
+        "expires_at": record.get("expires_at"),
+        "pinned_until": record.get("pinned_until"),
+        "memory_kind": record.get("memory_kind"),
+        "memory_slot": record.get("memory_slot"),
+        "memory_value": source_refs.get("memory_value"),
+        "user_id": record.get("user_id"),
+        "project_id": record.get("project_id"),
+        "session_id": record.get("session_id"),
+    }
+
+
+def _json_loads(value: object) -> object:
+    if value is None:
+        return None
+    if isinstance(value, (dict, list)):
+        return value
+    if isinstance(value, (bytes, bytearray)):
+        value = value.decode("utf-8")
+    if isinstance(value, str):
+        try:
+            return json.loads(value)
+        except Exception:
+            return None
+    return None
@@ -11,6 +11,7 @@ from app.clients.snowflake_client import SnowflakeClient, merge_documents_sql, m
 from app.core.manifest import get_manifest, upsert_manifest
 from app.core.storage import read_artifact, write_artifact
 from app.core.timeutil import utc_now
+from app.queue.generation import bump_generation
 from app.queue.logs import log_run
 
 
@@ -126,6 +127,7 @@ def handle_job(job: Dict[str, Any]) -> None:
         publish_documents([doc_row], client=client, dry_run=False)
         publish_segments(segment_rows, client=client, dry_run=False)
         receipt["dry_run"] = False
+        bump_generation()
     except Exception as exc:
         receipt["error"] = str(exc)
 
@@ -0,0 +1,217 @@
+"""Local full-text index over chunk text (SQLite FTS5 / Postgres tsvector)."""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.core.storage import read_artifact
+from app.modules.embeddings.embedding_store import chunk_filter_sql
+from app.modules.memory.policy import match_terms, token_set, tokens
+from app.queue.db import get_conn
+from app.queue.generation import bump_generation
+
+
+MAX_QUERY_TOKENS = 32
+
+
+def index_chunks(source_id: str, source_version: str, chunks: Iterable[Dict[str, Any]]) -> int:
+    """Replace the indexed chunks of `source_id` with `chunks`; returns the number indexed."""
+    rows = []
+    for chunk in chunks:
+        text = str(chunk.get("text") or "").strip()
+        if not text:
+            continue
+        rows.append(
+            (
+                str(chunk.get("doc_id") or source_id),
+                str(chunk.get("segment_id")),
+                source_id,
+                source_version,
+                chunk.get("start_ms"),
+                chunk.get("end_ms"),
+                chunk.get("speaker"),
+                text,
+                json.dumps(chunk.get("source_refs") or {}, ensure_ascii=True),
+                " ".join(chunk.get("tokens") or token_set(text)),
+            )
+        )
+    with get_conn() as conn:
+        cur = conn.cursor()
+        ph = "?" if conn.is_sqlite else "%s"
+        table = "chunk_fts" if conn.is_sqlite else "chunk_index"
+        cur.execute(f"DELETE FROM {table} WHERE source_id={ph}", (source_id,))
+        if rows:
+            cur.executemany(
+                f"INSERT INTO {table} (doc_id, segment_id, source_id, source_version, start_ms, end_ms, speaker, text, source_refs, tokens) "
+                f"VALUES ({', '.join([ph] * 10)})",
+                rows,
+            )
+        bump_generation(conn)
+        conn.commit()
+    return len(rows)
+
+
+def rebuild_chunk_index(missing_only: bool = True) -> Dict[str, int]:
+    """Index every source's newest chunked version; for corpora chunked before the index existed.
+
+    Chunks come from the source's `chunks` artifact, or from its embeddings rows when
+    the artifact is gone. With `missing_only`, sources already in the index are kept.
+    """
+    with get_conn() as conn:
+        cur = conn.cursor()
+        table = "chunk_fts" if conn.is_sqlite else "chunk_index"
+        indexed = set()
+        if missing_only:
+            cur.execute(f"SELECT DISTINCT source_id FROM {table}")
+            indexed = {str(row[0]) for row in cur.fetchall()}
+        cur.execute("SELECT source_id, source_version, manifest_json FROM manifests ORDER BY updated_at DESC")
+        manifests = cur.fetchall()
+    seen = set()
+    counts = {"sources": 0, "chunks": 0, "skipped": 0}
+    for source_id, source_version, raw in manifests:
+        source_id = str(source_id)
+        manifest = json.loads(raw) if isinstance(raw, (str, bytes, bytearray)) else raw
+        chunks_rel = ((manifest or {}).get("artifacts") or {}).get("chunks") if isinstance(manifest, dict) else None
+        # The index holds one version per source (index_chunks replaces by source_id).
+        if not chunks_rel or source_id in seen:
+            continue
+        seen.add(source_id)
+        if source_id in indexed:
+            counts["skipped"] += 1
+            continue
+        chunks = _artifact_chunks(source_id, str(source_version), str(chunks_rel))
+        if chunks is None:
+            chunks = _embedded_chunks(source_id, str(source_version))
+        counts["chunks"] += index_chunks(source_id, str(source_version), chunks)
+        counts["sources"] += 1
+    return counts
+
+
+def _artifact_chunks(source_id: str, source_version: str, rel_path: str) -> Optional[List[Dict[str, Any]]]:
+    raw = read_artifact(source_id, source_version, rel_path)
+    if raw is None:
+        return None
+    chunks = []
+    for line in raw.splitlines():
+        if not line.strip():
+            continue
+        try:
+            chunk = json.loads(line)
+        except Exception:
+            continue
+        if isinstance(chunk, dict):
+            chunks.append(chunk)
+    return chunks
+
+
+def _embedded_chunks(source_id: str, source_version: str) -> List[Dict[str, Any]]:
+    with get_conn() as conn:
+        cur = conn.cursor()
+        ph = "?" if conn.is_sqlite else "%s"
+        cur.execute(
+            "SELECT doc_id, segment_id, start_ms, end_ms, speaker, text, source_refs, tokens FROM embeddings "
+            f"WHERE source_id={ph} AND source_version={ph}",
+            (source_id, source_version),
+        )
+        rows: List[Tuple[Any, ...]] = [tuple(row) for row in cur.fetchall()]
+    chunks = []
+    for doc_id, segment_id, start_ms, end_ms, speaker, text, refs, chunk_tokens in rows:
+        if isinstance(refs, str):
+            try:
+                refs = json.loads(refs)
+            except Exception:
+                refs = {}
+        chunks.append(
+            {
+                "doc_id": doc_id,
+                "segment_id": segment_id,
+                "start_ms": start_ms,
+                "end_ms": end_ms,
+                "speaker": speaker,
+                "text": text,
+                "source_refs": refs if isinstance(refs, dict) else {},
+                "tokens": str(chunk_tokens or "").split() or None,
+            }
+        )
+    return chunks
+
+
+def delete_chunk_index(source_id: str) -> int:
+    with get_conn() as conn:
+        cur = conn.cursor()
+        ph = "?" if conn.is_sqlite else "%s"
+        table = "chunk_fts" if conn.is_sqlite else "chunk_index"
+        try:
+            cur.execute(f"DELETE FROM {table} WHERE source_id={ph}", (source_id,))
+            deleted = int(cur.rowcount or 0)
+            bump_generation(conn)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            return 0
+    return deleted
+
+
+def search_chunks(
+    query: str,
+    limit: int = 10,
+    filters: Optional[Dict[str, Any]] = None,
+    query_tokens: Optional[List[str]] = None,
+) -> List[Dict[str, Any]]:
+    """BM25-ranked chunks matching any query term; scores are normalized so the best hit is 1.0."""
+    terms = match_terms(query_tokens if query_tokens is not None else tokens(query), limit=MAX_QUERY_TOKENS)
+    if not terms or limit <= 0:
+        return []
+    with get_conn() as conn:
+        compiled = chunk_filter_sql(conn, filters)
+        if compiled is None:
+            return []
+        where, params = compiled
+        cur = conn.cursor()
+        if conn.is_sqlite:
+            match = " OR ".join(f'"{term}"' for term in terms)
+            cur.execute(
+                "SELECT doc_id, segment_id, start_ms, end_ms, speaker, text, source_refs, -bm25(chunk_fts) AS rank, tokens "
+                "FROM chunk_fts WHERE chunk_fts MATCH ?"
+                + (f" AND {where}" if where else "")
+                + " ORDER BY rank DESC LIMIT ?",
+                (match, *params, int(limit)),
+            )
+        else:
+            match = " | ".join(terms)
+            cur.execute(
+                "SELECT doc_id, segment_id, start_ms, end_ms, speaker, text, source_refs, "
+                "ts_rank_cd(tsv, to_tsquery('simple', %s), 1) AS rank, tokens "
+                "FROM chunk_index WHERE tsv @@ to_tsquery('simple', %s)"
+                + (f" AND {where}" if where else "")
+                + " ORDER BY rank DESC LIMIT %s",
+                (match, match, *params, int(limit)),
+            )
+        rows = cur.fetchall()
+    if not rows:
+        return []
+    best = max(float(row[7] or 0.0) for row in rows) or 1.0
+    results = []
+    for row in rows:
+        refs = row[6]
+        if isinstance(refs, str):
+            try:
+                refs = json.loads(refs)
+            except Exception:
+                refs = {}
+        results.append(
+            {
+                "doc_id": row[0],
+                "segment_id": row[1],
+                "start_ms": row[2],
+                "end_ms": row[3],
+                "speaker": row[4],
+                "text_snippet": row[5],
+                "score": round(max(0.0, float(row[7] or 0.0)) / best, 6),
+                "source_refs": refs if isinstance(refs, dict) else {},
+                "tokens": str(row[8] or "").split(),
+            }
+        )
+    return results
+
@@ -0,0 +1,153 @@
+"""Evidence diversification: MinHash near-duplicate suppression followed by MMR selection."""
+
+from __future__ import annotations
+
+import math
+import random
+import zlib
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.core.config import load_settings
+from app.modules.embeddings.embedding_store import load_vectors
+from app.modules.memory.policy import tokens
+from app.modules.retrieve.fusion import candidate_tokens
+
+
+SHINGLE_SIZE = 3
+NUM_PERMUTATIONS = 64
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+Key = Tuple[str, str]
+
+
+def _make_permutations(count: int) -> List[Tuple[int, int]]:
+    # Fixed seed: signatures must be comparable across calls and processes.
+    rng = random.Random(20260217)
+    return [(rng.randint(1, _MERSENNE_PRIME - 1), rng.randint(0, _MERSENNE_PRIME - 1)) for _ in range(count)]
+
+
+_PERMUTATIONS = _make_permutations(NUM_PERMUTATIONS)
+
+
+def diversify(
+    rows: List[Dict[str, Any]],
+    limit: int,
+    mmr_lambda: Optional[float] = None,
+    near_duplicate_threshold: Optional[float] = None,
+    report: Optional[Dict[str, Any]] = None,
+) -> List[Dict[str, Any]]:
+    """Pick up to `limit` rows from `rows` (sorted best first, each carrying `final_score`).
+
+    Rows whose shingle MinHash similarity to a better row reaches the threshold are
+    dropped; the rest are chosen by Maximal Marginal Relevance, using stored vectors
+    where both rows have one and token-set Jaccard otherwise.
+    """
+    settings = load_settings()
+    lam = settings.retrieve_mmr_lambda if mmr_lambda is None else mmr_lambda
+    threshold = settings.retrieve_near_dup_threshold if near_duplicate_threshold is None else near_duplicate_threshold
+    if limit <= 0 or not rows:
+        return []
+
+    kept: List[Dict[str, Any]] = []
+    signatures: List[List[int]] = []
+    suppressed = 0
+    for row in rows:
+        signature = minhash_signature(row.get("text_snippet"))
+        duplicate_of = None
+        if signature and threshold < 1.0:
+            for idx, other in enumerate(signatures):
+                if other and estimate_jaccard(signature, other) >= threshold:
+                    duplicate_of = kept[idx]
+                    break
+        if duplicate_of is not None:
+            suppressed += 1
+            sources = duplicate_of.setdefault("retrieval_sources", [duplicate_of.get("retrieval_source")])
+            source = row.get("retrieval_source")
+            if source and source not in sources:
+                sources.append(source)
+            continue
+        kept.append(row)
+        signatures.append(signature)
+
+    selected = kept[:limit] if lam >= 1.0 else _mmr(kept, limit, lam)
+    if report is not None:
+        report["near_duplicates_suppressed"] = suppressed
+        report["candidates"] = len(rows)
+    return selected
+
+
+def minhash_signature(text: object) -> List[int]:
+    shingles = _shingles(text)
+    if not shingles:
+        return []
+    return [min(((a * value + b) % _MERSENNE_PRIME) & _MAX_HASH for value in shingles) for a, b in _PERMUTATIONS]
+
+
+def estimate_jaccard(left: Sequence[int], right: Sequence[int]) -> float:
+    if not left or not right:
+        return 0.0
+    return sum(1 for a, b in zip(left, right) if a == b) / float(len(left))
+
+
+def _shingles(text: object) -> set:
+    words = tokens(text)
+    if not words:
+        return set()
+    if len(words) < SHINGLE_SIZE:
+        return {zlib.crc32(" ".join(words).encode("utf-8"))}
+    return {
+        zlib.crc32(" ".join(words[idx : idx + SHINGLE_SIZE]).encode("utf-8"))
+        for idx in range(len(words) - SHINGLE_SIZE + 1)
+    }
+
+
+def _mmr(rows: List[Dict[str, Any]], limit: int, lam: float) -> List[Dict[str, Any]]:
+    if len(rows) <= 1:
+        return rows[:limit]
+    keys = [_key(row) for row in rows]
+    try:
+        vectors = load_vectors(sorted(set(keys)))
+    except Exception:
+        vectors = {}
+    best = max(float(row.get("final_score", 0.0)) for row in rows) or 1.0
+    relevance = [float(row.get("final_score", 0.0)) / best for row in rows]
+    max_similarity = [0.0] * len(rows)
+    remaining = list(range(len(rows)))
+    chosen: List[int] = []
+    while remaining and len(chosen) < limit:
+        pick = max(remaining, key=lambda idx: (lam * relevance[idx]) - ((1.0 - lam) * max_similarity[idx]))
+        chosen.append(pick)
+        remaining.remove(pick)
+        for idx in remaining:
+            sim = _similarity(rows[pick], rows[idx], vectors.get(keys[pick]), vectors.get(keys[idx]))
+            if sim > max_similarity[idx]:
+                max_similarity[idx] = sim
+    return [rows[idx] for idx in chosen]
+
+
+def _similarity(
+    left: Dict[str, Any],
+    right: Dict[str, Any],
+    left_vec: Optional[List[float]],
+    right_vec: Optional[List[float]],
+) -> float:
+    if left_vec and right_vec and len(left_vec) == len(right_vec):
+        return max(0.0, _cosine(left_vec, right_vec))
+    a = candidate_tokens(left)
+    b = candidate_tokens(right)
+    if not a or not b:
+        return 0.0
+    return len(a & b) / float(len(a | b))
+
+
+def _cosine(a: Sequence[float], b: Sequence[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    na = math.sqrt(sum(x * x for x in a))
+    nb = math.sqrt(sum(y * y for y in b))
+    if na == 0.0 or nb == 0.0:
+        return 0.0
+    return dot / (na * nb)
+
+
+def _key(row: Dict[str, Any]) -> Key:
+    return (str(row.get("doc_id") or "N/A"), str(row.get("segment_id") or "N/A"))
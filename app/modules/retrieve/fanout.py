@@ -0,0 +1,112 @@
+"""Run independent retrieval sources concurrently, each bounded by its own deadline."""
+
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple
+
+from app.core.config import load_settings
+
+
+def source_timeout(name: str) -> float:
+    settings = load_settings()
+    return float(settings.retrieve_source_timeouts.get(name, settings.retrieve_source_timeout_seconds))
+
+
+def retrieve_timeout() -> float:
+    """Outer deadline for a whole retrieve() call: its slowest source plus time to merge."""
+    settings = load_settings()
+    slowest = max([settings.retrieve_source_timeout_seconds, *settings.retrieve_source_timeouts.values()])
+    return float(settings.retrieve_source_timeouts.get("retrieve", slowest + 2.0))
+
+
+def run_sources(
+    tasks: Mapping[str, Callable[[], Any]],
+    timeouts: Optional[Mapping[str, float]] = None,
+    parallel: Optional[bool] = None,
+) -> Tuple[Dict[str, Any], Dict[str, Dict[str, Any]]]:
+    """Run every task and return (outputs, report).
+
+    Partial-result policy: a task that raises or misses its deadline is left out of
+    `outputs` and recorded in `report` as "error"/"timeout"; the others still count.
+    """
+    settings = load_settings()
+    use_parallel = settings.retrieve_parallel if parallel is None else parallel
+    outputs: Dict[str, Any] = {}
+    report: Dict[str, Dict[str, Any]] = {}
+    start = time.monotonic()
+
+    if not use_parallel:
+        for name, task in tasks.items():
+            began = time.monotonic()
+            try:
+                outputs[name] = task()
+                report[name] = _entry("ok", began, outputs[name])
+            except Exception as exc:
+                report[name] = _entry("error", began, error=exc)
+        return outputs, report
+
+    futures = {name: _submit(name, task) for name, task in tasks.items()}
+    for name, future in futures.items():
+        limit = float((timeouts or {}).get(name, source_timeout(name)))
+        remaining = max(0.0, start + limit - time.monotonic())
+        try:
+            outputs[name] = future.result(timeout=remaining)
+            report[name] = _entry("ok", start, outputs[name], elapsed=getattr(future, "elapsed", None))
+        except FutureTimeout:
+            report[name] = _entry("timeout", start)
+        except Exception as exc:
+            report[name] = _entry("error", start, error=exc, elapsed=getattr(future, "elapsed", None))
+    return outputs, report
+
+
+def require_source(report: Mapping[str, Dict[str, Any]], name: str) -> None:
+    """Raise unless `name` finished "ok"; for sources a caller cannot answer without."""
+    entry = report.get(name) or {}
+    status = entry.get("status")
+    if status == "ok":
+        return
+    if status == "timeout":
+        raise TimeoutError(f"{name} timed out after {entry.get('ms')} ms")
+    raise RuntimeError(f"{name} failed: {entry.get('error') or 'no result'}")
+
+
+def _submit(name: str, task: Callable[[], Any]) -> Future:
+    # Daemon threads rather than a shared pool: a source stuck past its deadline
+    # must neither starve later requests nor hold up interpreter exit.
+    future: Future = Future()
+
+    def runner() -> None:
+        if not future.set_running_or_notify_cancel():
+            return
+        began = time.monotonic()
+        try:
+            value = task()
+        except BaseException as exc:
+            future.elapsed = time.monotonic() - began  # type: ignore[attr-defined]
+            future.set_exception(exc)
+            return
+        future.elapsed = time.monotonic() - began  # type: ignore[attr-defined]
+        future.set_result(value)
+
+    threading.Thread(target=runner, name=f"retrieve-{name}", daemon=True).start()
+    return future
+
+
+def _entry(
+    status: str,
+    began: float,
+    value: Any = None,
+    error: Optional[BaseException] = None,
+    elapsed: Optional[float] = None,
+) -> Dict[str, Any]:
+    seconds = elapsed if elapsed is not None else time.monotonic() - began
+    entry: Dict[str, Any] = {"status": status, "ms": round(seconds * 1000.0, 1)}
+    if isinstance(value, list):
+        entry["count"] = len(value)
+    if error is not None:
+        entry["error"] = str(error)[:200]
+    return entry
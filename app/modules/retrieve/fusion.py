@@ -0,0 +1,158 @@
+"""Fuse per-source candidate lists into one ranking: legacy blend, RRF or weighted z-score."""
+
+from __future__ import annotations
+
+import math
+from typing import Any, Dict, FrozenSet, List, Mapping, Optional, Tuple
+
+from app.core.config import load_settings
+from app.modules.memory.policy import set_overlap_score, tokens
+
+
+FUSION_METHODS = ("legacy", "rrf", "zscore")
+RRF_K = 60
+# Query-term overlap is fused as one more ranked list under this name.
+OVERLAP_LIST = "overlap"
+LEGACY_SOURCE_BIAS = {"embedding": 0.28, "memory": 0.24, "lexical": 0.2, "keyword": 0.18, "context": 0.16}
+# Retrieval-feedback boosts were tuned on legacy scores, where one rank step near the
+# top is worth ~0.04. Scaled RRF packs a list into ~0.87-1.0 (one step ~0.015), so the
+# boosts shrink by the same ratio: one cited answer moves a candidate a few ranks
+# instead of past every rank difference.
+FEEDBACK_SCALE = {"legacy": 1.0, "rrf": 0.35, "zscore": 1.0}
+
+Key = Tuple[str, str]
+
+
+def candidate_tokens(row: Dict[str, Any]) -> FrozenSet[str]:
+    """Token set of a candidate: the one stored at ingest, else tokenized once and cached on the row."""
+    cached = row.get("tokens")
+    if isinstance(cached, frozenset):
+        return cached
+    if cached:
+        value = frozenset(cached.split() if isinstance(cached, str) else cached)
+    else:
+        value = frozenset(tokens(row.get("text_snippet")))
+    row["tokens"] = value
+    return value
+
+
+def fuse(
+    outputs: Mapping[str, List[Dict[str, Any]]],
+    query_tokens: List[str],
+    method: Optional[str] = None,
+    weights: Optional[Mapping[str, float]] = None,
+) -> List[Dict[str, Any]]:
+    """Merge source lists (given in a fixed source order) into one row per (doc_id, segment_id).
+
+    Every returned row carries `final_score`; the caller sorts. Weights default to 1.0
+    per source and also apply to the "overlap" list under rrf/zscore.
+    """
+    settings = load_settings()
+    method = resolve_method(method)
+    weights = settings.retrieve_fusion_weights if weights is None else weights
+
+    if method == "legacy":
+        return _fuse_legacy(outputs, query_tokens)
+
+    merged: Dict[Key, Dict[str, Any]] = {}
+    lists: Dict[str, List[Tuple[Key, float]]] = {}
+    for source, rows in outputs.items():
+        ranked: List[Tuple[Key, float]] = []
+        seen = set()
+        for row in sorted(rows, key=lambda item: _score(item), reverse=True):
+            key = _key(row)
+            if key in seen:
+                continue
+            seen.add(key)
+            ranked.append((key, _score(row)))
+            current = merged.get(key)
+            if current is None:
+                merged[key] = row
+                row["retrieval_sources"] = [source]
+            elif source not in current["retrieval_sources"]:
+                current["retrieval_sources"].append(source)
+        if ranked:
+            lists[source] = ranked
+
+    overlap = [
+        (key, set_overlap_score(query_tokens, candidate_tokens(row)))
+        for key, row in merged.items()
+    ]
+    overlap = sorted((item for item in overlap if item[1] > 0.0), key=lambda item: item[1], reverse=True)
+    if overlap:
+        lists[OVERLAP_LIST] = overlap
+
+    if method == "zscore":
+        fused = _zscore(lists, weights)
+    else:
+        fused = _rrf(lists, weights)
+    for key, row in merged.items():
+        row["final_score"] = round(fused.get(key, 0.0), 6)
+    return list(merged.values())
+
+
+def resolve_method(method: Optional[str] = None) -> str:
+    method = (method or load_settings().retrieve_fusion or "legacy").lower()
+    return method if method in FUSION_METHODS else "legacy"
+
+
+def feedback_scale(method: Optional[str] = None) -> float:
+    """Multiplier for retrieval-feedback boosts so they stay proportional to the fused score spread."""
+    return FEEDBACK_SCALE[resolve_method(method)]
+
+
+def _rrf(lists: Mapping[str, List[Tuple[Key, float]]], weights: Mapping[str, float]) -> Dict[Key, float]:
+    total: Dict[Key, float] = {}
+    for name, ranked in lists.items():
+        weight = float(weights.get(name, 1.0))
+        for rank, (key, _score_value) in enumerate(ranked, start=1):
+            total[key] = total.get(key, 0.0) + weight / (RRF_K + rank)
+    # Scale so a candidate ranked first everywhere scores 1.0, keeping feedback boosts comparable.
+    ceiling = sum(float(weights.get(name, 1.0)) for name in lists) / (RRF_K + 1)
+    if ceiling <= 0.0:
+        return total
+    return {key: value / ceiling for key, value in total.items()}
+
+
+def _zscore(lists: Mapping[str, List[Tuple[Key, float]]], weights: Mapping[str, float]) -> Dict[Key, float]:
+    total: Dict[Key, float] = {}
+    weight_sum = 0.0
+    for name, ranked in lists.items():
+        weight = float(weights.get(name, 1.0))
+        weight_sum += weight
+        values = [score for _key, score in ranked]
+        mean = sum(values) / len(values)
+        std = math.sqrt(sum((value - mean) ** 2 for value in values) / len(values))
+        for key, score in ranked:
+            z = (score - mean) / std if std > 1e-12 else 0.0
+            total[key] = total.get(key, 0.0) + weight * z
+    if weight_sum <= 0.0:
+        return {key: 0.5 for key in total}
+    # Logistic squash keeps fused scores in (0, 1) like the other methods.
+    return {key: 1.0 / (1.0 + math.exp(-value / weight_sum)) for key, value in total.items()}
+
+
+def _fuse_legacy(outputs: Mapping[str, List[Dict[str, Any]]], query_tokens: List[str]) -> List[Dict[str, Any]]:
+    by_key: Dict[Key, Dict[str, Any]] = {}
+    for source, rows in outputs.items():
+        for row in rows:
+            bias = LEGACY_SOURCE_BIAS.get(str(row.get("retrieval_source") or source), 0.15)
+            lexical = set_overlap_score(query_tokens, candidate_tokens(row))
+            row["final_score"] = round(bias + (0.52 * _score(row)) + (0.30 * lexical), 6)
+            key = _key(row)
+            current = by_key.get(key)
+            if current is None or row["final_score"] > current["final_score"]:
+                by_key[key] = row
+    return list(by_key.values())
+
+
+def _key(row: Dict[str, Any]) -> Key:
+    return (str(row.get("doc_id") or "N/A"), str(row.get("segment_id") or "N/A"))
+
+
+def _score(row: Dict[str, Any]) -> float:
+    try:
+        parsed = float(row.get("score"))
+    except Exception:
+        return 0.0
+    return max(0.0, min(1.5, parsed))
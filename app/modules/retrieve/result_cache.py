@@ -0,0 +1,94 @@
+"""Bounded LRU cache of retrieve() data-source candidates, invalidated by the retrieval data generation."""
+
+from __future__ import annotations
+
+import copy
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.config import Settings, load_settings
+from app.modules.embeddings.query_cache import normalize_query
+
+
+CacheKey = Tuple[str, ...]
+
+_LOCK = threading.Lock()
+# key -> (generation, stored_at monotonic seconds, entry)
+_CACHE: "OrderedDict[CacheKey, Tuple[int, float, Dict[str, Any]]]" = OrderedDict()
+_STATS: Dict[str, int] = {"hits": 0, "misses": 0, "stale": 0, "evictions": 0}
+
+
+def cache_key(
+    query: str,
+    limit: int,
+    filters: Dict[str, Any],
+    settings: Settings,
+) -> CacheKey:
+    """Normalized query + limit + canonical filters (scope ids included) + settings that pick the data sources."""
+    return (
+        settings.postgres_dsn,
+        normalize_query(query),
+        str(int(limit)),
+        json.dumps(filters or {}, sort_keys=True, ensure_ascii=True, default=str),
+        ",".join(
+            [
+                str(int(settings.embeddings_enabled)),
+                str(int(settings.lexical_index_enabled)),
+                str(settings.retrieve_doc_prefilter_top),
+            ]
+        ),
+    )
+
+
+def get_cached(key: CacheKey, generation: int) -> Optional[Dict[str, Any]]:
+    """Return a copy of the cached entry if they were computed at `generation` and are within the TTL."""
+    ttl = float(load_settings().retrieve_cache_ttl_seconds)
+    with _LOCK:
+        entry = _CACHE.get(key)
+        if entry is None:
+            _STATS["misses"] += 1
+            return None
+        stored_generation, stored_at, value = entry
+        if stored_generation != generation or (ttl > 0 and time.monotonic() - stored_at > ttl):
+            del _CACHE[key]
+            _STATS["stale"] += 1
+            _STATS["misses"] += 1
+            return None
+        _CACHE.move_to_end(key)
+        _STATS["hits"] += 1
+    return copy.deepcopy(value)
+
+
+def put_cached(key: CacheKey, generation: int, value: Dict[str, Any]) -> None:
+    max_items = max(0, int(load_settings().retrieve_cache_size))
+    if max_items <= 0:
+        return
+    snapshot = copy.deepcopy(value)
+    with _LOCK:
+        _CACHE[key] = (generation, time.monotonic(), snapshot)
+        _CACHE.move_to_end(key)
+        while len(_CACHE) > max_items:
+            _CACHE.popitem(last=False)
+            _STATS["evictions"] += 1
+
+
+def result_cache_stats() -> Dict[str, object]:
+    settings = load_settings()
+    with _LOCK:
+        stats: Dict[str, object] = dict(_STATS)
+        stats["size"] = len(_CACHE)
+    stats["max_size"] = max(0, int(settings.retrieve_cache_size))
+    stats["ttl_seconds"] = float(settings.retrieve_cache_ttl_seconds)
+    lookups = int(stats["hits"]) + int(stats["misses"])
+    stats["hit_rate"] = round(int(stats["hits"]) / lookups, 6) if lookups else 0.0
+    return stats
+
+
+def clear_result_cache() -> None:
+    with _LOCK:
+        _CACHE.clear()
+        for name in _STATS:
+            _STATS[name] = 0
@@ -2,16 +2,28 @@
 
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional, Tuple
+import time
+from typing import Any, Callable, Dict, List, Optional
 
-from app.clients.ollama_client import embed
 from app.clients.snowflake_client import SnowflakeClient
 from app.core.config import load_settings
-from app.modules.embeddings.embedding_store import search_embeddings
+from app.modules.embeddings.embedding_store import (
+    adjacent_chunks,
+    get_active_embedding_model,
+    search_doc_embeddings,
+    search_embeddings,
+)
+from app.modules.embeddings.query_cache import embed_query
 from app.modules.memory.context_handoff import load_handoff_text
 from app.modules.memory.memory_recall import recall as recall_memory
 from app.modules.memory.retrieval_feedback import apply_retrieval_feedback
-from app.modules.memory.policy import overlap_score, tokens
+from app.modules.memory.policy import set_overlap_score, token_set, tokens
+from app.modules.retrieve.chunk_index import search_chunks
+from app.modules.retrieve.diversify import diversify
+from app.modules.retrieve.fanout import run_sources
+from app.modules.retrieve.fusion import feedback_scale, fuse
+from app.modules.retrieve.result_cache import cache_key, get_cached, put_cached
+from app.queue.generation import current_generation
 
 
 def retrieve(
@@ -19,123 +31,79 @@ def retrieve(
     limit: int = 10,
     filters: Optional[Dict[str, Any]] = None,
     client: Optional[SnowflakeClient] = None,
+    report: Optional[Dict[str, Any]] = None,
+    expand_seconds: Optional[float] = None,
+    expand_chunks: Optional[int] = None,
 ) -> List[Dict[str, Any]]:
+    """Fan out to every enabled source concurrently and merge their candidates.
+
+    Each source runs under its own deadline (RETRIEVE_SOURCE_TIMEOUT_SECONDS /
+    RETRIEVE_SOURCE_TIMEOUTS); late or failing sources are dropped. The surviving
+    lists are combined by `fusion.fuse` (RETRIEVE_FUSION) and thinned by
+    `diversify` (near-duplicate suppression + MMR). The embedding, lexical and keyword
+    candidates are cached per normalized query, limit and filters until the
+    retrieval generation moves on; memory and handoff context always run live. Timed
+    hits are widened with neighbouring chunks when `expand_seconds`/`expand_chunks`
+    (default RETRIEVE_EXPAND_SECONDS/RETRIEVE_EXPAND_CHUNKS) are set. With
+    RETRIEVE_DOC_PREFILTER_TOP > 0, chunk search is restricted to the documents whose
+    summary embeddings best match the query. Pass a dict as `report` to receive cache
+    status and per-source timings.
+    """
+    started = time.monotonic()
     settings = load_settings()
     filters = filters or {}
+    expand = (
+        float(settings.retrieve_expand_seconds if expand_seconds is None else expand_seconds),
+        int(settings.retrieve_expand_chunks if expand_chunks is None else expand_chunks),
+    )
+    generation = current_generation() if settings.retrieve_cache_size > 0 else None
+    key = cache_key(query, limit, filters, settings)
+    cached = get_cached(key, generation) if generation is not None else None
     query_tokens = tokens(query)
-    candidates: List[Dict[str, Any]] = []
-    fallback_sql = "N/A"
-
-    if settings.embeddings_enabled:
-        try:
-            query_embedding = embed(query)
-            embedded = search_embeddings(query_embedding, limit=max(limit * 2, limit))
-            for row in embedded:
-                item = {
-                    "doc_id": row.get("doc_id"),
-                    "segment_id": row.get("segment_id"),
-                    "start_ms": row.get("start_ms"),
-                    "end_ms": row.get("end_ms"),
-                    "speaker": row.get("speaker"),
-                    "text_snippet": row.get("text_snippet"),
-                    "source_refs": row.get("source_refs") or {},
-                    "score": _clamp_score(row.get("score"), default=0.0),
-                    "retrieval_source": "embedding",
-                }
-                item["final_score"] = _score_candidate(item, query_tokens)
-                candidates.append(item)
-        except Exception:
-            pass
-
-    client = client or SnowflakeClient()
-    sql = client.search_segments(query, limit=max(limit * 2, limit), filters=filters)
-    fallback_sql = sql
-    if hasattr(client, "execute_query"):
-        try:
-            rows = client.execute_query(sql)
-        except Exception:
-            rows = []
-    else:
-        rows = []
-
-    for row in rows:
-        text = row.get("text")
-        lexical = overlap_score(query_tokens, text)
-        item = {
-            "doc_id": row.get("doc_id"),
-            "segment_id": row.get("segment_id"),
-            "start_ms": row.get("start_ms"),
-            "end_ms": row.get("end_ms"),
-            "speaker": row.get("speaker"),
-            "text_snippet": text,
-            "score": lexical,
-            "retrieval_source": "keyword",
-        }
-        item["final_score"] = _score_candidate(item, query_tokens)
-        candidates.append(item)
+    fetch_limit = max(limit * 2, limit)
 
+    # Data sources only change with the retrieval generation and are cached; memory
+    # and handoff context are cheap local reads that always run live.
+    data_sources = ["embedding", "lexical", "keyword"]
+    tasks: Dict[str, Callable[[], List[Dict[str, Any]]]] = {}
+    prefilter: Dict[str, Any] = {}
+    if cached is None:
+        client = client or SnowflakeClient()
+        fallback_sql = client.search_segments(query, limit=fetch_limit, filters=filters)
+        chunk_filters = filters
+        if settings.retrieve_doc_prefilter_top > 0 and settings.embeddings_enabled:
+            chunk_filters = _prefilter_documents(query, settings.retrieve_doc_prefilter_top, filters, prefilter)
+        if settings.embeddings_enabled:
+            tasks["embedding"] = lambda: _embedding_candidates(query, fetch_limit, chunk_filters)
+        if settings.lexical_index_enabled:
+            tasks["lexical"] = lambda: _lexical_candidates(query, fetch_limit, chunk_filters, query_tokens)
+        tasks["keyword"] = lambda: _keyword_candidates(client, fallback_sql, query_tokens)
+    else:
+        fallback_sql = str(cached["fallback_sql"])
+        prefilter = dict(cached["prefilter"])
     if settings.context_handoff_enabled:
-        try:
-            handoff_text = load_handoff_text()
-            if handoff_text:
-                lexical = overlap_score(query_tokens, handoff_text)
-                if lexical > 0.0 or _is_context_query(query):
-                    item = {
-                        "doc_id": "context:auto_handoff",
-                        "segment_id": "state",
-                        "start_ms": None,
-                        "end_ms": None,
-                        "speaker": "context",
-                        "text_snippet": handoff_text[:1800],
-                        "score": max(lexical, 0.15 if _is_context_query(query) else lexical),
-                        "retrieval_source": "context",
-                        "source_refs": {"kind": "auto_handoff"},
-                    }
-                    item["final_score"] = _score_candidate(item, query_tokens)
-                    candidates.append(item)
-        except Exception:
-            pass
-
+        tasks["context"] = lambda: _context_candidates(query, query_tokens)
     if settings.memory_enabled:
-        try:
-            memory_type = filters.get("memory_type")
-            memory_kind = filters.get("memory_kind")
-            user_id = filters.get("user_id")
-            project_id = filters.get("project_id")
-            session_id = filters.get("session_id")
-            memory_items = recall_memory(
-                query=query,
-                limit=max(1, min(settings.memory_retrieve_limit, limit)),
-                memory_type=str(memory_type) if memory_type else None,
-                memory_kind=str(memory_kind) if memory_kind else None,
-                user_id=str(user_id) if user_id else None,
-                project_id=str(project_id) if project_id else None,
-                session_id=str(session_id) if session_id else None,
-                include_long_term=True,
-            )
-            for item in memory_items:
-                memory_id = str(item.get("memory_id") or "N/A")
-                mem_score = _clamp_score(item.get("recall_score"), default=0.0)
-                ev = {
-                    "doc_id": f"memory:{memory_id}",
-                    "segment_id": "memory",
-                    "start_ms": None,
-                    "end_ms": None,
-                    "speaker": item.get("memory_type"),
-                    "text_snippet": item.get("text"),
-                    "score": mem_score,
-                    "retrieval_source": "memory",
-                    "source_refs": item.get("source_refs") or {},
-                    "memory_type": item.get("memory_type"),
-                    "memory_kind": item.get("memory_kind"),
-                    "memory_id": memory_id,
-                }
-                ev["final_score"] = _score_candidate(ev, query_tokens)
-                candidates.append(ev)
-        except Exception:
-            pass
-
-    deduped = _dedupe_by_best_score(candidates)
+        tasks["memory"] = lambda: _memory_candidates(query, limit, filters, query_tokens)
+
+    outputs, source_report = run_sources(tasks)
+    if cached is not None:
+        outputs.update(cached["outputs"])
+        source_report.update({name: {"status": "cached"} for name in cached["outputs"]})
+    elif generation is not None and all(source_report[name].get("status") == "ok" for name in data_sources if name in tasks):
+        # Partial data (a source timed out or failed) is served but never cached.
+        put_cached(
+            key,
+            generation,
+            {
+                "outputs": {name: outputs.get(name) or [] for name in data_sources if name in tasks},
+                "fallback_sql": fallback_sql,
+                "prefilter": prefilter,
+            },
+        )
+    # Fuse in a fixed source order so ties resolve the same way regardless of completion order.
+    order = [name for name in data_sources + ["context", "memory"] if name in outputs]
+    deduped = fuse({name: outputs.get(name) or [] for name in order}, query_tokens)
     try:
         apply_retrieval_feedback(
             query,
@@ -143,39 +111,228 @@ def retrieve(
             user_id=str(filters.get("user_id")) if filters.get("user_id") else None,
             project_id=str(filters.get("project_id")) if filters.get("project_id") else None,
             session_id=str(filters.get("session_id")) if filters.get("session_id") else None,
+            query_tokens=query_tokens,
+            scale=feedback_scale(),
         )
     except Exception:
         pass
     deduped.sort(key=lambda row: float(row.get("final_score", 0.0)), reverse=True)
-    top = deduped[:limit]
-    if top:
-        for row in top:
-            row["score"] = float(row.get("final_score", row.get("score", 0.0)))
-            row.pop("final_score", None)
-        return top
+    diversity: Dict[str, Any] = {}
+    if settings.retrieve_diversify_enabled:
+        top = diversify(deduped, limit, report=diversity)
+    else:
+        top = deduped[:limit]
+    if expand[0] > 0 or expand[1] > 0:
+        _expand_adjacent(top, seconds=expand[0], chunks=expand[1])
+    for row in top:
+        row["score"] = float(row.get("final_score", row.get("score", 0.0)))
+        row.pop("final_score", None)
+        row.pop("tokens", None)
+    results = top or [{"doc_id": "N/A", "segment_id": "N/A", "text_snippet": query, "sql": fallback_sql, "score": 0.0}]
+    if report is not None:
+        report["cache"] = "off" if generation is None else ("hit" if cached is not None else "miss")
+        report["sources"] = source_report
+        report["parallel"] = bool(settings.retrieve_parallel)
+        report["diversity"] = diversity
+        if prefilter:
+            report["prefilter"] = prefilter
+        report["total_ms"] = round((time.monotonic() - started) * 1000.0, 1)
+    return results
+
+
+def _prefilter_documents(
+    query: str,
+    top_docs: int,
+    filters: Dict[str, Any],
+    report: Dict[str, Any],
+) -> Dict[str, Any]:
+    """Stage one of hierarchical retrieval: narrow chunk filters to the best-matching documents.
+
+    Documents are ranked by their embedded summary under the same filters as the
+    chunk search. Chunk search is then limited to the top documents plus those
+    without a summary vector. When nothing ranks (no summaries indexed yet, or the
+    stage fails) the filters are returned unchanged.
+    """
+    started = time.monotonic()
+    try:
+        query_embedding = embed_query(query, model=get_active_embedding_model())
+        ranked = search_doc_embeddings(query_embedding, top_docs, filters=_chunk_filters(filters))
+    except Exception:
+        ranked = []
+    report["docs"] = [doc_id for doc_id, _score in ranked]
+    report["ms"] = round((time.monotonic() - started) * 1000.0, 1)
+    if not ranked:
+        return filters
+    return {**filters, "prefilter_doc_ids": report["docs"]}
 
-    return [{"doc_id": "N/A", "segment_id": "N/A", "text_snippet": query, "sql": fallback_sql, "score": 0.0}]
 
+def _embedding_candidates(query: str, limit: int, filters: Dict[str, Any]) -> List[Dict[str, Any]]:
+    query_embedding = embed_query(query, model=get_active_embedding_model())
+    embedded = search_embeddings(query_embedding, limit=limit, filters=_chunk_filters(filters))
+    out = []
+    for row in embedded:
+        out.append(
+            {
+                "doc_id": row.get("doc_id"),
+                "segment_id": row.get("segment_id"),
+                "start_ms": row.get("start_ms"),
+                "end_ms": row.get("end_ms"),
+                "speaker": row.get("speaker"),
+                "text_snippet": row.get("text_snippet"),
+                "source_refs": row.get("source_refs") or {},
+                "score": _clamp_score(row.get("score"), default=0.0),
+                "retrieval_source": "embedding",
+                "tokens": row.get("tokens") or None,
+            }
+        )
+    return out
 
-def _score_candidate(row: Dict[str, Any], query_tokens: List[str]) -> float:
-    source = str(row.get("retrieval_source") or "keyword")
-    base_score = _clamp_score(row.get("score"), default=0.0)
-    lexical = overlap_score(query_tokens, row.get("text_snippet"))
-    source_bias = {"embedding": 0.28, "memory": 0.24, "keyword": 0.18, "context": 0.16}.get(source, 0.15)
-    scored = source_bias + (0.52 * base_score) + (0.30 * lexical)
-    return round(scored, 6)
 
+def _lexical_candidates(
+    query: str,
+    limit: int,
+    filters: Dict[str, Any],
+    query_tokens: List[str],
+) -> List[Dict[str, Any]]:
+    rows = search_chunks(query, limit=limit, filters=_chunk_filters(filters), query_tokens=query_tokens)
+    return [{**row, "retrieval_source": "lexical"} for row in rows]
 
-def _dedupe_by_best_score(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    by_key: Dict[Tuple[str, str], Dict[str, Any]] = {}
+
+def _keyword_candidates(client: Any, sql: str, query_tokens: List[str]) -> List[Dict[str, Any]]:
+    if not hasattr(client, "execute_query"):
+        return []
+    out = []
+    for row in client.execute_query(sql):
+        text = row.get("text")
+        text_tokens = frozenset(token_set(text))
+        out.append(
+            {
+                "doc_id": row.get("doc_id"),
+                "segment_id": row.get("segment_id"),
+                "start_ms": row.get("start_ms"),
+                "end_ms": row.get("end_ms"),
+                "speaker": row.get("speaker"),
+                "text_snippet": text,
+                "score": set_overlap_score(query_tokens, text_tokens),
+                "retrieval_source": "keyword",
+                "tokens": text_tokens,
+            }
+        )
+    return out
+
+
+def _context_candidates(query: str, query_tokens: List[str]) -> List[Dict[str, Any]]:
+    handoff_text = load_handoff_text()
+    if not handoff_text:
+        return []
+    handoff_tokens = frozenset(token_set(handoff_text))
+    lexical = set_overlap_score(query_tokens, handoff_tokens)
+    is_context_query = _is_context_query(query)
+    if lexical <= 0.0 and not is_context_query:
+        return []
+    return [
+        {
+            "doc_id": "context:auto_handoff",
+            "segment_id": "state",
+            "start_ms": None,
+            "end_ms": None,
+            "speaker": "context",
+            "text_snippet": handoff_text[:1800],
+            "score": max(lexical, 0.15 if is_context_query else lexical),
+            "retrieval_source": "context",
+            "source_refs": {"kind": "auto_handoff"},
+            "tokens": handoff_tokens,
+        }
+    ]
+
+
+def _memory_candidates(
+    query: str,
+    limit: int,
+    filters: Dict[str, Any],
+    query_tokens: List[str],
+) -> List[Dict[str, Any]]:
+    settings = load_settings()
+    memory_type = filters.get("memory_type")
+    memory_kind = filters.get("memory_kind")
+    user_id = filters.get("user_id")
+    project_id = filters.get("project_id")
+    session_id = filters.get("session_id")
+    memory_items = recall_memory(
+        query=query,
+        limit=max(1, min(settings.memory_retrieve_limit, limit)),
+        memory_type=str(memory_type) if memory_type else None,
+        memory_kind=str(memory_kind) if memory_kind else None,
+        user_id=str(user_id) if user_id else None,
+        project_id=str(project_id) if project_id else None,
+        session_id=str(session_id) if session_id else None,
+        include_long_term=True,
+        query_tokens=query_tokens,
+    )
+    out = []
+    for item in memory_items:
+        memory_id = str(item.get("memory_id") or "N/A")
+        out.append(
+            {
+                "doc_id": f"memory:{memory_id}",
+                "segment_id": "memory",
+                "start_ms": None,
+                "end_ms": None,
+                "speaker": item.get("memory_type"),
+                "text_snippet": item.get("text"),
+                "score": _clamp_score(item.get("recall_score"), default=0.0),
+                "retrieval_source": "memory",
+                "source_refs": item.get("source_refs") or {},
+                "memory_type": item.get("memory_type"),
+                "memory_kind": item.get("memory_kind"),
+                "memory_id": memory_id,
+            }
+        )
+    return out
+
+
+def _expand_adjacent(rows: List[Dict[str, Any]], seconds: float, chunks: int) -> None:
+    """Fold neighbouring transcript chunks into each timed hit's snippet (in place)."""
+    present = {(str(row.get("doc_id")), str(row.get("segment_id"))) for row in rows}
+    hits = [
+        (str(row.get("doc_id")), str(row.get("segment_id")), row.get("start_ms"), row.get("end_ms"))
+        for row in rows
+        if row.get("start_ms") is not None and not str(row.get("doc_id") or "").startswith(("memory:", "context:"))
+    ]
+    try:
+        neighbours = adjacent_chunks(hits, seconds=seconds, chunks=chunks)
+    except Exception:
+        return
     for row in rows:
-        doc_id = str(row.get("doc_id") or "N/A")
-        segment_id = str(row.get("segment_id") or "N/A")
-        key = (doc_id, segment_id)
-        current = by_key.get(key)
-        if current is None or float(row.get("final_score", 0.0)) > float(current.get("final_score", 0.0)):
-            by_key[key] = row
-    return list(by_key.values())
+        key = (str(row.get("doc_id")), str(row.get("segment_id")))
+        # Chunks already present as results of their own are not repeated as context.
+        extra = [item for item in neighbours.get(key, []) if (str(item["doc_id"]), str(item["segment_id"])) not in present]
+        if not extra:
+            continue
+        start_ms = int(row.get("start_ms") or 0)
+        before = [item for item in extra if int(item.get("start_ms") or 0) < start_ms]
+        after = [item for item in extra if int(item.get("start_ms") or 0) >= start_ms]
+        parts = [str(item.get("text") or "") for item in before]
+        parts.append(str(row.get("text_snippet") or ""))
+        parts.extend(str(item.get("text") or "") for item in after)
+        row["text_snippet"] = " ".join(part.strip() for part in parts if part.strip())
+        row["context_segment_ids"] = [str(item["segment_id"]) for item in extra]
+        row["context_start_ms"] = min([start_ms] + [int(item.get("start_ms") or 0) for item in before])
+        row["context_end_ms"] = max(
+            [int(row.get("end_ms") or start_ms)] + [int(item.get("end_ms") or item.get("start_ms") or 0) for item in after]
+        )
+
+
+def _chunk_filters(filters: Dict[str, Any]) -> Dict[str, Any]:
+    out: Dict[str, Any] = {}
+    for key in ("doc_ids", "prefilter_doc_ids", "source_ids", "source_type", "speaker", "start_ms_from", "start_ms_to"):
+        value = filters.get(key)
+        if value not in (None, "", [], ()):
+            out[key] = value
+    scope = {key: filters.get(key) for key in ("user_id", "project_id", "session_id") if filters.get(key)}
+    if scope:
+        out["scope"] = scope
+    return out
 
 
 def _clamp_score(value: Any, default: float) -> float:
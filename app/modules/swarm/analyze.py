@@ -10,15 +10,15 @@ from app.core.models import AnalyzeOutput
 from app.core.prompts import render_prompt
 from app.core.textnorm import normalize_user_text
 from app.modules.privacy.egress_policy import apply_egress_policy
-from app.modules.swarm.prompt_format import serialize_for_prompt
+from app.modules.swarm.evidence_packer import evidence_budget, pack_evidence
 from app.queue.logs import log_run
 
 
 def analyze(question: str, evidence: List[Dict]) -> AnalyzeOutput:
     raw_question = str(question or "")
     question = normalize_user_text(raw_question, max_len=2400)
-    evidence_json, evidence_meta = serialize_for_prompt(evidence, max_chars=9000, max_list_items=18, max_text_chars=650)
     settings = load_settings()
+    evidence_json, evidence_meta = pack_evidence(question, evidence, evidence_budget(settings.ollama_model_strong))
     prompt = render_prompt("swarm_analyze", question=question, evidence_json=evidence_json)
     egress = apply_egress_policy(prompt, provider="ollama")
     run_id = log_run(
@@ -33,6 +33,9 @@ def analyze(question: str, evidence: List[Dict]) -> AnalyzeOutput:
             "evidence_prompt_chars_raw": evidence_meta.get("chars_raw"),
             "evidence_prompt_chars": evidence_meta.get("chars_final"),
             "evidence_prompt_truncated": evidence_meta.get("truncated"),
+            "evidence_prompt_tokens_budget": evidence_meta.get("tokens_budget"),
+            "evidence_prompt_tokens_est": evidence_meta.get("tokens_est"),
+            "evidence_items_packed": evidence_meta.get("items_packed"),
             **egress.audit_fields(),
         },
         model=settings.ollama_model_strong,
@@ -0,0 +1,176 @@
+"""Pack evidence into a per-model token budget using query-focused sentence windows."""
+
+from __future__ import annotations
+
+import json
+import math
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import load_settings
+from app.core.textnorm import normalize_whitespace
+from app.modules.memory.policy import tokens
+from app.modules.swarm.prompt_format import serialize_for_prompt
+
+
+CITATION_KEYS = ("doc_id", "segment_id", "start_ms", "end_ms", "speaker", "retrieval_source", "memory_kind")
+# Share of the budget kept free for structured (graph) evidence when any is present.
+STRUCTURED_SHARE = 0.25
+MIN_ITEM_TOKENS = 24
+WINDOW_RADIUS = 1
+
+_WORD_RE = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+|\n+")
+
+
+def estimate_tokens(text: object) -> int:
+    """Approximate BPE token count: ~4 ASCII chars per token per word, denser for non-ASCII, 1 per symbol."""
+    total = 0
+    for piece in _WORD_RE.findall(str(text or "")):
+        if piece.isascii():
+            total += max(1, math.ceil(len(piece) / 4.0)) if piece[0].isalnum() or piece[0] == "_" else 1
+        else:
+            total += max(1, math.ceil(len(piece.encode("utf-8")) / 3.0))
+    return total
+
+
+def evidence_budget(model: str) -> int:
+    settings = load_settings()
+    budget = settings.evidence_token_budgets.get(str(model or "").lower(), settings.evidence_token_budget)
+    return max(MIN_ITEM_TOKENS, int(budget))
+
+
+def pack_evidence(
+    question: str,
+    evidence: List[Dict[str, Any]],
+    budget_tokens: int,
+) -> Tuple[str, Dict[str, object]]:
+    """Serialize `evidence` for a prompt within `budget_tokens` (estimated).
+
+    Snippet rows are admitted greedily by score, whole when they fit; otherwise they
+    are reduced to the sentence window that best matches the question, then to their
+    single best sentence, or skipped. Structured rows (graph results) share what is left.
+    Returns (json, meta) like `serialize_for_prompt`.
+    """
+    query_tokens = set(tokens(question))
+    raw = _json_dump(evidence)
+    snippets: List[Tuple[int, Dict[str, Any]]] = []
+    structured: List[Tuple[int, Dict[str, Any]]] = []
+    for idx, row in enumerate(evidence or []):
+        if isinstance(row, dict) and ("text_snippet" in row or "text" in row):
+            snippets.append((idx, row))
+        else:
+            structured.append((idx, row))
+
+    snippet_budget = budget_tokens if not structured else int(budget_tokens * (1.0 - STRUCTURED_SHARE))
+    item_cap = max(MIN_ITEM_TOKENS * 4, budget_tokens // 3)
+    packed: List[Tuple[int, object, int]] = []
+    used = 2  # enclosing brackets; each item below also pays one separator
+    clipped = 0
+
+    ranked = sorted(snippets, key=lambda item: (-_score(item[1]), item[0]))
+    for idx, row in ranked:
+        sentences = _sentences(row.get("text_snippet", row.get("text")))
+        remaining = snippet_budget - used
+        if remaining < MIN_ITEM_TOKENS:
+            break
+        item, cost, shortened = _fit(row, sentences, query_tokens, min(item_cap, remaining - 1))
+        if item is None:
+            continue
+        packed.append((idx, item, cost))
+        used += cost + 1
+        clipped += int(shortened)
+
+    for idx, row in structured:
+        remaining = budget_tokens - used
+        if remaining < MIN_ITEM_TOKENS:
+            break
+        rendered, _meta = serialize_for_prompt(row, max_chars=max(200, remaining * 4), max_list_items=12, max_text_chars=220)
+        cost = estimate_tokens(rendered) + 1
+        if cost > remaining:
+            continue
+        packed.append((idx, json.loads(rendered), cost))
+        used += cost
+
+    packed.sort(key=lambda item: item[0])
+    rendered = _json_dump([item for _idx, item, _cost in packed])
+    meta: Dict[str, object] = {
+        "chars_raw": len(raw),
+        "chars_final": len(rendered),
+        "truncated": len(packed) < len(evidence or []) or clipped > 0,
+        "tokens_budget": int(budget_tokens),
+        "tokens_est": estimate_tokens(rendered),
+        "items_in": len(evidence or []),
+        "items_packed": len(packed),
+        "items_clipped": clipped,
+    }
+    return rendered, meta
+
+
+def sentence_window(sentences: List[str], query_tokens: set, radius: int = WINDOW_RADIUS) -> Tuple[int, int]:
+    """Bounds [start, end) of the best-matching sentence plus `radius` neighbours on each side."""
+    if not sentences:
+        return 0, 0
+    best = 0
+    best_hits = -1
+    for idx, sentence in enumerate(sentences):
+        hits = len(query_tokens.intersection(tokens(sentence)))
+        if hits > best_hits:
+            best, best_hits = idx, hits
+    return max(0, best - radius), min(len(sentences), best + radius + 1)
+
+
+def _fit(
+    row: Dict[str, Any],
+    sentences: List[str],
+    query_tokens: set,
+    limit: int,
+) -> Tuple[Optional[Dict[str, Any]], int, bool]:
+    # Whole snippet first; the query window and then the single best sentence only when it does not fit.
+    candidates = [(0, len(sentences))]
+    for radius in (WINDOW_RADIUS, 0):
+        window = sentence_window(sentences, query_tokens, radius=radius)
+        if window != candidates[-1] and window[1] > window[0]:
+            candidates.append(window)
+    for lo, hi in candidates:
+        item = _item(row, " ".join(sentences[lo:hi]))
+        cost = estimate_tokens(_json_dump(item))
+        if cost <= limit:
+            return item, cost, (lo, hi) != (0, len(sentences))
+    # Even the best sentence is too long: keep as many of its words as fit.
+    lo, hi = candidates[-1]
+    words = " ".join(sentences[lo:hi]).split()
+    overhead = estimate_tokens(_json_dump(_item(row, "")))
+    keep: List[str] = []
+    spent = overhead
+    for word in words:
+        spent += estimate_tokens(word)
+        if spent > limit:
+            break
+        keep.append(word)
+    if not keep:
+        return None, 0, False
+    item = _item(row, " ".join(keep) + " ...")
+    return item, estimate_tokens(_json_dump(item)), True
+
+
+def _item(row: Dict[str, Any], text: str) -> Dict[str, Any]:
+    item = {key: row.get(key) for key in CITATION_KEYS if row.get(key) is not None}
+    item["text_snippet"] = text
+    return item
+
+
+def _sentences(text: object) -> List[str]:
+    parts = [normalize_whitespace(part) for part in _SENTENCE_RE.split(str(text or ""))]
+    return [part for part in parts if part]
+
+
+def _score(row: Dict[str, Any]) -> float:
+    try:
+        return float(row.get("score") or 0.0)
+    except Exception:
+        return 0.0
+
+
+def _json_dump(payload: object) -> str:
+    return json.dumps(payload, ensure_ascii=True, sort_keys=True, default=str, separators=(",", ":"))
@@ -10,6 +10,7 @@ from app.core.models import SynthesizeOutput, SynthesizeCitation, AnalyzeOutput
 from app.core.prompts import render_prompt
 from app.core.textnorm import normalize_user_text
 from app.modules.privacy.egress_policy import apply_egress_policy
+from app.modules.swarm.evidence_packer import evidence_budget, pack_evidence
 from app.modules.swarm.prompt_format import serialize_for_prompt
 from app.queue.logs import log_run
 
@@ -24,7 +25,7 @@ def synthesize(
     question = normalize_user_text(raw_question, max_len=2400)
     settings = load_settings()
     model = settings.ollama_model_strong if use_strong_model else settings.ollama_model_fast
-    evidence_json, evidence_meta = serialize_for_prompt(evidence, max_chars=9000, max_list_items=20, max_text_chars=700)
+    evidence_json, evidence_meta = pack_evidence(question, evidence, evidence_budget(model))
     analysis_json, analysis_meta = serialize_for_prompt(
         analysis.model_dump() if analysis else {},
         max_chars=3500,
@@ -50,6 +51,9 @@ def synthesize(
             "evidence_prompt_chars_raw": evidence_meta.get("chars_raw"),
             "evidence_prompt_chars": evidence_meta.get("chars_final"),
             "evidence_prompt_truncated": evidence_meta.get("truncated"),
+            "evidence_prompt_tokens_budget": evidence_meta.get("tokens_budget"),
+            "evidence_prompt_tokens_est": evidence_meta.get("tokens_est"),
+            "evidence_items_packed": evidence_meta.get("items_packed"),
             "analysis_prompt_chars_raw": analysis_meta.get("chars_raw"),
             "analysis_prompt_chars": analysis_meta.get("chars_final"),
             "analysis_prompt_truncated": analysis_meta.get("truncated"),
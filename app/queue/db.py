@@ -5,6 +5,7 @@ from __future__ import annotations
 import sqlite3
 from contextlib import contextmanager
 from dataclasses import dataclass
+from datetime import timezone
 from pathlib import Path
 from typing import Iterator, Optional
 
@@ -21,17 +22,34 @@ except Exception:
     psycopg2 = None
 
 
+# Fields promoted from memory_items.source_refs to indexed columns (kept in source_refs as well).
+MEMORY_PROMOTED_COLUMNS = ("user_id", "project_id", "session_id", "memory_kind", "memory_slot", "kind", "superseded_by")
+# Per-row counters derived from source_refs at write time so memory stats aggregate without parsing JSON.
+MEMORY_COUNTER_COLUMNS = ("supersedes_count", "signal_count", "cited_count", "missed_count")
+# memory_items timestamps compared as strings in SQLite, so they are stored as UTC ISO-8601.
+MEMORY_TIMESTAMP_COLUMNS = ("created_at", "expires_at", "last_accessed_at", "pinned_until")
+# embedding_meta row recording the dimension whose embedding_vec backfill has completed.
+PGVECTOR_BACKFILL_KEY = "pgvector_backfill_dim"
+MEMORY_PGVECTOR_BACKFILL_KEY = "pgvector_backfill_dim_memory"
+
+
 @dataclass
 class ConnWrapper:
     conn: object
     is_sqlite: bool
 
-    def cursor(self):
+    def cursor(self, name: Optional[str] = None):
+        # Named (server-side) cursors stream large result sets on Postgres; SQLite already iterates lazily.
+        if name and not self.is_sqlite:
+            return self.conn.cursor(name=name)
         return self.conn.cursor()
 
     def commit(self):
         return self.conn.commit()
 
+    def rollback(self):
+        return self.conn.rollback()
+
     def close(self):
         return self.conn.close()
 
@@ -105,13 +123,80 @@ def init_db(dsn: Optional[str] = None) -> None:
                 "memory_id TEXT PRIMARY KEY, memory_type TEXT, text TEXT, topics TEXT, entities TEXT, source_refs TEXT, "
                 "importance REAL NOT NULL DEFAULT 0.5, confidence REAL NOT NULL DEFAULT 0.7, "
                 "access_count INTEGER NOT NULL DEFAULT 0, last_accessed_at TEXT, expires_at TEXT, pinned_until TEXT, "
-                "created_at TEXT)"
+                "created_at TEXT, user_id TEXT, project_id TEXT, session_id TEXT, memory_kind TEXT, memory_slot TEXT, kind TEXT, "
+                "superseded_by TEXT, supersedes_count INTEGER NOT NULL DEFAULT 0, signal_count INTEGER NOT NULL DEFAULT 0, "
+                "cited_count INTEGER NOT NULL DEFAULT 0, missed_count INTEGER NOT NULL DEFAULT 0)"
+            )
+            cur.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (doc_id TEXT, segment_id TEXT, source_id TEXT, source_version TEXT, text TEXT, text_hash TEXT, embedding TEXT, start_ms INTEGER, end_ms INTEGER, speaker TEXT, source_refs TEXT, updated_at TEXT, "
+                "embedding_model TEXT, embedding_dim INTEGER, embedding_next TEXT, embedding_next_model TEXT, tokens TEXT, "
+                "PRIMARY KEY (doc_id, segment_id))"
+            )
+            cur.execute(
+                "CREATE TABLE IF NOT EXISTS embedding_meta (key TEXT PRIMARY KEY, value TEXT, updated_at TEXT)"
+            )
+            cur.execute(
+                "CREATE TABLE IF NOT EXISTS memory_embeddings (memory_id TEXT PRIMARY KEY, memory_type TEXT, "
+                "user_id TEXT, project_id TEXT, session_id TEXT, text_hash TEXT, embedding TEXT, "
+                "embedding_model TEXT, embedding_dim INTEGER, updated_at TEXT)"
+            )
+            cur.execute(
+                "CREATE INDEX IF NOT EXISTS idx_memory_embeddings_type ON memory_embeddings(embedding_model, memory_type)"
+            )
+            cur.execute(
+                "CREATE TABLE IF NOT EXISTS doc_embeddings (doc_id TEXT PRIMARY KEY, source_id TEXT, source_version TEXT, "
+                "summary TEXT, text_hash TEXT, embedding TEXT, embedding_model TEXT, embedding_dim INTEGER, updated_at TEXT)"
+            )
+            cur.execute(
+                "CREATE TABLE IF NOT EXISTS retrieval_boosts (user_id TEXT NOT NULL DEFAULT '', project_id TEXT NOT NULL DEFAULT '', "
+                "session_id TEXT NOT NULL DEFAULT '', query_cluster TEXT NOT NULL, doc_id TEXT NOT NULL, "
+                "segment_id TEXT NOT NULL DEFAULT '', query_tokens TEXT, cited_weight REAL NOT NULL DEFAULT 0, "
+                "missed_weight REAL NOT NULL DEFAULT 0, updated_at TEXT, "
+                "PRIMARY KEY (user_id, project_id, session_id, query_cluster, doc_id, segment_id))"
             )
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_retrieval_boosts_doc ON retrieval_boosts(doc_id, user_id, project_id)")
             cur.execute(
-                "CREATE TABLE IF NOT EXISTS embeddings (doc_id TEXT, segment_id TEXT, source_id TEXT, source_version TEXT, text TEXT, text_hash TEXT, embedding TEXT, start_ms INTEGER, end_ms INTEGER, speaker TEXT, source_refs TEXT, updated_at TEXT, PRIMARY KEY (doc_id, segment_id))"
+                "CREATE TABLE IF NOT EXISTS memory_slots (user_id TEXT NOT NULL DEFAULT '', project_id TEXT NOT NULL DEFAULT '', "
+                "session_id TEXT NOT NULL DEFAULT '', memory_kind TEXT NOT NULL, memory_slot TEXT NOT NULL, "
+                "memory_id TEXT NOT NULL, memory_value TEXT, updated_at TEXT, "
+                "PRIMARY KEY (user_id, project_id, session_id, memory_kind, memory_slot))"
             )
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_memory_slots_memory ON memory_slots(memory_id)")
+            cur.execute(
+                "CREATE TABLE IF NOT EXISTS data_generation (name TEXT PRIMARY KEY, value INTEGER NOT NULL DEFAULT 0, updated_at TEXT)"
+            )
+            try:
+                cur.execute("PRAGMA table_info(chunk_fts)")
+                fts_columns = {str(row[1]).lower() for row in cur.fetchall()}
+                migrate_fts = bool(fts_columns) and "tokens" not in fts_columns
+                if migrate_fts:
+                    # FTS5 tables cannot gain columns: rebuild under the new layout and copy the rows over.
+                    cur.execute("ALTER TABLE chunk_fts RENAME TO chunk_fts_old")
+                cur.execute(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS chunk_fts USING fts5("
+                    "text, doc_id UNINDEXED, segment_id UNINDEXED, source_id UNINDEXED, source_version UNINDEXED, "
+                    "start_ms UNINDEXED, end_ms UNINDEXED, speaker UNINDEXED, source_refs UNINDEXED, tokens UNINDEXED, "
+                    "tokenize='unicode61 remove_diacritics 2')"
+                )
+                if migrate_fts:
+                    # Empty tokens are re-derived from the text at fusion time.
+                    cur.execute(
+                        "INSERT INTO chunk_fts (text, doc_id, segment_id, source_id, source_version, start_ms, end_ms, "
+                        "speaker, source_refs, tokens) "
+                        "SELECT text, doc_id, segment_id, source_id, source_version, start_ms, end_ms, speaker, source_refs, '' "
+                        "FROM chunk_fts_old"
+                    )
+                    cur.execute("DROP TABLE chunk_fts_old")
+            except sqlite3.OperationalError:
+                # SQLite built without FTS5: lexical retrieval degrades to no results.
+                pass
+            _ensure_memory_fts(conn)
             conn.commit()
             _ensure_memory_columns(conn)
+            _normalize_memory_timestamps(conn)
+            _backfill_memory_slots(conn)
+            _backfill_retrieval_boosts(conn)
+            _ensure_embedding_columns(conn)
         return
 
     schema_path = Path(__file__).with_name("schema.sql")
@@ -121,6 +206,10 @@ def init_db(dsn: Optional[str] = None) -> None:
         cur.execute(sql)
         conn.commit()
         _ensure_memory_columns(conn)
+        _backfill_memory_slots(conn)
+        _backfill_retrieval_boosts(conn)
+        _ensure_embedding_columns(conn)
+        _ensure_pgvector(conn)
 
 
 def _ensure_memory_columns(conn: ConnWrapper) -> None:
@@ -142,11 +231,20 @@ def _ensure_memory_columns(conn: ConnWrapper) -> None:
             stmts.append("ALTER TABLE memory_items ADD COLUMN expires_at TEXT")
         if "pinned_until" not in existing:
             stmts.append("ALTER TABLE memory_items ADD COLUMN pinned_until TEXT")
+        missing_promoted = [name for name in MEMORY_PROMOTED_COLUMNS if name not in existing]
+        stmts.extend(f"ALTER TABLE memory_items ADD COLUMN {name} TEXT" for name in missing_promoted)
+        missing_counters = [name for name in MEMORY_COUNTER_COLUMNS if name not in existing]
+        stmts.extend(f"ALTER TABLE memory_items ADD COLUMN {name} INTEGER NOT NULL DEFAULT 0" for name in missing_counters)
         for stmt in stmts:
             try:
                 cur.execute(stmt)
             except Exception:
                 pass
+        if missing_promoted:
+            _backfill_memory_columns(conn)
+        if missing_counters:
+            _backfill_memory_counters(conn)
+        _create_memory_indexes(conn)
         conn.commit()
         return
 
@@ -172,14 +270,331 @@ def _ensure_memory_columns(conn: ConnWrapper) -> None:
         stmts.append("ALTER TABLE memory_items ADD COLUMN expires_at TIMESTAMPTZ")
     if "pinned_until" not in existing:
         stmts.append("ALTER TABLE memory_items ADD COLUMN pinned_until TIMESTAMPTZ")
+    missing_promoted = [name for name in MEMORY_PROMOTED_COLUMNS if name not in existing]
+    stmts.extend(f"ALTER TABLE memory_items ADD COLUMN {name} TEXT" for name in missing_promoted)
+    missing_counters = [name for name in MEMORY_COUNTER_COLUMNS if name not in existing]
+    stmts.extend(f"ALTER TABLE memory_items ADD COLUMN {name} INT NOT NULL DEFAULT 0" for name in missing_counters)
     for stmt in stmts:
         try:
             cur.execute(stmt)
         except Exception:
             pass
+    # Keep the new columns even if a backfill statement fails and rolls back.
+    conn.commit()
+    if missing_promoted:
+        _backfill_memory_columns(conn)
+    if missing_counters:
+        _backfill_memory_counters(conn)
     try:
         cur.execute("CREATE INDEX IF NOT EXISTS idx_memory_type_created ON memory_items(memory_type, created_at DESC)")
         cur.execute("CREATE INDEX IF NOT EXISTS idx_memory_expires ON memory_items(expires_at)")
     except Exception:
         pass
+    _create_memory_indexes(conn)
+    if "tsv" not in existing:
+        try:
+            cur.execute(
+                "ALTER TABLE memory_items ADD COLUMN IF NOT EXISTS tsv tsvector GENERATED ALWAYS AS ("
+                "to_tsvector('simple', coalesce(text, '') || ' ' || coalesce(topics::text, '') || ' ' || coalesce(entities::text, ''))"
+                ") STORED"
+            )
+        except Exception:
+            conn.rollback()
+    try:
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_memory_items_tsv ON memory_items USING GIN (tsv)")
+    except Exception:
+        conn.rollback()
     conn.commit()
+
+
+def _backfill_memory_columns(conn: ConnWrapper) -> None:
+    """Copy scope ids, memory_kind, memory_slot, kind and superseded_by out of source_refs into their columns."""
+    cur = conn.cursor()
+    if conn.is_sqlite:
+        scope = "COALESCE(json_extract(source_refs, '$.{0}'), json_extract(source_refs, '$.scope.{0}'))"
+        field = "json_extract(source_refs, '$.{0}')"
+        guard = "json_valid(source_refs)"
+    else:
+        scope = "COALESCE(source_refs->>'{0}', source_refs->'scope'->>'{0}')"
+        field = "source_refs->>'{0}'"
+        guard = "source_refs IS NOT NULL"
+    assignments = [f"{key}={scope.format(key)}" for key in ("user_id", "project_id", "session_id")]
+    assignments += [f"{key}={field.format(key)}" for key in ("memory_kind", "memory_slot", "kind", "superseded_by")]
+    try:
+        cur.execute(f"UPDATE memory_items SET {', '.join(assignments)} WHERE {guard}")
+    except Exception:
+        conn.rollback()
+
+
+def _backfill_memory_counters(conn: ConnWrapper) -> None:
+    """Derive supersede and retrieval-feedback signal counts from source_refs for existing rows."""
+    cur = conn.cursor()
+    if conn.is_sqlite:
+        outcome = (
+            "(SELECT COUNT(*) FROM json_each(memory_items.source_refs, '$.signals') "
+            "WHERE lower(json_extract(value, '$.outcome')) = '{0}')"
+        )
+        is_list = "json_type(source_refs, '$.signals') = 'array'"
+        stmts = [
+            "UPDATE memory_items SET supersedes_count = COALESCE(json_array_length(source_refs, '$.supersedes'), 0) "
+            "WHERE json_valid(source_refs) AND json_type(source_refs, '$.supersedes') = 'array'",
+            "UPDATE memory_items SET "
+            f"signal_count = CASE WHEN {is_list} THEN json_array_length(source_refs, '$.signals') ELSE 0 END, "
+            f"cited_count = CASE WHEN {is_list} THEN {outcome.format('cited')} "
+            "ELSE CAST(COALESCE(json_extract(source_refs, '$.cited_count'), 0) AS INTEGER) END, "
+            f"missed_count = CASE WHEN {is_list} THEN {outcome.format('missed')} "
+            "ELSE CAST(COALESCE(json_extract(source_refs, '$.missed_count'), 0) AS INTEGER) END "
+            "WHERE kind = 'retrieval_feedback' AND json_valid(source_refs)",
+        ]
+    else:
+        outcome = (
+            "(SELECT COUNT(*) FROM jsonb_array_elements(source_refs->'signals') AS signal "
+            "WHERE lower(signal->>'outcome') = '{0}')"
+        )
+        is_list = "jsonb_typeof(source_refs->'signals') = 'array'"
+        stmts = [
+            "UPDATE memory_items SET supersedes_count = jsonb_array_length(source_refs->'supersedes') "
+            "WHERE jsonb_typeof(source_refs->'supersedes') = 'array'",
+            "UPDATE memory_items SET "
+            f"signal_count = CASE WHEN {is_list} THEN jsonb_array_length(source_refs->'signals') ELSE 0 END, "
+            f"cited_count = CASE WHEN {is_list} THEN {outcome.format('cited')} "
+            "ELSE COALESCE((source_refs->>'cited_count')::int, 0) END, "
+            f"missed_count = CASE WHEN {is_list} THEN {outcome.format('missed')} "
+            "ELSE COALESCE((source_refs->>'missed_count')::int, 0) END "
+            "WHERE kind = 'retrieval_feedback' AND source_refs IS NOT NULL",
+        ]
+    for stmt in stmts:
+        try:
+            cur.execute(stmt)
+        except Exception:
+            conn.rollback()
+
+
+def _normalize_memory_timestamps(conn: ConnWrapper) -> None:
+    """SQLite: rewrite memory timestamps to UTC ISO-8601 so string comparisons order them by time.
+
+    Older rows carry `YYYY-MM-DD HH:MM:SS` (CURRENT_TIMESTAMP) or non-UTC offsets, which
+    sort wrongly against the `...T...+00:00` values the write path stores. Unparseable
+    values are left as they are.
+    """
+    # Imported here: app.modules.memory imports this module.
+    from app.modules.memory.policy import parse_iso
+
+    canonical = "[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]T[0-9][0-9]:[0-9][0-9]:[0-9][0-9]*+00:00"
+    columns = ", ".join(MEMORY_TIMESTAMP_COLUMNS)
+    odd = " OR ".join(f"({name} IS NOT NULL AND {name} NOT GLOB '{canonical}')" for name in MEMORY_TIMESTAMP_COLUMNS)
+    cur = conn.cursor()
+    cur.execute(f"SELECT memory_id, {columns} FROM memory_items WHERE {odd}")
+    updates = []
+    for row in cur.fetchall():
+        values = []
+        for raw in row[1:]:
+            parsed = parse_iso(raw)
+            values.append(parsed.astimezone(timezone.utc).isoformat() if parsed else raw)
+        updates.append(tuple(values) + (row[0],))
+    if updates:
+        assignments = ", ".join(f"{name}=?" for name in MEMORY_TIMESTAMP_COLUMNS)
+        cur.executemany(f"UPDATE memory_items SET {assignments} WHERE memory_id=?", updates)
+        conn.commit()
+
+
+def _backfill_memory_slots(conn: ConnWrapper) -> None:
+    """Seed an empty memory_slots table with the newest unsuperseded holder of each (scope, kind, slot).
+
+    Older live holders stay live here; the next overwrite of the slot supersedes them by column.
+    """
+    cur = conn.cursor()
+    cur.execute("SELECT 1 FROM memory_slots LIMIT 1")
+    if cur.fetchone() is not None:
+        return
+    value = "json_extract(source_refs, '$.memory_value')" if conn.is_sqlite else "source_refs->>'memory_value'"
+    try:
+        cur.execute(
+            "INSERT INTO memory_slots (user_id, project_id, session_id, memory_kind, memory_slot, memory_id, memory_value, updated_at) "
+            "SELECT user_id, project_id, session_id, memory_kind, memory_slot, memory_id, memory_value, created_at FROM ("
+            "SELECT COALESCE(user_id, '') AS user_id, COALESCE(project_id, '') AS project_id, "
+            "COALESCE(session_id, '') AS session_id, COALESCE(memory_kind, 'semantic') AS memory_kind, memory_slot, "
+            f"memory_id, {value} AS memory_value, created_at, ROW_NUMBER() OVER ("
+            "PARTITION BY COALESCE(user_id, ''), COALESCE(project_id, ''), COALESCE(session_id, ''), "
+            "COALESCE(memory_kind, 'semantic'), memory_slot ORDER BY created_at DESC, memory_id DESC) AS rn "
+            "FROM memory_items WHERE memory_slot IS NOT NULL AND COALESCE(superseded_by, '') = ''"
+            ") ranked WHERE rn = 1"
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+
+
+def _backfill_retrieval_boosts(conn: ConnWrapper) -> None:
+    """Seed an empty retrieval_boosts table from feedback memories recorded before it existed."""
+    # Imported here: the replay reuses the feedback decay, and that module imports this one.
+    from app.modules.memory.retrieval_feedback import backfill_retrieval_boosts
+
+    try:
+        backfill_retrieval_boosts(conn)
+    except Exception:
+        conn.rollback()
+
+
+def _create_memory_indexes(conn: ConnWrapper) -> None:
+    cur = conn.cursor()
+    for stmt in (
+        "CREATE INDEX IF NOT EXISTS idx_memory_scope_type_created ON memory_items(user_id, project_id, memory_type, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_memory_session_created ON memory_items(session_id, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_memory_kind_scope_created ON memory_items(kind, user_id, project_id, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_memory_slot ON memory_items(memory_slot, memory_kind)",
+        "CREATE INDEX IF NOT EXISTS idx_memory_created ON memory_items(created_at, memory_id)",
+    ):
+        try:
+            cur.execute(stmt)
+        except Exception:
+            if not conn.is_sqlite:
+                conn.rollback()
+
+
+def _ensure_memory_fts(conn: ConnWrapper) -> None:
+    """SQLite: FTS5 index over memory text/topics/entities, keyed by memory_id and kept in sync by triggers.
+
+    memory_items has a TEXT primary key, so its implicit rowid may be renumbered by
+    VACUUM; the index therefore stores memory_id itself instead of pointing at rowids.
+    """
+    cur = conn.cursor()
+    cur.execute("PRAGMA table_info(memory_fts)")
+    columns = {str(row[1]).lower() for row in cur.fetchall()}
+    if columns and "memory_id" not in columns:
+        # Rowid-keyed external-content layout: drop it and re-index below.
+        for name in ("memory_items_fts_insert", "memory_items_fts_delete", "memory_items_fts_update"):
+            cur.execute(f"DROP TRIGGER IF EXISTS {name}")
+        cur.execute("DROP TABLE memory_fts")
+        columns = set()
+    try:
+        cur.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS memory_fts USING fts5("
+            "text, topics, entities, memory_id UNINDEXED, tokenize='unicode61 remove_diacritics 2')"
+        )
+    except sqlite3.OperationalError:
+        # SQLite built without FTS5: recall falls back to substring matching.
+        return
+    cur.execute(
+        "CREATE TRIGGER IF NOT EXISTS memory_items_fts_insert AFTER INSERT ON memory_items BEGIN "
+        "INSERT INTO memory_fts (text, topics, entities, memory_id) "
+        "VALUES (new.text, new.topics, new.entities, new.memory_id); END"
+    )
+    cur.execute(
+        "CREATE TRIGGER IF NOT EXISTS memory_items_fts_delete AFTER DELETE ON memory_items BEGIN "
+        "DELETE FROM memory_fts WHERE memory_id = old.memory_id; END"
+    )
+    cur.execute(
+        "CREATE TRIGGER IF NOT EXISTS memory_items_fts_update AFTER UPDATE OF text, topics, entities ON memory_items BEGIN "
+        "DELETE FROM memory_fts WHERE memory_id = old.memory_id; "
+        "INSERT INTO memory_fts (text, topics, entities, memory_id) "
+        "VALUES (new.text, new.topics, new.entities, new.memory_id); END"
+    )
+    if not columns:
+        # Index memories written before the FTS table (or its memory_id column) existed.
+        cur.execute(
+            "INSERT INTO memory_fts (text, topics, entities, memory_id) "
+            "SELECT text, topics, entities, memory_id FROM memory_items"
+        )
+
+
+def _ensure_embedding_columns(conn: ConnWrapper) -> None:
+    """Add model/dimension bookkeeping and the re-embed shadow columns to older embeddings tables."""
+    cur = conn.cursor()
+    if conn.is_sqlite:
+        cur.execute("PRAGMA table_info(embeddings)")
+        existing = {str(row[1]).lower() for row in cur.fetchall()}
+        columns = {
+            "embedding_model": "TEXT",
+            "embedding_dim": "INTEGER",
+            "embedding_next": "TEXT",
+            "embedding_next_model": "TEXT",
+            "tokens": "TEXT",
+        }
+    else:
+        try:
+            cur.execute(
+                "SELECT column_name FROM information_schema.columns WHERE table_schema = current_schema() AND table_name = 'embeddings'"
+            )
+            existing = {str(row[0]).lower() for row in cur.fetchall()}
+        except Exception:
+            return
+        columns = {
+            "embedding_model": "TEXT",
+            "embedding_dim": "INT",
+            "embedding_next": "JSONB",
+            "embedding_next_model": "TEXT",
+            "tokens": "TEXT",
+        }
+    for name, column_type in columns.items():
+        if name in existing:
+            continue
+        try:
+            cur.execute(f"ALTER TABLE embeddings ADD COLUMN {name} {column_type}")
+        except Exception:
+            pass
+    try:
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_model ON embeddings(embedding_model)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_doc_start ON embeddings(doc_id, start_ms)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_source ON embeddings(source_id, source_version)")
+    except Exception:
+        pass
+    if not conn.is_sqlite:
+        try:
+            cur.execute("ALTER TABLE chunk_index ADD COLUMN IF NOT EXISTS tokens TEXT")
+        except Exception:
+            conn.rollback()
+    conn.commit()
+
+
+def _ensure_pgvector(conn: ConnWrapper) -> bool:
+    """Add a pgvector column + ANN index to embeddings and memory_embeddings when the extension is available."""
+    settings = load_settings()
+    if conn.is_sqlite or not settings.pgvector_enabled:
+        return False
+    dim = int(settings.pgvector_dim)
+    cur = conn.cursor()
+    try:
+        cur.execute("CREATE EXTENSION IF NOT EXISTS vector")
+        for table, backfill_key in (("embeddings", PGVECTOR_BACKFILL_KEY), ("memory_embeddings", MEMORY_PGVECTOR_BACKFILL_KEY)):
+            cur.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS embedding_vec vector({dim})")
+            cur.execute("SELECT value FROM embedding_meta WHERE key = %s", (backfill_key,))
+            row = cur.fetchone()
+            if row is None or str(row[0]) != str(dim):
+                # Backfill rows written before the extension was enabled (JSON array text is a valid vector literal).
+                # Runs before the index exists so it is not maintained row by row, and IVFFlat lists are trained
+                # on filled data. Newer rows get embedding_vec on upsert, so this runs once per dimension.
+                cur.execute(
+                    f"UPDATE {table} SET embedding_vec = CAST(CAST(embedding AS TEXT) AS vector) "
+                    "WHERE embedding_vec IS NULL AND jsonb_array_length(embedding) = %s",
+                    (dim,),
+                )
+                cur.execute(
+                    "INSERT INTO embedding_meta (key, value, updated_at) VALUES (%s, %s, now()) "
+                    "ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value, updated_at = now()",
+                    (backfill_key, str(dim)),
+                )
+        # Memories arrive a few at a time, so they always get HNSW (IVFFlat lists trained on a
+        # near-empty table would stay unbalanced).
+        cur.execute(
+            "CREATE INDEX IF NOT EXISTS idx_memory_embeddings_vec_hnsw ON memory_embeddings "
+            "USING hnsw (embedding_vec vector_cosine_ops)"
+        )
+        if settings.pgvector_index == "ivfflat":
+            cur.execute(
+                "CREATE INDEX IF NOT EXISTS idx_embeddings_vec_ivfflat ON embeddings "
+                f"USING ivfflat (embedding_vec vector_cosine_ops) WITH (lists = {int(settings.pgvector_ivfflat_lists)})"
+            )
+        else:
+            cur.execute(
+                "CREATE INDEX IF NOT EXISTS idx_embeddings_vec_hnsw ON embeddings "
+                "USING hnsw (embedding_vec vector_cosine_ops)"
+            )
+        conn.commit()
+        return True
+    except Exception:
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+        return False
@@ -0,0 +1,93 @@
+"""Named data generation counters used to invalidate derived caches.
+
+`retrieval` moves on writes to the retrieval data (chunks, chunk and summary
+embeddings, Snowflake publishes, source deletes); memory, feedback and handoff
+writes leave it alone. `embeddings` moves only when chunk vectors or the active
+embedding model change, so indexes built from the embeddings table are not
+rebuilt after unrelated writes.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+from typing import Dict, Optional
+
+from app.core.config import load_settings
+from app.queue.db import ConnWrapper, _postgres_conn, _sqlite_conn, get_conn
+
+
+RETRIEVAL_GENERATION = "retrieval"
+EMBEDDINGS_GENERATION = "embeddings"
+
+# One long-lived reader connection per (thread, DSN): checking the generation on a
+# cache hit must cost a single indexed read, not a connection handshake.
+_READERS = threading.local()
+
+
+def bump_generation(conn: Optional[ConnWrapper] = None, name: str = RETRIEVAL_GENERATION) -> None:
+    """Advance generation `name`. With `conn`, the bump joins the caller's transaction (the caller commits)."""
+    if conn is None:
+        with get_conn() as own:
+            bump_generation(own, name)
+            own.commit()
+        return
+    cur = conn.cursor()
+    if conn.is_sqlite:
+        sql = (
+            "INSERT INTO data_generation (name, value, updated_at) VALUES (?, 1, CURRENT_TIMESTAMP) "
+            "ON CONFLICT(name) DO UPDATE SET value=data_generation.value + 1, updated_at=CURRENT_TIMESTAMP"
+        )
+    else:
+        sql = (
+            "INSERT INTO data_generation (name, value, updated_at) VALUES (%s, 1, now()) "
+            "ON CONFLICT (name) DO UPDATE SET value=data_generation.value + 1, updated_at=now()"
+        )
+    try:
+        cur.execute(sql, (name,))
+    except sqlite3.OperationalError:
+        # Table missing (database not initialised yet): nothing can be cached against it either.
+        pass
+
+
+def read_generation(conn: ConnWrapper, name: str = RETRIEVAL_GENERATION) -> int:
+    """Value of generation `name` as `conn` sees it, e.g. inside the transaction that just bumped it."""
+    cur = conn.cursor()
+    ph = "?" if conn.is_sqlite else "%s"
+    cur.execute(f"SELECT value FROM data_generation WHERE name={ph}", (name,))
+    row = cur.fetchone()
+    return int(row[0]) if row else 0
+
+
+def current_generation(name: str = RETRIEVAL_GENERATION) -> Optional[int]:
+    """Current value of generation `name`, or None when it cannot be read (callers must then bypass caches)."""
+    dsn = load_settings().postgres_dsn
+    readers: Dict[str, ConnWrapper] = getattr(_READERS, "conns", None) or {}
+    _READERS.conns = readers
+    conn = readers.get(dsn)
+    try:
+        if conn is None:
+            conn = _open_reader(dsn)
+            readers[dsn] = conn
+        cur = conn.cursor()
+        ph = "?" if conn.is_sqlite else "%s"
+        cur.execute(f"SELECT value FROM data_generation WHERE name={ph}", (name,))
+        row = cur.fetchone()
+        return int(row[0]) if row else 0
+    except Exception:
+        stale = readers.pop(dsn, None)
+        if stale is not None:
+            try:
+                stale.close()
+            except Exception:
+                pass
+        return None
+
+
+def _open_reader(dsn: str) -> ConnWrapper:
+    if dsn.startswith("sqlite://"):
+        # sqlite3 opens no transaction for a bare SELECT, so every read sees the latest commit.
+        return _sqlite_conn(dsn)
+    conn = _postgres_conn(dsn)
+    conn.conn.autocommit = True  # type: ignore[attr-defined]
+    return conn
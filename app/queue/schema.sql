@@ -48,7 +48,21 @@ CREATE TABLE IF NOT EXISTS memory_items (
   last_accessed_at TIMESTAMPTZ,
   expires_at TIMESTAMPTZ,
   pinned_until TIMESTAMPTZ,
-  created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+  created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  user_id TEXT,
+  project_id TEXT,
+  session_id TEXT,
+  memory_kind TEXT,
+  memory_slot TEXT,
+  kind TEXT,
+  superseded_by TEXT,
+  supersedes_count INT NOT NULL DEFAULT 0,
+  signal_count INT NOT NULL DEFAULT 0,
+  cited_count INT NOT NULL DEFAULT 0,
+  missed_count INT NOT NULL DEFAULT 0,
+  tsv tsvector GENERATED ALWAYS AS (
+    to_tsvector('simple', coalesce(text, '') || ' ' || coalesce(topics::text, '') || ' ' || coalesce(entities::text, ''))
+  ) STORED
 );
 CREATE INDEX IF NOT EXISTS idx_memory_type_created ON memory_items(memory_type, created_at DESC);
 CREATE INDEX IF NOT EXISTS idx_memory_expires ON memory_items(expires_at);
@@ -66,5 +80,96 @@ CREATE TABLE IF NOT EXISTS embeddings (
   speaker TEXT,
   source_refs JSONB,
   updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  embedding_model TEXT,
+  embedding_dim INT,
+  embedding_next JSONB,
+  embedding_next_model TEXT,
+  tokens TEXT,
+  PRIMARY KEY (doc_id, segment_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_embeddings_doc_start ON embeddings(doc_id, start_ms);
+CREATE INDEX IF NOT EXISTS idx_embeddings_source ON embeddings(source_id, source_version);
+
+CREATE TABLE IF NOT EXISTS memory_embeddings (
+  memory_id TEXT PRIMARY KEY,
+  memory_type TEXT NOT NULL,
+  user_id TEXT,
+  project_id TEXT,
+  session_id TEXT,
+  text_hash TEXT NOT NULL,
+  embedding JSONB NOT NULL,
+  embedding_model TEXT,
+  embedding_dim INT,
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+CREATE INDEX IF NOT EXISTS idx_memory_embeddings_type ON memory_embeddings(embedding_model, memory_type);
+
+CREATE TABLE IF NOT EXISTS doc_embeddings (
+  doc_id TEXT PRIMARY KEY,
+  source_id TEXT NOT NULL,
+  source_version TEXT NOT NULL,
+  summary TEXT NOT NULL,
+  text_hash TEXT NOT NULL,
+  embedding JSONB NOT NULL,
+  embedding_model TEXT,
+  embedding_dim INT,
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE TABLE IF NOT EXISTS embedding_meta (
+  key TEXT PRIMARY KEY,
+  value TEXT,
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE TABLE IF NOT EXISTS retrieval_boosts (
+  user_id TEXT NOT NULL DEFAULT '',
+  project_id TEXT NOT NULL DEFAULT '',
+  session_id TEXT NOT NULL DEFAULT '',
+  query_cluster TEXT NOT NULL,
+  doc_id TEXT NOT NULL,
+  segment_id TEXT NOT NULL DEFAULT '',
+  query_tokens JSONB,
+  cited_weight DOUBLE PRECISION NOT NULL DEFAULT 0,
+  missed_weight DOUBLE PRECISION NOT NULL DEFAULT 0,
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  PRIMARY KEY (user_id, project_id, session_id, query_cluster, doc_id, segment_id)
+);
+CREATE INDEX IF NOT EXISTS idx_retrieval_boosts_doc ON retrieval_boosts(doc_id, user_id, project_id);
+
+CREATE TABLE IF NOT EXISTS memory_slots (
+  user_id TEXT NOT NULL DEFAULT '',
+  project_id TEXT NOT NULL DEFAULT '',
+  session_id TEXT NOT NULL DEFAULT '',
+  memory_kind TEXT NOT NULL,
+  memory_slot TEXT NOT NULL,
+  memory_id TEXT NOT NULL,
+  memory_value TEXT,
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  PRIMARY KEY (user_id, project_id, session_id, memory_kind, memory_slot)
+);
+CREATE INDEX IF NOT EXISTS idx_memory_slots_memory ON memory_slots(memory_id);
+
+CREATE TABLE IF NOT EXISTS data_generation (
+  name TEXT PRIMARY KEY,
+  value BIGINT NOT NULL DEFAULT 0,
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE TABLE IF NOT EXISTS chunk_index (
+  doc_id TEXT NOT NULL,
+  segment_id TEXT NOT NULL,
+  source_id TEXT NOT NULL,
+  source_version TEXT NOT NULL,
+  start_ms BIGINT,
+  end_ms BIGINT,
+  speaker TEXT,
+  text TEXT NOT NULL,
+  source_refs JSONB,
+  tokens TEXT,
+  tsv tsvector GENERATED ALWAYS AS (to_tsvector('simple', text)) STORED,
   PRIMARY KEY (doc_id, segment_id)
 );
+CREATE INDEX IF NOT EXISTS idx_chunk_index_tsv ON chunk_index USING GIN (tsv);
+CREATE INDEX IF NOT EXISTS idx_chunk_index_source ON chunk_index(source_id);
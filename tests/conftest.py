@@ -12,6 +12,12 @@ def _suppress_dotenv():
         yield
 
 
+@pytest.fixture(autouse=True)
+def _fail_fast_ollama(monkeypatch):
+    """Inga retries mot Ollama: tester som inte mockar embed ska falla igenom direkt."""
+    monkeypatch.setenv("OLLAMA_REQUEST_RETRIES", "0")
+
+
 @pytest.fixture
 def db(tmp_path, monkeypatch):
     """Initierad SQLite-databas för tester. Ersätter POSTGRES_DSN."""
@@ -0,0 +1,139 @@
+from app.modules.retrieve.chunk_index import delete_chunk_index, index_chunks, search_chunks
+from app.modules.retrieve.retrieve_snowflake import retrieve
+
+
+def _chunks(source_id):
+    return [
+        {
+            "doc_id": source_id,
+            "segment_id": "tchunk_0",
+            "start_ms": 0,
+            "end_ms": 9000,
+            "speaker": "Anna",
+            "text": "The Aurora roadmap puts the retrieval rewrite in the second quarter.",
+            "source_refs": {},
+        },
+        {
+            "doc_id": source_id,
+            "segment_id": "tchunk_1",
+            "start_ms": 9000,
+            "end_ms": 18000,
+            "speaker": "Erik",
+            "text": "Budget discussion for the hardware purchase, nothing about retrieval.",
+            "source_refs": {},
+        },
+        {
+            "doc_id": source_id,
+            "segment_id": "tchunk_2",
+            "start_ms": 18000,
+            "end_ms": 27000,
+            "speaker": "Anna",
+            "text": "Lunch plans.",
+            "source_refs": {},
+        },
+    ]
+
+
+def test_search_chunks_ranks_multi_word_questions_with_bm25(db):
+    assert index_chunks("yt:1", "v1", _chunks("yt:1")) == 3
+
+    results = search_chunks("When is the Aurora retrieval rewrite on the roadmap?", limit=5)
+
+    assert [r["segment_id"] for r in results][:2] == ["tchunk_0", "tchunk_1"]
+    assert results[0]["score"] == 1.0
+    assert 0.0 < results[1]["score"] < 1.0
+    assert all(r["segment_id"] != "tchunk_2" for r in results)
+
+
+def test_search_chunks_applies_filters_and_reindex_replaces_rows(db):
+    index_chunks("yt:1", "v1", _chunks("yt:1"))
+    index_chunks("yt:2", "v1", _chunks("yt:2"))
+
+    only_erik = search_chunks("retrieval", limit=5, filters={"speaker": "erik", "source_ids": ["yt:2"]})
+    assert [(r["doc_id"], r["segment_id"]) for r in only_erik] == [("yt:2", "tchunk_1")]
+
+    late = search_chunks("retrieval", limit=5, filters={"start_ms_from": 5000})
+    assert {r["segment_id"] for r in late} == {"tchunk_1"}
+
+    index_chunks("yt:1", "v2", _chunks("yt:1")[:1])
+    assert len(search_chunks("retrieval", limit=10, filters={"source_ids": ["yt:1"]})) == 1
+
+    assert delete_chunk_index("yt:2") == 3
+    assert search_chunks("budget", limit=5) == []
+
+
+def test_retrieve_uses_lexical_index_without_snowflake(db, monkeypatch):
+    class NoSnowflake:
+        def search_segments(self, query, limit=10, filters=None):
+            return "SQL"
+
+    monkeypatch.setenv("EMBEDDINGS_ENABLED", "0")
+    monkeypatch.setenv("MEMORY_ENABLED", "0")
+    monkeypatch.setenv("CONTEXT_HANDOFF_ENABLED", "0")
+    index_chunks("yt:1", "v1", _chunks("yt:1"))
+
+    results = retrieve("aurora roadmap", limit=3, client=NoSnowflake())
+
+    assert results[0]["doc_id"] == "yt:1"
+    assert results[0]["segment_id"] == "tchunk_0"
+    assert results[0]["retrieval_source"] == "lexical"
+
+
+def test_rebuild_chunk_index_fills_sources_chunked_before_the_index(db, artifact_root):
+    import json
+
+    from app.core.manifest import upsert_manifest
+    from app.core.storage import write_artifact
+    from app.modules.embeddings.embedding_store import upsert_embedding
+    from app.modules.retrieve.chunk_index import rebuild_chunk_index
+
+    write_artifact("doc:1", "v1", "chunks/chunks.jsonl", "\n".join(json.dumps(c) for c in _chunks("doc:1")))
+    upsert_manifest("doc:1", "v1", {"source_id": "doc:1", "artifacts": {"chunks": "chunks/chunks.jsonl"}})
+    # Artifact gone: the embeddings rows are the fallback.
+    upsert_manifest("doc:2", "v1", {"source_id": "doc:2", "artifacts": {"chunks": "chunks/chunks.jsonl"}})
+    upsert_embedding(
+        {
+            "doc_id": "doc:2",
+            "segment_id": "chunk_0",
+            "source_id": "doc:2",
+            "source_version": "v1",
+            "text": "Quarterly telescope maintenance schedule.",
+            "text_hash": "h",
+            "embedding": [1.0, 0.0],
+            "source_refs": {},
+        }
+    )
+    index_chunks("yt:1", "v1", _chunks("yt:1"))
+    upsert_manifest("yt:1", "v1", {"source_id": "yt:1", "artifacts": {"chunks": "chunks/chunks.jsonl"}})
+
+    assert rebuild_chunk_index() == {"sources": 2, "chunks": 4, "skipped": 1}
+    assert {r["doc_id"] for r in search_chunks("retrieval roadmap", limit=10)} == {"doc:1", "yt:1"}
+    assert [r["doc_id"] for r in search_chunks("telescope maintenance", limit=10)] == ["doc:2"]
+    assert rebuild_chunk_index() == {"sources": 0, "chunks": 0, "skipped": 3}
+
+
+def test_init_db_keeps_chunk_fts_rows_when_adding_the_tokens_column(tmp_path, monkeypatch):
+    import sqlite3
+
+    from app.queue.db import init_db
+
+    db_path = tmp_path / "old.db"
+    raw = sqlite3.connect(db_path)
+    raw.execute(
+        "CREATE VIRTUAL TABLE chunk_fts USING fts5("
+        "text, doc_id UNINDEXED, segment_id UNINDEXED, source_id UNINDEXED, source_version UNINDEXED, "
+        "start_ms UNINDEXED, end_ms UNINDEXED, speaker UNINDEXED, source_refs UNINDEXED, "
+        "tokenize='unicode61 remove_diacritics 2')"
+    )
+    raw.execute(
+        "INSERT INTO chunk_fts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        ("The Aurora roadmap puts the retrieval rewrite in Q2.", "yt:1", "tchunk_0", "yt:1", "v1", 0, 9000, "Anna", "{}"),
+    )
+    raw.commit()
+    raw.close()
+    monkeypatch.setenv("POSTGRES_DSN", f"sqlite://{db_path}")
+
+    init_db()
+
+    results = search_chunks("aurora retrieval rewrite", limit=5)
+    assert [(r["doc_id"], r["segment_id"]) for r in results] == [("yt:1", "tchunk_0")]
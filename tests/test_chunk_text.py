@@ -36,6 +36,11 @@ def test_chunk_text_handle_job_writes_chunks(tmp_path, monkeypatch):
     assert "enrich_doc" in job_types
     assert "enrich_chunks" in job_types
 
+    from app.modules.retrieve.chunk_index import search_chunks
+
+    indexed = search_chunks("three", limit=5)
+    assert [r["doc_id"] for r in indexed] == [source_id]
+
 
 def test_chunk_text_includes_intake_annotations_in_source_refs(tmp_path, monkeypatch):
     db_path = tmp_path / "queue.db"
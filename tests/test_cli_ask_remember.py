@@ -115,3 +115,29 @@ def test_cli_ask_uses_default_scope_from_env(tmp_path, monkeypatch):
     assert retrieve_capture["filters"]["project_id"] == "default-project"
     assert retrieve_capture["filters"]["session_id"] == "default-session"
     assert captured["feedback"]["session_id"] == "default-session"
+
+
+def test_cli_ask_raises_when_retrieve_fails(tmp_path, monkeypatch):
+    import pytest
+
+    monkeypatch.setenv("POSTGRES_DSN", f"sqlite://{tmp_path / 'queue.db'}")
+    init_db()
+    monkeypatch.setattr(
+        cli_main,
+        "route_question",
+        lambda q: RouteOutput(intent="ask", filters={}, retrieve_top_k=2, need_strong_model=False, reason="ok"),
+    )
+
+    def broken_retrieve(*_args, **_kwargs):
+        raise RuntimeError("snowflake down")
+
+    monkeypatch.setattr(cli_main, "retrieve", broken_retrieve)
+    monkeypatch.setattr(cli_main, "graph_retrieve", lambda *_args, **_kwargs: [])
+    monkeypatch.setattr(
+        cli_main,
+        "synthesize",
+        lambda *_args, **_kwargs: (_ for _ in ()).throw(AssertionError("must not synthesize without evidence")),
+    )
+
+    with pytest.raises(RuntimeError, match="snowflake down"):
+        cli_main.cmd_ask(SimpleNamespace(question="How is roadmap?", session_id=None, remember=False))
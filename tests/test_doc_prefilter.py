@@ -0,0 +1,156 @@
+import json
+
+from app.core.manifest import get_manifest, upsert_manifest
+from app.core.storage import write_artifact
+from app.modules.embeddings import embed_doc_summary
+from app.modules.embeddings.embedding_store import search_doc_embeddings
+from app.modules.retrieve import retrieve_snowflake
+from app.modules.retrieve.chunk_index import index_chunks
+
+
+VECTORS = {"roadmap": [1.0, 0.0, 0.0], "budget": [0.0, 1.0, 0.0]}
+
+
+class FakeEmptyClient:
+    def search_segments(self, query: str, limit: int = 10, filters=None) -> str:
+        return f"SQL({query},{limit},{filters})"
+
+    def execute_query(self, sql: str):
+        return []
+
+
+def _fake_embed(text, model=None):
+    lower = str(text).lower()
+    return [sum(VECTORS[word][idx] for word in VECTORS if word in lower) or 0.01 for idx in range(3)]
+
+
+def _seed_doc(source_id, summary, chunk_text):
+    upsert_manifest(source_id, "v1", {"source_id": source_id, "artifacts": {"doc_summary": "enrich/doc_summary.json"}})
+    write_artifact(
+        source_id,
+        "v1",
+        "enrich/doc_summary.json",
+        json.dumps({"summary_short": summary, "summary_long": summary, "topics": [], "entities": []}),
+    )
+    embed_doc_summary.handle_job({"source_id": source_id, "source_version": "v1"})
+    index_chunks(
+        source_id,
+        "v1",
+        [{"doc_id": source_id, "segment_id": "chunk_1", "text": chunk_text, "source_refs": {}}],
+    )
+
+
+def test_embed_doc_summary_indexes_each_document_once(db, artifact_root, monkeypatch):
+    monkeypatch.setenv("EMBEDDINGS_ENABLED", "1")
+    calls = []
+    monkeypatch.setattr(embed_doc_summary, "embed", lambda text, model=None: calls.append(text) or _fake_embed(text))
+
+    _seed_doc("doc:roadmap", "Product roadmap for the spring release.", "release notes")
+    embed_doc_summary.handle_job({"source_id": "doc:roadmap", "source_version": "v1"})
+
+    assert len(calls) == 1
+    assert get_manifest("doc:roadmap", "v1")["steps"]["embed_doc_summary"]["status"] == "done"
+    [(doc_id, score)] = search_doc_embeddings(_fake_embed("roadmap"), 5)
+    assert doc_id == "doc:roadmap"
+    assert score > 0.99
+
+
+def test_retrieve_restricts_chunk_search_to_prefiltered_documents(db, artifact_root, monkeypatch):
+    monkeypatch.setenv("EMBEDDINGS_ENABLED", "1")
+    monkeypatch.setenv("MEMORY_ENABLED", "0")
+    monkeypatch.setenv("CONTEXT_HANDOFF_ENABLED", "0")
+    monkeypatch.setattr(embed_doc_summary, "embed", _fake_embed)
+    monkeypatch.setattr(retrieve_snowflake, "embed_query", _fake_embed)
+    _seed_doc("doc:roadmap", "Product roadmap for the spring release.", "the meeting agreed on the plan")
+    _seed_doc("doc:budget", "Budget review for the hardware purchase.", "this meeting settled the plan for purchasing")
+
+    monkeypatch.setenv("RETRIEVE_DOC_PREFILTER_TOP", "0")
+    everything = retrieve_snowflake.retrieve("roadmap meeting plan", limit=5, client=FakeEmptyClient())
+    monkeypatch.setenv("RETRIEVE_DOC_PREFILTER_TOP", "1")
+    report = {}
+    narrowed = retrieve_snowflake.retrieve("roadmap meeting plan", limit=5, client=FakeEmptyClient(), report=report)
+
+    assert {row["doc_id"] for row in everything} == {"doc:roadmap", "doc:budget"}
+    assert {row["doc_id"] for row in narrowed} == {"doc:roadmap"}
+    assert report["prefilter"]["docs"] == ["doc:roadmap"]
+
+
+def test_prefilter_keeps_documents_without_a_summary_vector(db, artifact_root, monkeypatch):
+    monkeypatch.setenv("EMBEDDINGS_ENABLED", "1")
+    monkeypatch.setenv("MEMORY_ENABLED", "0")
+    monkeypatch.setenv("CONTEXT_HANDOFF_ENABLED", "0")
+    monkeypatch.setenv("RETRIEVE_DOC_PREFILTER_TOP", "1")
+    monkeypatch.setattr(embed_doc_summary, "embed", _fake_embed)
+    monkeypatch.setattr(retrieve_snowflake, "embed_query", _fake_embed)
+    _seed_doc("doc:roadmap", "Product roadmap for the spring release.", "the meeting agreed on the plan")
+    _seed_doc("doc:budget", "Budget review for the hardware purchase.", "this meeting settled the plan for purchasing")
+    index_chunks("doc:notes", "v1", [{"doc_id": "doc:notes", "segment_id": "chunk_1", "text": "meeting plan notes", "source_refs": {}}])
+
+    report = {}
+    rows = retrieve_snowflake.retrieve("roadmap meeting plan", limit=5, client=FakeEmptyClient(), report=report)
+
+    assert {row["doc_id"] for row in rows} == {"doc:roadmap", "doc:notes"}
+    assert report["prefilter"]["docs"] == ["doc:roadmap"]
+
+
+def test_prefilter_allow_list_is_bounded_by_the_top_documents(db, artifact_root, monkeypatch):
+    from app.modules.embeddings.embedding_store import chunk_filter_sql
+    from app.queue.db import get_conn
+
+    monkeypatch.setenv("EMBEDDINGS_ENABLED", "1")
+    monkeypatch.setattr(embed_doc_summary, "embed", _fake_embed)
+    for idx in range(5):
+        _seed_doc(f"doc:budget{idx}", "Budget review for the hardware purchase.", "budget chunk")
+    _seed_doc("doc:roadmap", "Product roadmap for the spring release.", "roadmap chunk")
+
+    with get_conn() as conn:
+        where, params = chunk_filter_sql(conn, {"prefilter_doc_ids": ["doc:roadmap"], "doc_ids": ["doc:roadmap", "doc:budget0"]})
+        cur = conn.cursor()
+        cur.execute(f"SELECT DISTINCT doc_id FROM chunk_fts WHERE {where}", tuple(params))
+        allowed = {row[0] for row in cur.fetchall()}
+
+    # Two doc_ids, one ranked id and the active model, however many documents are summarized.
+    assert len(params) == 4
+    assert allowed == {"doc:roadmap"}
+
+
+def test_search_doc_embeddings_applies_chunk_filters(db, artifact_root, monkeypatch):
+    from app.modules.embeddings.embedding_store import upsert_embedding
+
+    monkeypatch.setenv("EMBEDDINGS_ENABLED", "1")
+    monkeypatch.setattr(embed_doc_summary, "embed", _fake_embed)
+    _seed_doc("doc:roadmap", "Product roadmap for the spring release.", "roadmap chunk")
+    _seed_doc("doc:budget", "Budget review for the hardware purchase.", "budget chunk")
+    for doc_id, speaker in (("doc:roadmap", "Anna"), ("doc:budget", "Erik")):
+        upsert_embedding(
+            {
+                "doc_id": doc_id,
+                "segment_id": "chunk_1",
+                "source_id": doc_id,
+                "source_version": "v1",
+                "text": f"{doc_id} chunk",
+                "text_hash": doc_id,
+                "embedding": [1.0, 0.0, 0.0],
+                "speaker": speaker,
+                "source_refs": {},
+            }
+        )
+    query = _fake_embed("roadmap")
+
+    assert [doc for doc, _ in search_doc_embeddings(query, 5, filters={"speaker": "erik"})] == ["doc:budget"]
+    assert [doc for doc, _ in search_doc_embeddings(query, 5, filters={"source_ids": ["doc:budget"]})] == ["doc:budget"]
+    assert search_doc_embeddings(query, 5, filters={"speaker": "nobody"}) == []
+
+
+def test_backfill_doc_summaries_queues_existing_summaries_once(db, artifact_root, monkeypatch, capsys):
+    from app.cli import main as cli_main
+
+    monkeypatch.setenv("EMBEDDINGS_ENABLED", "1")
+    upsert_manifest("doc:old", "v1", {"source_id": "doc:old", "artifacts": {"doc_summary": "enrich/doc_summary.json"}})
+    upsert_manifest("doc:raw", "v1", {"source_id": "doc:raw", "artifacts": {}})
+
+    monkeypatch.setattr("sys.argv", ["aurora", "backfill-doc-summaries"])
+    assert cli_main.main() == 0
+    assert json.loads(capsys.readouterr().out) == {"queued": 1}
+    assert cli_main.main() == 0
+    assert json.loads(capsys.readouterr().out) == {"queued": 0}
@@ -26,7 +26,7 @@ def test_embed_chunks_job(tmp_path, monkeypatch):
     ]
     write_artifact(source_id, source_version, "chunks/chunks.jsonl", "\n".join(json.dumps(c) for c in chunks))
 
-    monkeypatch.setattr(embed_chunks, "embed", lambda text: [0.5, 0.5])
+    monkeypatch.setattr(embed_chunks, "embed", lambda text, model=None: [0.5, 0.5])
     embed_chunks.handle_job({"source_id": source_id, "source_version": source_version, "lane": "oss20b"})
 
     with get_conn() as conn:
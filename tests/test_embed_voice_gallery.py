@@ -24,7 +24,7 @@ def test_embed_voice_gallery(tmp_path, monkeypatch):
     gallery_path = artifacts_root / "voice_gallery.json"
     gallery_path.write_text(json.dumps(gallery, ensure_ascii=True), encoding="utf-8")
 
-    monkeypatch.setattr(embed_voice_gallery, "embed", lambda text: [0.25, 0.75])
+    monkeypatch.setattr(embed_voice_gallery, "embed", lambda text, model=None: [0.25, 0.75])
     embed_voice_gallery.handle_job({"source_id": "voice_gallery", "source_version": "latest", "lane": "oss20b"})
 
     with get_conn() as conn:
@@ -40,3 +40,524 @@ def test_embedding_search(tmp_path, monkeypatch):
 
     results = search_embeddings([1.0, 0.0], limit=1)
     assert results[0]["segment_id"] == "s1"
+
+
+class _FakePgCursor:
+    def __init__(self, log, dim):
+        self.log = log
+        self.dim = dim
+        self._rows = []
+
+    def execute(self, sql, params=None):
+        self.log.append((sql, params))
+        if "pg_attribute" in sql:
+            self._rows = [(self.dim,)]
+        elif "embedding_vec <=>" in sql and "FROM memory_embeddings" in sql:
+            self._rows = [("mem1", 0.81)]
+        elif "embedding_vec <=>" in sql:
+            self._rows = [("doc1", "s1", None, None, None, "alpha", "{}", 0.93, "alpha")]
+        else:
+            self._rows = []
+
+    def executemany(self, sql, rows):
+        self.log.append((sql, list(rows)))
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    def fetchall(self):
+        return list(self._rows)
+
+
+class _FakePgConn:
+    is_sqlite = False
+
+    def __init__(self, log, dim):
+        self.log = log
+        self.dim = dim
+
+    def cursor(self):
+        return _FakePgCursor(self.log, self.dim)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+def _fake_pg(monkeypatch, dim):
+    from contextlib import contextmanager
+
+    from app.modules.embeddings import embedding_store
+
+    log = []
+
+    @contextmanager
+    def fake_get_conn(dsn=None):
+        yield _FakePgConn(log, dim)
+
+    monkeypatch.setenv("POSTGRES_DSN", f"postgresql://fake/pgvector-{dim}")
+    monkeypatch.setenv("OLLAMA_MODEL_EMBED", "nomic-embed-text")
+    monkeypatch.setattr(embedding_store, "get_conn", fake_get_conn)
+    embedding_store._PGVECTOR_DIMS.clear()
+    return log
+
+
+def test_search_embeddings_uses_pgvector_order_by(monkeypatch):
+    log = _fake_pg(monkeypatch, dim=2)
+
+    results = search_embeddings([1.0, 0.0], limit=3)
+
+    assert results[0]["segment_id"] == "s1"
+    assert results[0]["score"] == 0.93
+    assert results[0]["tokens"] == ["alpha"]
+    sql, params = log[-1]
+    assert "ORDER BY embedding_vec <=> CAST(%s AS vector) LIMIT %s" in sql
+    assert "(embedding_model IS NULL OR embedding_model = %s)" in sql
+    assert params == ("[1.0,0.0]", "nomic-embed-text", "[1.0,0.0]", 3)
+
+
+def test_search_embeddings_pushes_filters_into_pgvector_query(monkeypatch):
+    log = _fake_pg(monkeypatch, dim=2)
+
+    search_embeddings([1.0, 0.0], limit=3, filters={"doc_ids": ["doc1"], "speaker": "Anna"})
+
+    assert any("iterative_scan" in sql for sql, _params in log)
+    sql, params = log[-1]
+    assert "embedding_vec IS NOT NULL AND doc_id IN (%s) AND LOWER(speaker) = %s AND (embedding_model" in sql
+    assert params == ("[1.0,0.0]", "doc1", "anna", "nomic-embed-text", "[1.0,0.0]", 3)
+
+
+def test_upsert_embedding_writes_pgvector_column(monkeypatch):
+    log = _fake_pg(monkeypatch, dim=2)
+
+    upsert_embedding(
+        {
+            "doc_id": "doc1",
+            "segment_id": "s1",
+            "source_id": "doc1",
+            "source_version": "v1",
+            "text": "alpha",
+            "text_hash": "h1",
+            "embedding": [0.25, 0.75],
+        }
+    )
+
+    sql, params = next((sql, params) for sql, params in log if sql.startswith("INSERT INTO embeddings"))
+    assert "embedding_vec=EXCLUDED.embedding_vec" in sql
+    assert params[-1] == "[0.25,0.75]"
+    assert [params for sql, params in log if sql.startswith("INSERT INTO data_generation")] == [("retrieval",), ("embeddings",)]
+
+
+def test_memory_vectors_use_pgvector_with_filters_in_sql(monkeypatch):
+    from app.modules.embeddings.embedding_store import search_memory_embeddings, upsert_memory_embeddings
+
+    log = _fake_pg(monkeypatch, dim=2)
+    upsert_memory_embeddings(
+        [
+            {"memory_id": "mem1", "memory_type": "working", "user_id": "u1", "text_hash": "h1", "embedding": [0.5, 0.5]},
+            {"memory_id": "mem2", "memory_type": "working", "text_hash": "h2", "embedding": [0.5, 0.5, 0.0]},
+        ]
+    )
+    sql, rows = next((sql, rows) for sql, rows in log if sql.startswith("INSERT INTO memory_embeddings"))
+    assert "embedding_vec=EXCLUDED.embedding_vec" in sql
+    # Vectors of another dimension are stored without the pgvector column.
+    assert [row[-1] for row in rows] == ["[0.5,0.5]", None]
+
+    hits = search_memory_embeddings([1.0, 0.0], 4, memory_type="working", scope={"user_id": "u1"})
+
+    assert hits == [("mem1", 0.81)]
+    sql, params = log[-1]
+    assert "WHERE embedding_vec IS NOT NULL AND embedding_model = %s AND memory_type = %s AND user_id = %s" in sql
+    assert "ORDER BY embedding_vec <=> CAST(%s AS vector) LIMIT %s" in sql
+    assert params == ("[1.0,0.0]", "nomic-embed-text", "working", "u1", "[1.0,0.0]", 4)
+
+
+def test_int8_search_matches_exact_search(tmp_path, monkeypatch):
+    import random
+
+    from app.modules.embeddings import embedding_store
+
+    db_path = tmp_path / "queue.db"
+    monkeypatch.setenv("POSTGRES_DSN", f"sqlite://{db_path}")
+    init_db()
+    embedding_store._INT8_INDEXES.clear()
+
+    rng = random.Random(7)
+    for idx in range(120):
+        upsert_embedding(
+            {
+                "doc_id": f"doc{idx % 5}",
+                "segment_id": f"s{idx}",
+                "source_id": f"doc{idx % 5}",
+                "source_version": "v1",
+                "text": f"chunk {idx}",
+                "text_hash": f"h{idx}",
+                "embedding": [rng.uniform(-1.0, 1.0) for _ in range(16)],
+                "start_ms": None,
+                "end_ms": None,
+                "speaker": None,
+                "source_refs": {},
+            }
+        )
+    query = [rng.uniform(-1.0, 1.0) for _ in range(16)]
+
+    monkeypatch.setenv("EMBEDDING_QUANTIZATION", "off")
+    exact = search_embeddings(query, limit=10)
+    monkeypatch.setenv("EMBEDDING_QUANTIZATION", "int8")
+    monkeypatch.setenv("EMBEDDING_RERANK_FACTOR", "4")
+    assert embedding_store.warm_quantized_index() == 120
+    approx = search_embeddings(query, limit=10)
+
+    assert [r["segment_id"] for r in approx] == [r["segment_id"] for r in exact]
+    assert abs(approx[0]["score"] - exact[0]["score"]) < 1e-9
+    stats = embedding_store.quantized_index_stats()
+    assert stats["vectors"] == 120
+    assert stats["code_bytes"] < stats["float32_bytes"]
+
+
+def test_int8_index_rebuilds_after_upsert(tmp_path, monkeypatch):
+    from app.modules.embeddings import embedding_store
+
+    db_path = tmp_path / "queue.db"
+    monkeypatch.setenv("POSTGRES_DSN", f"sqlite://{db_path}")
+    monkeypatch.setenv("EMBEDDING_QUANTIZATION", "int8")
+    init_db()
+    embedding_store._INT8_INDEXES.clear()
+
+    base = {
+        "doc_id": "doc1",
+        "source_id": "doc1",
+        "source_version": "v1",
+        "start_ms": None,
+        "end_ms": None,
+        "speaker": None,
+        "source_refs": {},
+    }
+    upsert_embedding({**base, "segment_id": "s1", "text": "alpha", "text_hash": "h1", "embedding": [0.0, 1.0]})
+    # Before the first build finishes, search answers with the exact scan.
+    assert search_embeddings([1.0, 0.0], limit=1)[0]["segment_id"] == "s1"
+    embedding_store.warm_quantized_index()
+    assert search_embeddings([1.0, 0.0], limit=1)[0]["segment_id"] == "s1"
+
+    upsert_embedding({**base, "segment_id": "s2", "text": "beta", "text_hash": "h2", "embedding": [0.6, 0.8]})
+    assert search_embeddings([1.0, 0.0], limit=1)[0]["segment_id"] == "s2"
+
+    # Re-embedding an existing row within the same second still replaces its codes.
+    upsert_embedding({**base, "segment_id": "s1", "text": "alpha", "text_hash": "h1b", "embedding": [1.0, 0.0]})
+    assert search_embeddings([1.0, 0.0], limit=1)[0]["segment_id"] == "s1"
+
+
+def test_int8_index_rebuilds_in_background_after_generation_changes(tmp_path, monkeypatch):
+    import sqlite3
+    import time
+
+    from app.modules.embeddings import embedding_store
+    from app.queue.generation import current_generation
+
+    db_path = tmp_path / "queue.db"
+    monkeypatch.setenv("POSTGRES_DSN", f"sqlite://{db_path}")
+    monkeypatch.setenv("EMBEDDING_QUANTIZATION", "int8")
+    init_db()
+    embedding_store._INT8_INDEXES.clear()
+    upsert_embedding(
+        {
+            "doc_id": "doc1",
+            "segment_id": "s1",
+            "source_id": "doc1",
+            "source_version": "v1",
+            "text": "alpha",
+            "text_hash": "h1",
+            "embedding": [0.0, 1.0],
+            "source_refs": {},
+        }
+    )
+    embedding_store.warm_quantized_index()
+
+    # Another process writes a row and bumps the generation.
+    other = sqlite3.connect(db_path)
+    other.execute(
+        "INSERT INTO embeddings (doc_id, segment_id, source_id, source_version, text, text_hash, embedding, source_refs, updated_at) "
+        "VALUES ('doc1', 's2', 'doc1', 'v1', 'beta', 'h2', '[1.0, 0.0]', '{}', CURRENT_TIMESTAMP)"
+    )
+    other.execute("UPDATE data_generation SET value = value + 1 WHERE name = 'embeddings'")
+    other.commit()
+    other.close()
+
+    search_embeddings([1.0, 0.0], limit=1)
+    deadline = time.monotonic() + 5.0
+    while embedding_store._INT8_BUILDING and time.monotonic() < deadline:
+        time.sleep(0.01)
+    index = next(iter(embedding_store._INT8_INDEXES.values()))
+    assert index.generation == current_generation("embeddings")
+    assert search_embeddings([1.0, 0.0], limit=1)[0]["segment_id"] == "s2"
+
+
+def test_int8_index_survives_unrelated_writes_and_own_upserts(tmp_path, monkeypatch):
+    from app.modules.embeddings import embedding_store
+    from app.modules.memory.memory_write import write_memory
+
+    monkeypatch.setenv("POSTGRES_DSN", f"sqlite://{tmp_path / 'queue.db'}")
+    monkeypatch.setenv("EMBEDDING_QUANTIZATION", "int8")
+    init_db()
+    embedding_store._INT8_INDEXES.clear()
+
+    def row(segment_id, vector):
+        return {
+            "doc_id": "doc1",
+            "segment_id": segment_id,
+            "source_id": "doc1",
+            "source_version": "v1",
+            "text": segment_id,
+            "text_hash": segment_id,
+            "embedding": vector,
+            "source_refs": {},
+        }
+
+    upsert_embedding(row("s1", [0.0, 1.0]))
+    embedding_store.warm_quantized_index()
+    scheduled = []
+    monkeypatch.setattr(embedding_store, "_schedule_int8_build", lambda dsn, model: scheduled.append(model))
+
+    write_memory(memory_type="working", text="Lunch is at noon")
+    upsert_embedding(row("s2", [1.0, 0.0]))
+
+    assert search_embeddings([1.0, 0.0], limit=1)[0]["segment_id"] == "s2"
+    assert scheduled == []
+
+
+def _seed_filtered_corpus(tmp_path, monkeypatch):
+    from app.core.manifest import upsert_manifest
+
+    db_path = tmp_path / "queue.db"
+    monkeypatch.setenv("POSTGRES_DSN", f"sqlite://{db_path}")
+    init_db()
+    upsert_manifest("yt1", "v1", {"source_id": "yt1", "source_type": "youtube"})
+    upsert_manifest("doc1", "v1", {"source_id": "doc1", "source_type": "file"})
+    for idx in range(12):
+        source_id = "yt1" if idx % 2 == 0 else "doc1"
+        refs = {"user_id": "alice"} if idx == 4 else ({"user_id": "bob"} if idx == 6 else {})
+        upsert_embedding(
+            {
+                "doc_id": source_id,
+                "segment_id": f"s{idx}",
+                "source_id": source_id,
+                "source_version": "v1",
+                "text": f"chunk {idx}",
+                "text_hash": f"h{idx}",
+                # Odd (file) chunks sit closest to the query, so filters must exclude them explicitly.
+                "embedding": [1.0, 0.05 * idx] if idx % 2 else [0.2, 1.0],
+                "start_ms": idx * 1000,
+                "end_ms": idx * 1000 + 900,
+                "speaker": "Anna" if idx < 6 else "Erik",
+                "source_refs": refs,
+            }
+        )
+
+
+def test_search_embeddings_prefilters_exact_k(tmp_path, monkeypatch):
+    from app.modules.embeddings import embedding_store
+
+    _seed_filtered_corpus(tmp_path, monkeypatch)
+    for mode in ("off", "int8"):
+        monkeypatch.setenv("EMBEDDING_QUANTIZATION", mode)
+        embedding_store._INT8_INDEXES.clear()
+        if mode == "int8":
+            embedding_store.warm_quantized_index()
+
+        youtube = search_embeddings([1.0, 0.0], limit=3, filters={"source_type": "youtube"})
+        assert len(youtube) == 3
+        assert {r["doc_id"] for r in youtube} == {"yt1"}
+
+        windowed = search_embeddings(
+            [1.0, 0.0],
+            limit=5,
+            filters={"speaker": "erik", "start_ms_from": 7000, "start_ms_to": 10000},
+        )
+        assert sorted(r["segment_id"] for r in windowed) == ["s10", "s7", "s8", "s9"]
+
+        assert search_embeddings([1.0, 0.0], limit=3, filters={"source_type": "podcast"}) == []
+
+        scoped = search_embeddings(
+            [0.2, 1.0],
+            limit=10,
+            filters={"source_ids": ["yt1"], "scope": {"user_id": "alice"}},
+        )
+        ids = {r["segment_id"] for r in scoped}
+        assert "s4" in ids
+        assert "s6" not in ids
+        assert len(ids) == 5
+
+
+def test_shard_search_uses_mmap_files_and_tracks_updates(tmp_path, monkeypatch):
+    import time
+
+    from app.modules.embeddings import embedding_store, vector_shards
+
+    db_path = tmp_path / "queue.db"
+    monkeypatch.setenv("POSTGRES_DSN", f"sqlite://{db_path}")
+    monkeypatch.setenv("ARTIFACT_ROOT", str(tmp_path / "artifacts"))
+    monkeypatch.setenv("EMBEDDING_SHARDS_ENABLED", "1")
+    init_db()
+    vector_shards.close_shards()
+
+    def add(source_id, segment_id, vector):
+        upsert_embedding(
+            {
+                "doc_id": source_id,
+                "segment_id": segment_id,
+                "source_id": source_id,
+                "source_version": "v1",
+                "text": f"{source_id} {segment_id}",
+                "text_hash": f"{source_id}-{segment_id}",
+                "embedding": vector,
+                "start_ms": None,
+                "end_ms": None,
+                "speaker": None,
+                "source_refs": {},
+            }
+        )
+
+    add("a", "s1", [1.0, 0.0])
+    add("a", "s2", [0.0, 1.0])
+    add("b", "s1", [0.7, 0.7])
+
+    def wait_for_builds():
+        deadline = time.monotonic() + 5.0
+        while vector_shards.shard_builds_pending() and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    # No shards yet: search scans the table and builds them in the background.
+    results = search_embeddings([1.0, 0.1], limit=2)
+    assert [(r["doc_id"], r["segment_id"]) for r in results] == [("a", "s1"), ("b", "s1")]
+    wait_for_builds()
+    results = search_embeddings([1.0, 0.1], limit=2)
+    assert [(r["doc_id"], r["segment_id"]) for r in results] == [("a", "s1"), ("b", "s1")]
+    assert results[0]["text_snippet"] == "a s1"
+    shard = vector_shards.shard_dir("a", "v1")
+    assert (shard / vector_shards.VECTORS_NAME).stat().st_size == 2 * 2 * 4
+    assert (shard / vector_shards.SIDECAR_NAME).exists()
+
+    add("b", "s2", [1.0, 0.1])
+    assert not (vector_shards.shard_dir("b", "v1") / vector_shards.SIDECAR_NAME).exists()
+    top = search_embeddings([1.0, 0.1], limit=1, filters={"source_ids": ["b"]})
+    assert [(r["doc_id"], r["segment_id"]) for r in top] == [("b", "s2")]
+    assert abs(top[0]["score"] - 1.0) < 1e-6
+    wait_for_builds()
+    assert (vector_shards.shard_dir("b", "v1") / vector_shards.SIDECAR_NAME).exists()
+    vector_shards.close_shards()
+
+
+def test_streaming_scan_returns_exact_top_k_and_hydrates_only_winners(tmp_path, monkeypatch):
+    import math
+    import random
+
+    from app.modules.embeddings import embedding_store
+
+    db_path = tmp_path / "queue.db"
+    monkeypatch.setenv("POSTGRES_DSN", f"sqlite://{db_path}")
+    monkeypatch.setattr(embedding_store, "_SCAN_PAGE_SIZE", 7)
+    init_db()
+
+    rng = random.Random(11)
+    vectors = {}
+    for idx in range(60):
+        vector = [rng.uniform(-1.0, 1.0) for _ in range(8)]
+        vectors[f"s{idx}"] = vector
+        upsert_embedding(
+            {
+                "doc_id": "doc1",
+                "segment_id": f"s{idx}",
+                "source_id": "doc1",
+                "source_version": "v1",
+                "text": f"chunk {idx}",
+                "text_hash": f"h{idx}",
+                "embedding": vector,
+                "start_ms": None,
+                "end_ms": None,
+                "speaker": None,
+                "source_refs": {},
+            }
+        )
+    query = [rng.uniform(-1.0, 1.0) for _ in range(8)]
+
+    def cosine(a, b):
+        return sum(x * y for x, y in zip(a, b)) / (math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b)))
+
+    expected = sorted(vectors, key=lambda sid: cosine(query, vectors[sid]), reverse=True)[:5]
+
+    hydrated = []
+    original = embedding_store._load_rows_by_keys
+
+    def spy(keys, with_embedding=True):
+        hydrated.append(list(keys))
+        return original(keys, with_embedding=with_embedding)
+
+    monkeypatch.setattr(embedding_store, "_load_rows_by_keys", spy)
+    results = search_embeddings(query, limit=5)
+
+    assert [r["segment_id"] for r in results] == expected
+    assert results[0]["text_snippet"] == f"chunk {expected[0][1:]}"
+    assert hydrated == [[("doc1", sid) for sid in expected]]
+
+
+def test_pgvector_dim_probes_again_after_a_miss(monkeypatch):
+    from app.modules.embeddings import embedding_store
+
+    _fake_pg(monkeypatch, dim=0)
+    log = []
+    assert embedding_store._pgvector_dim(_FakePgConn(log, 0)) is None
+    assert embedding_store._pgvector_dim(_FakePgConn(log, 2)) == 2
+    assert embedding_store._pgvector_dim(_FakePgConn(log, 0)) == 2
+    assert sum("pg_attribute" in sql for sql, _params in log) == 2
+
+
+def test_pgvector_backfill_runs_before_the_index_and_only_once(monkeypatch):
+    from app.queue import db as queue_db
+
+    class Cursor:
+        def __init__(self, log, meta):
+            self.log, self.meta, self._row = log, meta, None
+
+        def execute(self, sql, params=None):
+            self.log.append(sql)
+            self._row = None
+            if sql.startswith("SELECT value FROM embedding_meta"):
+                self._row = (self.meta[params[0]],) if params[0] in self.meta else None
+            elif sql.startswith("INSERT INTO embedding_meta"):
+                self.meta[params[0]] = params[1]
+
+        def fetchone(self):
+            return self._row
+
+    class Conn:
+        is_sqlite = False
+
+        def __init__(self, log, meta):
+            self.log, self.meta = log, meta
+
+        def cursor(self):
+            return Cursor(self.log, self.meta)
+
+        def commit(self):
+            pass
+
+        def rollback(self):
+            pass
+
+    monkeypatch.setenv("PGVECTOR_ENABLED", "1")
+    monkeypatch.setenv("PGVECTOR_DIM", "3")
+    monkeypatch.setenv("PGVECTOR_INDEX", "ivfflat")
+    meta = {}
+    first, second = [], []
+    assert queue_db._ensure_pgvector(Conn(first, meta)) is True
+    assert queue_db._ensure_pgvector(Conn(second, meta)) is True
+
+    update = next(i for i, sql in enumerate(first) if sql.startswith("UPDATE embeddings"))
+    index = next(i for i, sql in enumerate(first) if "idx_embeddings_vec_ivfflat" in sql)
+    assert update < index
+    assert not any(sql.startswith("UPDATE embeddings") for sql in second)
+    assert any(sql.startswith("UPDATE memory_embeddings") for sql in first)
+    assert any("idx_memory_embeddings_vec_hnsw" in sql for sql in first)
+    assert meta == {queue_db.PGVECTOR_BACKFILL_KEY: "3", queue_db.MEMORY_PGVECTOR_BACKFILL_KEY: "3"}
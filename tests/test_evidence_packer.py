@@ -0,0 +1,81 @@
+import json
+
+from app.core.models import AnalyzeOutput
+from app.modules.swarm import analyze
+from app.modules.swarm.evidence_packer import estimate_tokens, evidence_budget, pack_evidence
+
+
+FILLER = " ".join(f"Filler sentence number {i} about unrelated logistics." for i in range(40))
+
+
+def _row(doc_id, score, text):
+    return {"doc_id": doc_id, "segment_id": "s1", "start_ms": 0, "end_ms": 10, "score": score, "text_snippet": text,
+            "source_refs": {"big": "x" * 500}}
+
+
+def test_estimate_tokens_tracks_words_and_symbols():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("hello world") == 4
+    assert estimate_tokens("internationalization!") == 6
+    assert estimate_tokens("räksmörgås") > estimate_tokens("raksmorgas")
+
+
+def test_pack_evidence_keeps_query_window_within_budget():
+    focused = FILLER + " The Aurora launch date moved to May because of the audit. " + FILLER
+    evidence = [_row("doc:1", 0.9, focused), _row("doc:2", 0.5, FILLER)]
+
+    rendered, meta = pack_evidence("When is the Aurora launch date?", evidence, budget_tokens=120)
+    items = json.loads(rendered)
+
+    assert meta["tokens_est"] <= 120
+    assert meta["tokens_est"] == estimate_tokens(rendered)
+    assert items[0]["doc_id"] == "doc:1"
+    assert "Aurora launch date moved to May" in items[0]["text_snippet"]
+    assert len(items[0]["text_snippet"]) < 300
+    assert "source_refs" not in items[0]
+    assert meta["truncated"] is True
+
+
+def test_pack_evidence_fills_by_score_and_keeps_graph_rows():
+    evidence = [
+        _row("low", 0.1, "Aurora budget notes."),
+        _row("high", 0.9, "Aurora roadmap for spring."),
+        {"entities": [{"entity_id": "e1", "name": "Aurora"}], "relations": []},
+    ]
+
+    rendered, meta = pack_evidence("aurora roadmap", evidence, budget_tokens=400)
+    items = json.loads(rendered)
+
+    assert [item.get("doc_id") for item in items[:2]] == ["low", "high"]
+    assert items[2]["entities"][0]["entity_id"] == "e1"
+    assert meta["items_packed"] == 3
+
+    _rendered, tight = pack_evidence("aurora roadmap", evidence[:2], budget_tokens=70)
+    assert json.loads(_rendered)[0]["doc_id"] == "high"
+    assert tight["items_packed"] == 1
+
+
+def test_analyze_uses_per_model_budget(db, monkeypatch):
+    monkeypatch.setenv("OLLAMA_MODEL_STRONG", "big-model")
+    monkeypatch.setenv("EVIDENCE_TOKEN_BUDGETS", "big-model=90")
+    captured = {}
+
+    def fake_generate(prompt, model, schema):
+        captured["prompt"] = prompt
+        return AnalyzeOutput(claims=[], timeline=[], open_questions=[])
+
+    monkeypatch.setattr(analyze, "generate_json", fake_generate)
+    assert evidence_budget("big-model") == 90
+    analyze.analyze("aurora launch", [_row(f"doc:{i}", 1.0 - i / 10, FILLER + " Aurora launch in May.") for i in range(6)])
+
+    evidence_json = captured["prompt"].split("Evidence:\n", 1)[1].split("\n\n", 1)[0]
+    assert estimate_tokens(evidence_json.strip()) <= 90
+
+
+def test_pack_evidence_keeps_whole_snippets_that_fit():
+    text = "Intro about the team. The Aurora launch is in May. Budget was approved. Lunch follows."
+    rendered, meta = pack_evidence("Aurora launch", [_row("doc:1", 0.9, text)], budget_tokens=400)
+
+    assert json.loads(rendered)[0]["text_snippet"] == text
+    assert meta["items_clipped"] == 0
+    assert meta["truncated"] is False
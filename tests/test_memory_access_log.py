@@ -0,0 +1,41 @@
+from app.modules.memory import access_log
+from app.modules.memory.memory_recall import recall
+from app.modules.memory.memory_write import write_memory
+from app.queue.db import get_conn
+
+
+def _stored_access(memory_id):
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT access_count, last_accessed_at FROM memory_items WHERE memory_id=?", (memory_id,))
+        row = cur.fetchone()
+    return int(row[0] or 0), row[1]
+
+
+def test_recall_buffers_access_until_flush(db, monkeypatch):
+    monkeypatch.setenv("MEMORY_ACCESS_FLUSH_SECONDS", "3600")
+    access_log.flush_access()
+    memory_id = str(write_memory(memory_type="working", text="Release checklist for Aurora")["memory_id"])
+
+    _count, written_at = _stored_access(memory_id)
+    recall("aurora checklist", limit=3)
+    results = recall("aurora checklist", limit=3)
+
+    assert _stored_access(memory_id) == (0, written_at)
+    assert results[0]["access_count"] == 1
+    assert access_log.pending_access(memory_id)[0] == 2
+
+    assert access_log.flush_access() == 1
+    count, last_accessed_at = _stored_access(memory_id)
+    assert count == 2
+    assert last_accessed_at > written_at
+    assert access_log.pending_access(memory_id) == (0, None)
+
+
+def test_zero_flush_interval_writes_through(db, monkeypatch):
+    monkeypatch.setenv("MEMORY_ACCESS_FLUSH_SECONDS", "0")
+    memory_id = str(write_memory(memory_type="working", text="Standup notes for Aurora")["memory_id"])
+
+    recall("aurora standup", limit=3)
+
+    assert _stored_access(memory_id)[0] == 1
@@ -0,0 +1,47 @@
+import json
+import sqlite3
+
+from app.modules.memory.memory_recall import recall
+from app.modules.memory.memory_write import write_memory
+from app.queue.db import get_conn, init_db
+
+
+def test_init_db_backfills_promoted_columns_from_source_refs(tmp_path, monkeypatch):
+    db_path = tmp_path / "legacy.db"
+    legacy = sqlite3.connect(db_path)
+    legacy.execute(
+        "CREATE TABLE memory_items (memory_id TEXT PRIMARY KEY, memory_type TEXT NOT NULL, text TEXT NOT NULL, "
+        "topics TEXT, entities TEXT, source_refs TEXT, created_at TEXT NOT NULL)"
+    )
+    refs = {"kind": "retrieval_feedback", "memory_kind": "semantic", "memory_slot": "editor", "scope": {"user_id": "alice"}}
+    legacy.execute(
+        "INSERT INTO memory_items VALUES (?, ?, ?, ?, ?, ?, ?)",
+        ("m1", "working", "uses neovim", "[]", "[]", json.dumps(refs), "2026-01-01T00:00:00+00:00"),
+    )
+    legacy.commit()
+    legacy.close()
+    monkeypatch.setenv("POSTGRES_DSN", f"sqlite://{db_path}")
+
+    init_db()
+
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT user_id, project_id, memory_kind, memory_slot, kind FROM memory_items")
+        assert tuple(cur.fetchone()) == ("alice", None, "semantic", "editor", "retrieval_feedback")
+        cur.execute("SELECT name FROM sqlite_master WHERE type='index' AND name='idx_memory_scope_type_created'")
+        assert cur.fetchone() is not None
+        cur.execute("SELECT user_id, memory_kind, memory_slot, memory_id FROM memory_slots")
+        assert [tuple(row) for row in cur.fetchall()] == [("alice", "semantic", "editor", "m1")]
+
+
+def test_scoped_recall_filters_on_columns(db):
+    mine = write_memory(memory_type="working", text="Deploy with the blue pipeline", user_id="alice", project_id="p1")
+    write_memory(memory_type="working", text="Deploy with the green pipeline", user_id="bob", project_id="p1")
+
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT user_id, project_id FROM memory_items WHERE memory_id=?", (mine["memory_id"],))
+        assert tuple(cur.fetchone()) == ("alice", "p1")
+
+    results = recall("deploy pipeline", limit=5, user_id="alice", project_id="p1")
+    assert [item["memory_id"] for item in results] == [mine["memory_id"]]
@@ -0,0 +1,71 @@
+from app.modules.memory import memory_embed, memory_recall
+from app.modules.memory.memory_write import write_memory
+from app.queue.db import get_conn
+
+
+def _fake_embed(text, model=None):
+    lower = str(text).lower()
+    if "editor" in lower or "neovim" in lower:
+        return [1.0, 0.1, 0.0]
+    return [0.0, 0.2, 1.0]
+
+
+def _queued_jobs():
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT COUNT(*) FROM jobs WHERE job_type='memory_embed' AND status='queued'")
+        return int(cur.fetchone()[0])
+
+
+def test_memory_writes_share_one_embed_job_that_drains_the_backlog(db, monkeypatch):
+    monkeypatch.setenv("EMBEDDINGS_ENABLED", "1")
+    calls = []
+    monkeypatch.setattr(memory_embed, "embed", lambda text, model=None: calls.append(text) or _fake_embed(text))
+    write_memory(memory_type="working", text="I use neovim for everything", user_id="alice")
+    write_memory(memory_type="working", text="Lunch is at noon")
+    assert _queued_jobs() == 1
+
+    memory_embed.handle_job({"lane": "oss20b"})
+    memory_embed.handle_job({"lane": "oss20b"})
+
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT COALESCE(user_id, ''), memory_type FROM memory_embeddings ORDER BY 1")
+        rows = [tuple(row) for row in cur.fetchall()]
+    assert rows == [("", "working"), ("alice", "working")]
+    assert len(calls) == 2
+
+
+def test_recall_finds_paraphrases_through_memory_vectors(db, monkeypatch):
+    monkeypatch.setenv("EMBEDDINGS_ENABLED", "1")
+    monkeypatch.setattr(memory_embed, "embed", _fake_embed)
+    monkeypatch.setattr(memory_recall, "embed_query", _fake_embed)
+    mine = write_memory(memory_type="working", text="I use neovim", user_id="alice")
+    write_memory(memory_type="working", text="I use neovim", user_id="bob")
+    write_memory(memory_type="working", text="Lunch is at noon", user_id="alice")
+
+    assert memory_recall.recall("my preferred editor", limit=3, user_id="alice") == []
+
+    memory_embed.handle_job({"lane": "oss20b"})
+    results = memory_recall.recall("my preferred editor", limit=3, user_id="alice")
+
+    assert [item["memory_id"] for item in results] == [mine["memory_id"]]
+    assert results[0]["semantic_score"] > 0.9
+
+
+def test_blank_memories_do_not_keep_the_embed_job_alive(db, monkeypatch):
+    from app.modules.embeddings.embedding_store import get_active_embedding_model
+
+    monkeypatch.setenv("EMBEDDINGS_ENABLED", "1")
+    monkeypatch.setenv("MEMORY_EMBED_BATCH_SIZE", "1")
+    monkeypatch.setattr(memory_embed, "embed", lambda text, model=None: _fake_embed(text))
+    blank = write_memory(memory_type="working", text="placeholder")
+    write_memory(memory_type="working", text="I use neovim for everything")
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("UPDATE memory_items SET text = '  ' WHERE memory_id = ?", (blank["memory_id"],))
+        conn.commit()
+
+    memory_embed.handle_job({"lane": "oss20b"})
+
+    assert memory_embed._pending_memories(get_active_embedding_model(), 10) == []
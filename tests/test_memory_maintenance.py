@@ -1,3 +1,5 @@
+from datetime import datetime, timedelta, timezone
+
 from app.modules.memory.maintenance import run_memory_maintenance
 from app.modules.memory.memory_write import write_memory
 from app.modules.memory.retrieval_feedback import record_retrieval_feedback
@@ -116,3 +118,112 @@ def test_memory_maintenance_respects_scope_filter(tmp_path, monkeypatch):
         ids = {str(row[0]) for row in cur.fetchall()}
     assert scoped["memory_id"] not in ids
     assert other["memory_id"] in ids
+
+
+def test_memory_maintenance_deletes_in_batches_within_budget(tmp_path, monkeypatch):
+    from app.modules.memory import maintenance
+
+    db_path = tmp_path / "queue.db"
+    monkeypatch.setenv("POSTGRES_DSN", f"sqlite://{db_path}")
+    monkeypatch.setenv("MEMORY_MAINTENANCE_MAX_DELETE_PER_RUN", "10")
+    monkeypatch.setattr(maintenance, "DELETE_BATCH_SIZE", 3)
+    init_db()
+
+    for idx in range(12):
+        write_memory(
+            memory_type="working",
+            text=f"expired memory {idx}",
+            publish_long_term=False,
+            expires_at="2000-01-01T02:00:00+02:00",
+        )
+    pinned = write_memory(
+        memory_type="working",
+        text="expired but pinned",
+        publish_long_term=False,
+        expires_at="2000-01-01T00:00:00+00:00",
+        pinned_until="2999-01-01T00:00:00+00:00",
+    )
+
+    first = run_memory_maintenance()
+    assert first["deleted_breakdown"]["expired"] == 10
+    assert first["scanned_items"] == 3
+
+    second = run_memory_maintenance()
+    assert second["deleted_breakdown"]["expired"] == 2
+
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT memory_id, expires_at FROM memory_items")
+        rows = [tuple(row) for row in cur.fetchall()]
+    assert rows == [(pinned["memory_id"], "2000-01-01T00:00:00+00:00")]
+
+
+def test_memory_maintenance_keeps_newest_feedback_per_scope(tmp_path, monkeypatch):
+    db_path = tmp_path / "queue.db"
+    monkeypatch.setenv("POSTGRES_DSN", f"sqlite://{db_path}")
+    monkeypatch.setenv("MEMORY_ENABLED", "1")
+    monkeypatch.setenv("RETRIEVAL_FEEDBACK_HISTORY_LIMIT", "10")
+    monkeypatch.setenv("MEMORY_MAINTENANCE_FEEDBACK_RETENTION_DAYS", "3650")
+    init_db()
+
+    kept = {}
+    for user_id, count in (("user-a", 12), ("user-b", 11)):
+        kept[user_id] = []
+        for idx in range(count):
+            item = record_retrieval_feedback(
+                question=f"aurora question {idx}",
+                evidence=[{"doc_id": f"doc-{idx}", "segment_id": "seg-1", "retrieval_source": "keyword"}],
+                citations=[],
+                user_id=user_id,
+            )
+            with get_conn() as conn:
+                cur = conn.cursor()
+                cur.execute(
+                    "UPDATE memory_items SET created_at=? WHERE memory_id=?",
+                    (f"2026-01-{idx + 1:02d}T00:00:00+00:00", str(item["memory_id"])),
+                )
+                conn.commit()
+            kept[user_id].append(item["memory_id"])
+
+    out = run_memory_maintenance()
+    assert out["deleted_breakdown"]["feedback_overflow"] == 3
+
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT memory_id FROM memory_items")
+        ids = {str(row[0]) for row in cur.fetchall()}
+    assert ids == set(kept["user-a"][-10:] + kept["user-b"][-10:])
+
+
+def test_memory_maintenance_compares_legacy_and_offset_timestamps_in_utc(tmp_path, monkeypatch):
+    db_path = tmp_path / "queue.db"
+    monkeypatch.setenv("POSTGRES_DSN", f"sqlite://{db_path}")
+    monkeypatch.setenv("MEMORY_ENABLED", "1")
+    init_db()
+    now = datetime.now(timezone.utc)
+    # An hour ago in UTC, but rendered at +05:00 it sorts after "now" as a string.
+    expired_offset = (now - timedelta(hours=1)).astimezone(timezone(timedelta(hours=5))).isoformat()
+
+    written = write_memory(memory_type="working", text="written with offset", publish_long_term=False, expires_at=expired_offset)
+    legacy = write_memory(memory_type="working", text="legacy offset row", publish_long_term=False)
+    keep = write_memory(memory_type="working", text="legacy created row", publish_long_term=False)
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("UPDATE memory_items SET expires_at=? WHERE memory_id=?", (expired_offset, legacy["memory_id"]))
+        cur.execute("UPDATE memory_items SET created_at=? WHERE memory_id=?", ("2026-01-02 03:04:05", keep["memory_id"]))
+        conn.commit()
+
+    init_db()
+
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT created_at FROM memory_items WHERE memory_id=?", (keep["memory_id"],))
+        assert cur.fetchone()[0] == "2026-01-02T03:04:05+00:00"
+    output = run_memory_maintenance()
+    assert output["deleted_breakdown"]["expired"] == 2
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT memory_id FROM memory_items")
+        ids = {str(row[0]) for row in cur.fetchall()}
+    assert ids == {keep["memory_id"]}
+    assert written["memory_id"] not in ids
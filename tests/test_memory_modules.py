@@ -119,6 +119,88 @@ def test_memory_write_records_revision_trail_on_supersede(tmp_path, monkeypatch)
     assert any(event.get("event") == "supersedes" for event in second_timeline if isinstance(event, dict))
 
 
+def test_memory_slots_track_current_value_per_scope(tmp_path, monkeypatch):
+    db_path = tmp_path / "queue.db"
+    monkeypatch.setenv("POSTGRES_DSN", f"sqlite://{db_path}")
+    init_db()
+
+    memory_write.write_memory(
+        memory_type="working", text="My favorite editor is vim", overwrite_conflicts=True, user_id="alice"
+    )
+    bob = memory_write.write_memory(
+        memory_type="working", text="My favorite editor is emacs", overwrite_conflicts=True, user_id="bob"
+    )
+    latest = memory_write.write_memory(
+        memory_type="working", text="My favorite editor is helix", overwrite_conflicts=True, user_id="alice"
+    )
+
+    assert latest["superseded_count"] == 1
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT user_id, memory_slot, memory_id, memory_value FROM memory_slots ORDER BY user_id")
+        slots = [tuple(row) for row in cur.fetchall()]
+    assert slots == [
+        ("alice", "favorite_editor", latest["memory_id"], "helix"),
+        ("bob", "favorite_editor", bob["memory_id"], "emacs"),
+    ]
+
+    results = memory_recall.recall("What is my favorite editor?", limit=3, user_id="alice")
+    assert results[0]["memory_id"] == latest["memory_id"]
+    assert results[0]["slot_match"] is True
+    assert results[0]["memory_value"] == "helix"
+
+
+def test_overwrite_supersedes_every_live_slot_holder(tmp_path, monkeypatch):
+    monkeypatch.setenv("POSTGRES_DSN", f"sqlite://{tmp_path / 'queue.db'}")
+    init_db()
+
+    vim = memory_write.write_memory(memory_type="working", text="My favorite editor is vim", user_id="alice")
+    emacs = memory_write.write_memory(memory_type="working", text="My favorite editor is emacs", user_id="alice")
+    nano = memory_write.write_memory(
+        memory_type="working", text="My favorite editor is nano", overwrite_conflicts=True, user_id="alice"
+    )
+
+    assert nano["superseded_count"] == 2
+    assert sorted(nano["superseded_ids"]) == sorted([vim["memory_id"], emacs["memory_id"]])
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT memory_id FROM memory_items WHERE COALESCE(superseded_by, '') = ''")
+        assert [row[0] for row in cur.fetchall()] == [nano["memory_id"]]
+
+
+def test_write_memories_batches_rows_log_and_publish(tmp_path, monkeypatch):
+    db_path = tmp_path / "queue.db"
+    monkeypatch.setenv("POSTGRES_DSN", f"sqlite://{db_path}")
+    init_db()
+    merged = []
+
+    class FakeClient:
+        def execute_sql(self, sql):
+            merged.append(sql)
+
+    monkeypatch.setattr(memory_write, "SnowflakeClient", FakeClient)
+
+    receipts = memory_write.write_memories(
+        [
+            {"memory_type": "working", "text": "My favorite editor is vim", "overwrite_conflicts": True},
+            {"memory_type": "working", "text": "Release notes live in docs", "publish_long_term": True},
+            {"memory_type": "working", "text": "My favorite editor is helix", "overwrite_conflicts": True},
+            {"memory_type": "session", "text": "We talked about the launch", "publish_long_term": True},
+        ]
+    )
+
+    assert [receipt["published"] for receipt in receipts] == [False, True, False, True]
+    assert receipts[2]["superseded_ids"] == [receipts[0]["memory_id"]]
+    assert len(merged) == 1
+    assert receipts[1]["memory_id"] in merged[0] and receipts[3]["memory_id"] in merged[0]
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT COUNT(*) FROM memory_items")
+        assert cur.fetchone()[0] == 4
+        cur.execute("SELECT COUNT(*) FROM run_log WHERE component='memory_write'")
+        assert cur.fetchone()[0] == 1
+
+
 def test_memory_recall_filters_by_memory_kind(tmp_path, monkeypatch):
     db_path = tmp_path / "queue.db"
     monkeypatch.setenv("POSTGRES_DSN", f"sqlite://{db_path}")
@@ -174,3 +256,145 @@ def test_memory_recall_filters_by_scope(tmp_path, monkeypatch):
     )
     assert len(scoped_results) == 1
     assert scoped_results[0]["memory_id"] == scoped["memory_id"]
+
+
+def test_memory_recall_matches_question_terms_through_fts(tmp_path, monkeypatch):
+    db_path = tmp_path / "queue.db"
+    monkeypatch.setenv("POSTGRES_DSN", f"sqlite://{db_path}")
+    init_db()
+
+    kept = memory_write.write_memory(
+        memory_type="working",
+        text="Deployment runbook for the prod cluster",
+        entities=["Kubernetes"],
+        publish_long_term=False,
+    )
+    dropped = memory_write.write_memory(memory_type="working", text="Prod cluster password rotation", publish_long_term=False)
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("DELETE FROM memory_items WHERE memory_id=?", (dropped["memory_id"],))
+        cur.execute("UPDATE memory_items SET text=? WHERE memory_id=?", ("Deployment runbook (archived)", kept["memory_id"]))
+        conn.commit()
+
+    results = memory_recall.recall("Which kubernetes runbook covers the prod cluster?", limit=5)
+    assert [item["memory_id"] for item in results] == [kept["memory_id"]]
+    assert memory_recall.recall("prod cluster", limit=5) == []
+
+
+def test_memory_fts_backfills_existing_memories(tmp_path, monkeypatch):
+    db_path = tmp_path / "queue.db"
+    monkeypatch.setenv("POSTGRES_DSN", f"sqlite://{db_path}")
+    init_db()
+    with get_conn() as conn:
+        cur = conn.cursor()
+        for name in ("memory_items_fts_insert", "memory_items_fts_delete", "memory_items_fts_update"):
+            cur.execute(f"DROP TRIGGER {name}")
+        cur.execute("DROP TABLE memory_fts")
+        conn.commit()
+    memory_write.write_memory(memory_type="working", text="Quarterly budget review notes", publish_long_term=False)
+
+    init_db()
+
+    assert [item["text"] for item in memory_recall.recall("when is the budget review?", limit=5)] == [
+        "Quarterly budget review notes"
+    ]
+
+
+def test_memory_fts_survives_rowid_renumbering(db):
+    first = memory_write.write_memory(memory_type="working", text="Quarterly budget review notes", publish_long_term=False)
+    second = memory_write.write_memory(memory_type="working", text="Kubernetes runbook for prod", publish_long_term=False)
+    with get_conn() as conn:
+        cur = conn.cursor()
+        # What VACUUM may do to a table without an INTEGER PRIMARY KEY.
+        cur.execute("UPDATE memory_items SET rowid = rowid + 1000")
+        cur.execute("UPDATE memory_items SET rowid = 1 WHERE memory_id=?", (second["memory_id"],))
+        cur.execute("UPDATE memory_items SET rowid = 2 WHERE memory_id=?", (first["memory_id"],))
+        conn.commit()
+
+    assert [item["memory_id"] for item in memory_recall.recall("budget review", limit=5)] == [first["memory_id"]]
+    memory_write.write_memory(memory_type="working", text="Office move checklist", publish_long_term=False)
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("DELETE FROM memory_items WHERE memory_id=?", (first["memory_id"],))
+        conn.commit()
+    assert memory_recall.recall("budget review", limit=5) == []
+    assert [item["memory_id"] for item in memory_recall.recall("kubernetes runbook", limit=5)] == [second["memory_id"]]
+
+
+def test_memory_fts_migrates_rowid_keyed_index(tmp_path, monkeypatch):
+    db_path = tmp_path / "queue.db"
+    monkeypatch.setenv("POSTGRES_DSN", f"sqlite://{db_path}")
+    init_db()
+    memory_write.write_memory(memory_type="working", text="Quarterly budget review notes", publish_long_term=False)
+    with get_conn() as conn:
+        cur = conn.cursor()
+        for name in ("memory_items_fts_insert", "memory_items_fts_delete", "memory_items_fts_update"):
+            cur.execute(f"DROP TRIGGER {name}")
+        cur.execute("DROP TABLE memory_fts")
+        cur.execute(
+            "CREATE VIRTUAL TABLE memory_fts USING fts5(text, topics, entities, content='memory_items', content_rowid='rowid')"
+        )
+        conn.commit()
+
+    init_db()
+
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("PRAGMA table_info(memory_fts)")
+        assert "memory_id" in {row[1] for row in cur.fetchall()}
+    assert [item["text"] for item in memory_recall.recall("budget review", limit=5)] == ["Quarterly budget review notes"]
+
+
+def test_user_level_overwrite_supersedes_session_holders(db):
+    session_a = memory_write.write_memory(
+        memory_type="working",
+        text="My favorite editor is vim",
+        overwrite_conflicts=True,
+        user_id="alice",
+        session_id="sess-a",
+    )
+    user_level = memory_write.write_memory(
+        memory_type="working", text="My favorite editor is helix", overwrite_conflicts=True, user_id="alice"
+    )
+    session_b = memory_write.write_memory(
+        memory_type="working",
+        text="My favorite editor is emacs",
+        overwrite_conflicts=True,
+        user_id="alice",
+        session_id="sess-b",
+    )
+
+    # Every scope id the writer sets must match: the user-level write reaches into sessions,
+    # a session-scoped write leaves broader and sibling holders alone.
+    assert user_level["superseded_ids"] == [session_a["memory_id"]]
+    assert session_b["superseded_count"] == 0
+
+
+def test_older_import_keeps_a_legacy_timestamp_slot_holder(db):
+    from app.modules.memory.slots import lookup_slot
+
+    local = memory_write.write_memory(
+        memory_type="semantic", text="My editor is helix", memory_slot="editor", memory_value="helix", user_id="alice"
+    )
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("UPDATE memory_items SET created_at=? WHERE memory_id=?", ("2026-01-02 23:00:00", local["memory_id"]))
+        conn.commit()
+    init_db()
+
+    memory_write.write_memories(
+        [
+            {
+                "memory_type": "semantic",
+                "text": "My editor is vim",
+                "memory_slot": "editor",
+                "memory_value": "vim",
+                "user_id": "alice",
+                "created_at": "2026-01-02T01:00:00+00:00",
+            }
+        ],
+        route=False,
+        embed=False,
+    )
+
+    assert lookup_slot("editor", {"user_id": "alice"})["memory_id"] == local["memory_id"]
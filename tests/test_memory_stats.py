@@ -1,3 +1,6 @@
+import json
+import sqlite3
+
 from app.modules.memory.memory_stats import get_memory_stats
 from app.modules.memory.memory_write import write_memory
 from app.modules.memory.retrieval_feedback import record_retrieval_feedback
@@ -88,3 +91,70 @@ def test_memory_stats_respects_scope(tmp_path, monkeypatch):
     stats_b = get_memory_stats(user_id="user-b", project_id="proj-b", session_id="sess-b")
     assert stats_a["totals"]["memory_items"] == 1
     assert stats_b["totals"]["memory_items"] == 1
+
+
+def test_memory_stats_backfills_counters_for_existing_rows(tmp_path, monkeypatch):
+    db_path = tmp_path / "legacy.db"
+    legacy = sqlite3.connect(db_path)
+    legacy.execute(
+        "CREATE TABLE memory_items (memory_id TEXT PRIMARY KEY, memory_type TEXT NOT NULL, text TEXT NOT NULL, "
+        "topics TEXT, entities TEXT, source_refs TEXT, created_at TEXT NOT NULL)"
+    )
+    feedback = {
+        "kind": "retrieval_feedback",
+        "signals": [{"outcome": "cited"}, {"outcome": "missed"}, {"outcome": "cited"}],
+    }
+    rows = [
+        ("f1", feedback),
+        ("old", {"memory_kind": "semantic", "superseded_by": "new"}),
+        ("new", {"memory_kind": "semantic", "supersedes": ["old"]}),
+    ]
+    for memory_id, refs in rows:
+        legacy.execute(
+            "INSERT INTO memory_items VALUES (?, 'working', 'text', '[]', '[]', ?, '2026-01-01T00:00:00+00:00')",
+            (memory_id, json.dumps(refs)),
+        )
+    legacy.commit()
+    legacy.close()
+    monkeypatch.setenv("POSTGRES_DSN", f"sqlite://{db_path}")
+    init_db()
+
+    stats = get_memory_stats()
+    assert stats["totals"]["memory_items"] == 3
+    assert stats["by_memory_kind"] == {"semantic": 2, "unknown": 1}
+    assert stats["supersede"]["superseded_items"] == 1
+    assert stats["supersede"]["supersede_link_count"] == 1
+    assert stats["retrieval_feedback"]["signals_total"] == 3
+    assert stats["retrieval_feedback"]["cited_signals"] == 2
+    assert stats["retrieval_feedback"]["missed_signals"] == 1
+
+
+def test_memory_stats_counts_expiry_of_legacy_timestamps_in_utc(tmp_path, monkeypatch):
+    from datetime import datetime, timedelta, timezone
+
+    db_path = tmp_path / "legacy.db"
+    now = datetime.now(timezone.utc)
+    legacy = sqlite3.connect(db_path)
+    legacy.execute(
+        "CREATE TABLE memory_items (memory_id TEXT PRIMARY KEY, memory_type TEXT NOT NULL, text TEXT NOT NULL, "
+        "topics TEXT, entities TEXT, source_refs TEXT, created_at TEXT NOT NULL, expires_at TEXT)"
+    )
+    rows = [
+        # Expired an hour ago, written with a +05:00 offset that sorts after "now" as text.
+        ("offset", (now - timedelta(hours=1)).astimezone(timezone(timedelta(hours=5))).isoformat()),
+        # Expires tomorrow, in the CURRENT_TIMESTAMP format that sorts before any "T" value of the same day.
+        ("legacy", (now + timedelta(days=1)).strftime("%Y-%m-%d %H:%M:%S")),
+    ]
+    for memory_id, expires_at in rows:
+        legacy.execute(
+            "INSERT INTO memory_items VALUES (?, 'working', 'text', '[]', '[]', '{}', ?, ?)",
+            (memory_id, now.strftime("%Y-%m-%d %H:%M:%S"), expires_at),
+        )
+    legacy.commit()
+    legacy.close()
+    monkeypatch.setenv("POSTGRES_DSN", f"sqlite://{db_path}")
+    init_db()
+
+    stats = get_memory_stats()
+    assert stats["totals"]["memory_items"] == 2
+    assert stats["totals"]["expired_items"] == 1
@@ -0,0 +1,103 @@
+import io
+import json
+
+from app.cli import main as cli_main
+from app.modules.memory.memory_write import write_memory
+from app.modules.memory.slots import lookup_slot
+from app.modules.memory.transfer import export_memories, import_memories
+from app.queue.db import get_conn, init_db
+
+
+def _rows():
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT memory_id, memory_type, text, created_at, user_id, memory_slot, superseded_by, "
+            "access_count, last_accessed_at "
+            "FROM memory_items ORDER BY created_at, memory_id"
+        )
+        return [tuple(row) for row in cur.fetchall()]
+
+
+def test_export_import_round_trip_keeps_ids_and_slots(tmp_path, monkeypatch):
+    monkeypatch.setenv("POSTGRES_DSN", f"sqlite://{tmp_path / 'source.db'}")
+    init_db()
+    write_memory(memory_type="working", text="Deploy with the blue pipeline", user_id="alice")
+    old = write_memory(memory_type="semantic", text="My editor is vim", memory_slot="editor", memory_value="vim", user_id="alice")
+    new = write_memory(
+        memory_type="semantic",
+        text="My editor is neovim",
+        memory_slot="editor",
+        memory_value="neovim",
+        overwrite_conflicts=True,
+        user_id="alice",
+    )
+    assert new["superseded_ids"] == [old["memory_id"]]
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            "UPDATE memory_items SET access_count = 3, last_accessed_at = '2026-05-01T00:00:00+00:00' WHERE memory_id = ?",
+            (new["memory_id"],),
+        )
+        conn.commit()
+    source_rows = _rows()
+
+    first_page = io.StringIO()
+    assert export_memories(first_page, page_size=1) == {"exported": 3, "last_memory_id": new["memory_id"]}
+    resumed = io.StringIO()
+    second = source_rows[1][0]
+    assert export_memories(resumed, after=second)["exported"] == 1
+    assert json.loads(resumed.getvalue())["memory_id"] == new["memory_id"]
+    lines = first_page.getvalue().splitlines()
+    assert json.loads(lines[1])["source_refs"]["superseded_by"] == new["memory_id"]
+
+    monkeypatch.setenv("POSTGRES_DSN", f"sqlite://{tmp_path / 'target.db'}")
+    init_db()
+    committed = []
+    partial = import_memories(lines[:2], batch_size=1, route=False, embed=False, on_batch=committed.append)
+    assert partial == {"imported": 2, "existing": 0, "invalid": 0, "next_skip_lines": 2}
+    assert committed == [1, 2]
+
+    output = import_memories(lines + ["not json"], skip_lines=1, route=False, embed=False)
+    assert output == {"imported": 1, "existing": 1, "invalid": 1, "next_skip_lines": 4}
+    assert _rows() == source_rows
+    assert lookup_slot("editor", {"user_id": "alice"})["memory_id"] == new["memory_id"]
+
+
+def test_cli_memory_export_import(tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv("POSTGRES_DSN", f"sqlite://{tmp_path / 'source.db'}")
+    init_db()
+    written = write_memory(memory_type="working", text="cli export sample", user_id="user-1")
+    dump = tmp_path / "memories.jsonl"
+
+    monkeypatch.setattr("sys.argv", ["aurora", "memory-export", "--output", str(dump), "--user-id", "user-1"])
+    assert cli_main.main() == 0
+    assert json.loads(capsys.readouterr().out)["exported"] == 1
+
+    monkeypatch.setenv("POSTGRES_DSN", f"sqlite://{tmp_path / 'target.db'}")
+    init_db()
+    monkeypatch.setattr("sys.argv", ["aurora", "memory-import", "--input", str(dump), "--no-embed"])
+    assert cli_main.main() == 0
+    captured = capsys.readouterr()
+    assert json.loads(captured.out)["imported"] == 1
+    assert "committed through line 1" in captured.err
+    assert [row[0] for row in _rows()] == [written["memory_id"]]
+
+
+def test_import_keeps_a_newer_local_slot_holder_current(tmp_path, monkeypatch):
+    monkeypatch.setenv("POSTGRES_DSN", f"sqlite://{tmp_path / 'source.db'}")
+    init_db()
+    write_memory(
+        memory_type="semantic", text="My editor is vim", memory_slot="editor", memory_value="vim", user_id="alice"
+    )
+    dump = io.StringIO()
+    export_memories(dump)
+
+    monkeypatch.setenv("POSTGRES_DSN", f"sqlite://{tmp_path / 'target.db'}")
+    init_db()
+    local = write_memory(
+        memory_type="semantic", text="My editor is helix", memory_slot="editor", memory_value="helix", user_id="alice"
+    )
+    assert import_memories(dump.getvalue().splitlines(), route=False, embed=False)["imported"] == 1
+
+    assert lookup_slot("editor", {"user_id": "alice"})["memory_id"] == local["memory_id"]
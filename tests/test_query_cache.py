@@ -0,0 +1,68 @@
+from app.modules.embeddings import query_cache
+
+
+def test_embed_query_reuses_vector_for_normalized_query(monkeypatch):
+    calls = []
+
+    def fake_embed(text, model=None):
+        calls.append((text, model))
+        return [1.0, 0.0]
+
+    monkeypatch.setattr(query_cache, "embed", fake_embed)
+    monkeypatch.setenv("QUERY_EMBEDDING_CACHE_SIZE", "4")
+    monkeypatch.setenv("QUERY_EMBEDDING_CACHE_DISK", "0")
+    query_cache.clear_query_cache()
+
+    first = query_cache.embed_query("What is   Aurora?")
+    second = query_cache.embed_query(" What is Aurora? ")
+    query_cache.embed_query("What is AURORA?")
+
+    assert first == second == [1.0, 0.0]
+    model = query_cache.load_settings().ollama_model_embed
+    assert calls == [("What is Aurora?", model), ("What is AURORA?", model)]
+    stats = query_cache.query_cache_stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+    assert stats["size"] == 2
+
+
+def test_embed_query_keys_by_model_and_evicts_lru(monkeypatch):
+    calls = []
+
+    def fake_embed(text, model=None):
+        calls.append((text, model))
+        return [float(len(calls))]
+
+    monkeypatch.setattr(query_cache, "embed", fake_embed)
+    monkeypatch.setenv("QUERY_EMBEDDING_CACHE_SIZE", "2")
+    monkeypatch.setenv("QUERY_EMBEDDING_CACHE_DISK", "0")
+    query_cache.clear_query_cache()
+
+    query_cache.embed_query("alpha", model="m1")
+    query_cache.embed_query("alpha", model="m2")
+    query_cache.embed_query("beta", model="m1")
+    query_cache.embed_query("alpha", model="m1")
+
+    assert len(calls) == 4
+    assert query_cache.query_cache_stats()["evictions"] == 2
+
+
+def test_embed_query_disk_cache_survives_process_memory(tmp_path, monkeypatch):
+    calls = []
+
+    def fake_embed(text, model=None):
+        calls.append(text)
+        return [0.5, 0.5]
+
+    monkeypatch.setattr(query_cache, "embed", fake_embed)
+    monkeypatch.setenv("ARTIFACT_ROOT", str(tmp_path / "artifacts"))
+    monkeypatch.setenv("QUERY_EMBEDDING_CACHE_SIZE", "8")
+    monkeypatch.setenv("QUERY_EMBEDDING_CACHE_DISK", "1")
+    query_cache.clear_query_cache()
+
+    assert query_cache.embed_query("roadmap status") == [0.5, 0.5]
+    query_cache.clear_query_cache()
+    assert query_cache.embed_query("roadmap  status") == [0.5, 0.5]
+
+    assert len(calls) == 1
+    assert query_cache.query_cache_stats()["disk_hits"] == 1
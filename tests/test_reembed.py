@@ -0,0 +1,143 @@
+from app.modules.embeddings import reembed
+from app.modules.embeddings.embedding_store import (
+    get_active_embedding_model,
+    search_embeddings,
+    upsert_embedding,
+)
+from app.queue.db import get_conn
+
+
+def _add(segment_id, vector, text):
+    upsert_embedding(
+        {
+            "doc_id": "doc1",
+            "segment_id": segment_id,
+            "source_id": "doc1",
+            "source_version": "v1",
+            "text": text,
+            "text_hash": f"h-{segment_id}-{text}",
+            "embedding": vector,
+            "start_ms": None,
+            "end_ms": None,
+            "speaker": None,
+            "source_refs": {},
+        }
+    )
+
+
+def _queued_reembed_jobs():
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT source_version FROM jobs WHERE job_type='reembed' AND status='queued'")
+        return [row[0] for row in cur.fetchall()]
+
+
+def test_upsert_records_model_and_dim(db, monkeypatch):
+    monkeypatch.setenv("OLLAMA_MODEL_EMBED", "old-model")
+    _add("s1", [1.0, 0.0, 0.0], "alpha")
+
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT embedding_model, embedding_dim FROM embeddings WHERE segment_id='s1'")
+        assert tuple(cur.fetchone()) == ("old-model", 3)
+
+
+def test_reembed_batches_in_shadow_then_switches(db, monkeypatch):
+    monkeypatch.setenv("OLLAMA_MODEL_EMBED", "old-model")
+    monkeypatch.setenv("REEMBED_BATCH_SIZE", "2")
+    monkeypatch.setenv("REEMBED_INTERVAL_SECONDS", "0")
+    _add("s1", [1.0, 0.0], "alpha")
+    _add("s2", [0.0, 1.0], "beta")
+    _add("s3", [0.7, 0.7], "gamma")
+
+    calls = []
+
+    def fake_embed(text, model=None):
+        calls.append((text, model))
+        return {"alpha": [0.0, 0.0, 1.0], "beta": [1.0, 0.0, 0.0], "gamma": [0.0, 1.0, 0.0]}[text]
+
+    monkeypatch.setattr(reembed, "embed", fake_embed)
+    monkeypatch.setenv("OLLAMA_MODEL_EMBED", "new-model")
+    assert get_active_embedding_model() == "new-model"
+
+    # Pin the old model as active, as a deployment would before flipping the env var.
+    with get_conn() as conn:
+        from app.modules.embeddings.embedding_store import set_active_embedding_model
+
+        set_active_embedding_model(conn, "old-model")
+        conn.commit()
+
+    reembed.start_reembed("new-model")
+    reembed.handle_job({"source_version": "new-model", "lane": "oss20b"})
+
+    # First batch is staged in the shadow column; search still serves the old vectors.
+    assert len(calls) == 2
+    assert get_active_embedding_model() == "old-model"
+    assert search_embeddings([1.0, 0.0], limit=1)[0]["segment_id"] == "s1"
+    status = reembed.reembed_status("new-model")
+    assert status["staged"] == 2
+    assert status["pending"] == 1
+    # The job queued by start_reembed continues the chain; no second link is added.
+    assert _queued_reembed_jobs().count("new-model") == 1
+
+    reembed.handle_job({"source_version": "new-model", "lane": "oss20b"})
+
+    assert len(calls) == 3
+    assert get_active_embedding_model() == "new-model"
+    assert search_embeddings([1.0, 0.0, 0.0], limit=1)[0]["segment_id"] == "s2"
+    assert search_embeddings([1.0, 0.0], limit=1) == []
+    status = reembed.reembed_status("new-model")
+    assert status["on_target"] == 3
+    assert status["pending"] == 0
+
+
+def test_reembed_does_not_switch_while_old_rows_remain(db, monkeypatch):
+    monkeypatch.setenv("OLLAMA_MODEL_EMBED", "old-model")
+    monkeypatch.setenv("REEMBED_BATCH_SIZE", "10")
+    _add("s1", [1.0, 0.0], "alpha")
+    monkeypatch.setattr(reembed, "embed", lambda text, model=None: [0.5, 0.5, 0.5])
+
+    assert reembed._switch_model("new-model") is False
+    assert get_active_embedding_model() == "old-model"
+
+    reembed.handle_job({"source_version": "new-model", "lane": "oss20b"})
+    assert get_active_embedding_model() == "new-model"
+
+
+def test_start_reembed_runs_one_chain_at_a_time(db):
+    import pytest
+
+    first = reembed.start_reembed("new-model")
+    assert reembed.start_reembed("new-model") == first
+    with pytest.raises(ValueError):
+        reembed.start_reembed("other-model")
+    assert _queued_reembed_jobs() == ["new-model"]
+
+
+def test_reembed_switch_schedules_memory_and_summary_backfills(db, monkeypatch):
+    from app.core.manifest import upsert_manifest
+    from app.modules.embeddings.embedding_store import upsert_doc_embedding
+
+    monkeypatch.setenv("OLLAMA_MODEL_EMBED", "old-model")
+    _add("s1", [1.0, 0.0], "alpha")
+    upsert_manifest("doc1", "v1", {"source_id": "doc1", "artifacts": {"doc_summary": "enrich/doc_summary.json"}})
+    upsert_manifest("doc2", "v1", {"source_id": "doc2", "artifacts": {}})
+    upsert_doc_embedding(
+        {
+            "doc_id": "doc1",
+            "source_id": "doc1",
+            "source_version": "v1",
+            "summary": "alpha summary",
+            "text_hash": "h",
+            "embedding": [1.0, 0.0],
+        }
+    )
+    monkeypatch.setattr(reembed, "embed", lambda text, model=None: [0.0, 0.0, 1.0])
+
+    reembed.handle_job({"source_version": "new-model", "lane": "oss20b"})
+
+    assert get_active_embedding_model() == "new-model"
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT job_type, source_id FROM jobs WHERE status='queued' ORDER BY job_type")
+        assert [tuple(row) for row in cur.fetchall()] == [("embed_doc_summary", "doc1"), ("memory_embed", "memory:embeddings")]
@@ -1,3 +1,5 @@
+import json
+
 from app.modules.memory.memory_recall import recall
 from app.modules.memory.retrieval_feedback import (
     apply_retrieval_feedback,
@@ -45,6 +47,31 @@ def test_apply_retrieval_feedback_boosts_cited_and_penalizes_missed(db, memory_e
     assert float(rows[0].get("feedback_boost") or 0.0) > 0.0
 
 
+def test_boost_keeps_tokens_of_every_query_in_the_cluster(db, memory_enabled):
+    # Both questions share the cluster key (first four tokens) but end differently.
+    for question in ("aurora roadmap timeline review budget", "aurora roadmap timeline review hiring"):
+        record_retrieval_feedback(
+            question=question,
+            evidence=[{"doc_id": "doc-good", "segment_id": "seg-1", "retrieval_source": "keyword"}],
+            citations=[{"doc_id": "doc-good", "segment_id": "seg-1"}],
+            answer_text="Based on doc-good.",
+        )
+
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT query_tokens, cited_weight FROM retrieval_boosts WHERE doc_id='doc-good'")
+        [(raw_tokens, cited_weight)] = cur.fetchall()
+    assert {"budget", "hiring"} <= set(json.loads(raw_tokens))
+    assert cited_weight > 1.5
+
+    first, second = (
+        [{"doc_id": "doc-good", "segment_id": "seg-1", "final_score": 0.5, "score": 0.5}] for _ in range(2)
+    )
+    apply_retrieval_feedback("aurora roadmap timeline review budget", first)
+    apply_retrieval_feedback("aurora roadmap timeline review hiring", second)
+    assert first[0]["final_score"] == second[0]["final_score"] > 0.5
+
+
 def test_apply_retrieval_feedback_respects_scope(db, memory_enabled):
     record_retrieval_feedback(
         question="aurora roadmap timeline",
@@ -89,8 +116,8 @@ def test_apply_retrieval_feedback_applies_time_decay(db, memory_enabled, monkeyp
     with get_conn() as conn:
         cur = conn.cursor()
         cur.execute(
-            "UPDATE memory_items SET created_at=? WHERE memory_id=?",
-            ("2000-01-01T00:00:00+00:00", str(old_receipt["memory_id"])),
+            "UPDATE retrieval_boosts SET updated_at=? WHERE doc_id=?",
+            ("2000-01-01T00:00:00+00:00", "doc-old"),
         )
         conn.commit()
 
@@ -127,3 +154,96 @@ def test_apply_retrieval_feedback_caps_per_query_cluster(db, memory_enabled, mon
     boost = float(rows[0].get("feedback_boost") or 0.0)
     assert boost > 0.10
     assert boost < 0.20
+
+
+def test_feedback_boosts_are_backfilled_from_feedback_memories(db, memory_enabled):
+    from app.modules.memory.maintenance import run_memory_maintenance
+
+    record_retrieval_feedback(
+        question="aurora roadmap timeline",
+        evidence=[{"doc_id": "doc-good", "segment_id": "seg-1", "retrieval_source": "keyword"}],
+        citations=[{"doc_id": "doc-good", "segment_id": "seg-1"}],
+        answer_text="Based on doc-good.",
+        user_id="alice",
+    )
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT user_id, query_cluster, doc_id, segment_id, cited_weight FROM retrieval_boosts")
+        recorded = [tuple(row) for row in cur.fetchall()]
+        cur.execute("DELETE FROM retrieval_boosts")
+        conn.commit()
+    assert recorded == [("alice", "aurora|roadmap|timeline", "doc-good", "seg-1", 1.0)]
+
+    out = run_memory_maintenance()
+    assert out["boosts_backfilled"] == 1
+
+    rows = [{"doc_id": "doc-good", "segment_id": "seg-1", "final_score": 0.5, "score": 0.5}]
+    apply_retrieval_feedback("aurora roadmap timeline", rows, user_id="alice")
+    assert float(rows[0].get("feedback_boost") or 0.0) > 0.0
+
+
+def test_feedback_boost_is_scaled_to_rrf_score_spread(db, memory_enabled):
+    from app.modules.retrieve.fusion import feedback_scale, fuse
+
+    record_retrieval_feedback(
+        question="aurora roadmap timeline",
+        evidence=[{"doc_id": "d8", "segment_id": "s", "retrieval_source": "embedding"}],
+        citations=[{"doc_id": "d8", "segment_id": "s"}],
+        answer_text="Based on d8.",
+    )
+
+    def ranked(scale):
+        candidates = [
+            {"doc_id": f"d{rank}", "segment_id": "s", "score": 1.0 - rank / 100, "text_snippet": "", "retrieval_source": "embedding"}
+            for rank in range(1, 11)
+        ]
+        rows = fuse({"embedding": candidates}, [], method="rrf")
+        apply_retrieval_feedback("aurora roadmap timeline", rows, scale=scale)
+        return [row["doc_id"] for row in sorted(rows, key=lambda r: r["final_score"], reverse=True)]
+
+    # Unscaled, one cited answer jumps rank 8 past every RRF rank gap; scaled, it climbs a few ranks.
+    assert ranked(1.0)[0] == "d8"
+    assert ranked(feedback_scale("rrf")).index("d8") == 4
+    assert feedback_scale("legacy") == 1.0
+
+
+def test_feedback_memory_and_boosts_commit_together(db, memory_enabled, monkeypatch):
+    import pytest
+
+    from app.modules.memory import retrieval_feedback
+
+    def broken(*args, **kwargs):
+        raise RuntimeError("boost write failed")
+
+    monkeypatch.setattr(retrieval_feedback, "_update_boosts", broken)
+    with pytest.raises(RuntimeError):
+        record_retrieval_feedback(
+            question="aurora roadmap timeline",
+            evidence=[{"doc_id": "doc-good", "segment_id": "seg-1", "retrieval_source": "keyword"}],
+            citations=[{"doc_id": "doc-good", "segment_id": "seg-1"}],
+        )
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT COUNT(*) FROM memory_items WHERE kind = 'retrieval_feedback'")
+        assert cur.fetchone()[0] == 0
+
+
+def test_init_db_seeds_boosts_from_feedback_memories(db, memory_enabled):
+    from app.queue.db import init_db
+
+    record_retrieval_feedback(
+        question="aurora roadmap timeline",
+        evidence=[{"doc_id": "doc-good", "segment_id": "seg-1", "retrieval_source": "keyword"}],
+        citations=[{"doc_id": "doc-good", "segment_id": "seg-1"}],
+    )
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("DELETE FROM retrieval_boosts")
+        conn.commit()
+
+    init_db()
+
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT doc_id, segment_id, cited_weight FROM retrieval_boosts")
+        assert [tuple(row) for row in cur.fetchall()] == [("doc-good", "seg-1", 1.0)]
@@ -0,0 +1,97 @@
+from app.modules.library.delete_source import delete_source
+from app.modules.memory.memory_write import write_memory
+from app.modules.retrieve.chunk_index import index_chunks
+from app.modules.retrieve.result_cache import clear_result_cache, result_cache_stats
+from app.modules.retrieve.retrieve_snowflake import retrieve
+
+
+class CountingClient:
+    def __init__(self):
+        self.calls = 0
+
+    def search_segments(self, query, limit=10, filters=None):
+        return "SQL"
+
+    def execute_query(self, sql):
+        self.calls += 1
+        return [{"doc_id": "kb:1", "segment_id": "s1", "text": "aurora roadmap review"}]
+
+
+def _setup(monkeypatch):
+    monkeypatch.setenv("EMBEDDINGS_ENABLED", "0")
+    monkeypatch.setenv("MEMORY_ENABLED", "1")
+    monkeypatch.setenv("CONTEXT_HANDOFF_ENABLED", "0")
+    monkeypatch.setenv("RETRIEVE_CACHE_SIZE", "16")
+    clear_result_cache()
+
+
+def test_repeat_queries_hit_cache_until_new_data_lands(db, monkeypatch):
+    _setup(monkeypatch)
+    client = CountingClient()
+
+    first = retrieve("aurora  roadmap", limit=5, client=client)
+    report = {}
+    second = retrieve("aurora roadmap", limit=5, client=client, report=report)
+
+    assert client.calls == 1
+    assert report["cache"] == "hit"
+    assert second == first
+    second[0]["text_snippet"] = "mutated by caller"
+    assert retrieve("aurora roadmap", limit=5, client=client)[0]["text_snippet"] != "mutated by caller"
+
+    # Memory runs live on every call: a new memory shows up without invalidating the cached data sources.
+    write_memory(memory_type="working", text="aurora roadmap moved to May", publish_long_term=False)
+    after_write = retrieve("aurora roadmap", limit=5, client=client)
+
+    assert client.calls == 1
+    assert any(str(row["doc_id"]).startswith("memory:") for row in after_write)
+    assert result_cache_stats()["stale"] == 0
+
+    index_chunks(
+        "doc:1",
+        "v1",
+        [{"doc_id": "doc:1", "segment_id": "c1", "text": "aurora roadmap draft", "source_refs": {}}],
+    )
+    after_index = retrieve("aurora roadmap", limit=5, client=client)
+
+    assert client.calls == 2
+    assert any(row["doc_id"] == "doc:1" for row in after_index)
+    assert result_cache_stats()["stale"] == 1
+
+
+def test_scope_filters_and_deletes_are_isolated(db, monkeypatch):
+    _setup(monkeypatch)
+    client = CountingClient()
+    index_chunks(
+        "doc:1",
+        "v1",
+        [{"doc_id": "doc:1", "segment_id": "c1", "text": "aurora roadmap draft", "source_refs": {}}],
+    )
+
+    retrieve("aurora roadmap", limit=5, filters={"user_id": "alice"}, client=client)
+    retrieve("aurora roadmap", limit=5, filters={"user_id": "bob"}, client=client)
+    assert client.calls == 2
+
+    before = retrieve("aurora roadmap", limit=5, client=client)
+    assert any(row["doc_id"] == "doc:1" for row in before)
+    delete_source("doc:1")
+    after = retrieve("aurora roadmap", limit=5, client=client)
+    assert all(row["doc_id"] != "doc:1" for row in after)
+
+
+def test_partial_results_are_not_cached(db, monkeypatch):
+    _setup(monkeypatch)
+
+    class BrokenClient(CountingClient):
+        def execute_query(self, sql):
+            self.calls += 1
+            raise RuntimeError("warehouse unavailable")
+
+    client = BrokenClient()
+    retrieve("aurora roadmap", limit=5, client=client)
+    report = {}
+    retrieve("aurora roadmap", limit=5, client=client, report=report)
+
+    assert client.calls == 2
+    assert report["cache"] == "miss"
+    assert report["sources"]["keyword"]["status"] == "error"
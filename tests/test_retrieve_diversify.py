@@ -0,0 +1,67 @@
+from app.modules.embeddings.embedding_store import upsert_embedding
+from app.modules.retrieve.diversify import diversify, estimate_jaccard, minhash_signature
+
+
+TRANSCRIPT = (
+    "we agreed that the aurora retrieval rewrite ships in the second quarter "
+    "after the evaluation harness is finished and the budget is approved"
+)
+
+
+def _row(doc_id, segment_id, score, text, source="lexical"):
+    return {
+        "doc_id": doc_id,
+        "segment_id": segment_id,
+        "final_score": score,
+        "text_snippet": text,
+        "retrieval_source": source,
+    }
+
+
+def test_minhash_estimates_overlap_of_shingled_text():
+    same = estimate_jaccard(minhash_signature(TRANSCRIPT), minhash_signature(TRANSCRIPT.upper()))
+    shifted = estimate_jaccard(minhash_signature(TRANSCRIPT), minhash_signature(TRANSCRIPT + " by the board"))
+    unrelated = estimate_jaccard(minhash_signature(TRANSCRIPT), minhash_signature("lunch menu for friday and coffee"))
+
+    assert same == 1.0
+    assert shifted > 0.7
+    assert unrelated < 0.1
+
+
+def test_near_duplicates_across_sources_are_suppressed():
+    rows = [
+        _row("yt:1", "tchunk_1", 0.9, TRANSCRIPT),
+        _row("memory:m1", "memory", 0.8, TRANSCRIPT + " by the board", source="memory"),
+        _row("doc:2", "chunk_1", 0.5, "hardware purchase approved for the lab"),
+    ]
+    report = {}
+
+    picked = diversify(rows, limit=3, mmr_lambda=1.0, near_duplicate_threshold=0.7, report=report)
+
+    assert [row["doc_id"] for row in picked] == ["yt:1", "doc:2"]
+    assert picked[0]["retrieval_sources"] == ["lexical", "memory"]
+    assert report["near_duplicates_suppressed"] == 1
+
+
+def test_mmr_uses_stored_vectors_to_prefer_distinct_evidence(db):
+    vectors = {"a": [1.0, 0.0, 0.0], "b": [0.99, 0.1, 0.0], "c": [0.0, 1.0, 0.0]}
+    for doc_id, vector in vectors.items():
+        upsert_embedding(
+            {
+                "doc_id": doc_id,
+                "segment_id": "s",
+                "source_id": doc_id,
+                "source_version": "v1",
+                "text": f"text {doc_id}",
+                "text_hash": doc_id,
+                "embedding": vector,
+            }
+        )
+    rows = [
+        _row("a", "s", 1.0, "roadmap spring release"),
+        _row("b", "s", 0.95, "release planning notes"),
+        _row("c", "s", 0.8, "budget approval meeting"),
+    ]
+
+    assert [row["doc_id"] for row in diversify(rows, limit=2, mmr_lambda=1.0)] == ["a", "b"]
+    assert [row["doc_id"] for row in diversify(rows, limit=2, mmr_lambda=0.5)] == ["a", "c"]
@@ -0,0 +1,82 @@
+from app.modules.embeddings.embedding_store import adjacent_chunks, upsert_embedding
+from app.modules.retrieve.chunk_index import index_chunks
+from app.modules.retrieve.retrieve_snowflake import retrieve
+
+
+TEXTS = [
+    "Welcome everyone to the planning call.",
+    "First item is the hardware budget.",
+    "The Aurora retrieval rewrite ships in the second quarter.",
+    "That depends on the evaluation harness.",
+    "Next week we review the lunch rota.",
+]
+
+
+class FakeEmptyClient:
+    def search_segments(self, query: str, limit: int = 10, filters=None) -> str:
+        return f"SQL({query},{limit},{filters})"
+
+    def execute_query(self, sql: str):
+        return []
+
+
+def _seed(doc_id="yt:1"):
+    chunks = []
+    for idx, text in enumerate(TEXTS):
+        chunk = {
+            "doc_id": doc_id,
+            "segment_id": f"tchunk_{idx}",
+            "start_ms": idx * 10000,
+            "end_ms": (idx + 1) * 10000,
+            "speaker": "Anna",
+            "text": text,
+            "source_refs": {},
+        }
+        chunks.append(chunk)
+        upsert_embedding(
+            {
+                **chunk,
+                "source_id": doc_id,
+                "source_version": "v1",
+                "text_hash": f"h{idx}",
+                "embedding": [1.0, float(idx)],
+            }
+        )
+    return chunks
+
+
+def test_adjacent_chunks_by_seconds_and_by_count(db):
+    _seed()
+    hit = ("yt:1", "tchunk_2", 20000, 30000)
+
+    by_time = adjacent_chunks([hit], seconds=10)
+    assert [row["segment_id"] for row in by_time[("yt:1", "tchunk_2")]] == ["tchunk_1", "tchunk_3"]
+
+    by_count = adjacent_chunks([hit, ("yt:1", "tchunk_0", 0, 10000)], chunks=2)
+    assert [row["segment_id"] for row in by_count[("yt:1", "tchunk_2")]] == [
+        "tchunk_0",
+        "tchunk_1",
+        "tchunk_3",
+        "tchunk_4",
+    ]
+    assert [row["segment_id"] for row in by_count[("yt:1", "tchunk_0")]] == ["tchunk_1", "tchunk_2"]
+
+
+def test_retrieve_expands_timed_hits_with_neighbouring_chunks(db, monkeypatch):
+    monkeypatch.setenv("EMBEDDINGS_ENABLED", "0")
+    monkeypatch.setenv("MEMORY_ENABLED", "0")
+    monkeypatch.setenv("CONTEXT_HANDOFF_ENABLED", "0")
+    index_chunks("yt:1", "v1", _seed())
+
+    plain = retrieve("aurora retrieval rewrite", limit=1, client=FakeEmptyClient())
+    expanded = retrieve("aurora retrieval rewrite", limit=1, client=FakeEmptyClient(), expand_chunks=1)
+
+    assert plain[0]["segment_id"] == "tchunk_2"
+    assert "context_segment_ids" not in plain[0]
+    row = expanded[0]
+    assert row["segment_id"] == "tchunk_2"
+    assert (row["start_ms"], row["end_ms"]) == (20000, 30000)
+    assert (row["context_start_ms"], row["context_end_ms"]) == (10000, 40000)
+    assert row["context_segment_ids"] == ["tchunk_1", "tchunk_3"]
+    assert row["text_snippet"].startswith("First item is the hardware budget.")
+    assert row["text_snippet"].endswith("That depends on the evaluation harness.")
@@ -0,0 +1,84 @@
+import time
+
+from app.modules.retrieve.fanout import run_sources
+from app.modules.retrieve.retrieve_snowflake import retrieve
+
+
+def test_run_sources_bounds_latency_and_keeps_partial_results():
+    def slow():
+        time.sleep(1.0)
+        return ["late"]
+
+    def fast():
+        time.sleep(0.05)
+        return ["a", "b"]
+
+    def broken():
+        raise RuntimeError("snowflake down")
+
+    began = time.monotonic()
+    outputs, report = run_sources(
+        {"slow": slow, "fast": fast, "fast2": fast, "broken": broken},
+        timeouts={"slow": 0.2, "fast": 1.0, "fast2": 1.0, "broken": 1.0},
+        parallel=True,
+    )
+    elapsed = time.monotonic() - began
+
+    assert elapsed < 0.6
+    assert outputs == {"fast": ["a", "b"], "fast2": ["a", "b"]}
+    assert report["slow"]["status"] == "timeout"
+    assert report["fast"] == {"status": "ok", "ms": report["fast"]["ms"], "count": 2}
+    assert report["broken"]["status"] == "error"
+    assert "snowflake down" in report["broken"]["error"]
+
+
+def test_retrieve_drops_slow_keyword_source_and_reports_timings(db, monkeypatch):
+    from app.modules.retrieve.chunk_index import index_chunks
+
+    class SlowSnowflake:
+        def search_segments(self, query, limit=10, filters=None):
+            return "SQL"
+
+        def execute_query(self, sql):
+            time.sleep(1.0)
+            return [{"doc_id": "late", "segment_id": "s", "text": "aurora roadmap"}]
+
+    monkeypatch.setenv("EMBEDDINGS_ENABLED", "0")
+    monkeypatch.setenv("MEMORY_ENABLED", "0")
+    monkeypatch.setenv("CONTEXT_HANDOFF_ENABLED", "0")
+    monkeypatch.setenv("RETRIEVE_SOURCE_TIMEOUTS", "keyword=0.2")
+    index_chunks(
+        "doc:1",
+        "v1",
+        [{"doc_id": "doc:1", "segment_id": "chunk_0", "text": "aurora roadmap for spring", "source_refs": {}}],
+    )
+
+    report = {}
+    began = time.monotonic()
+    results = retrieve("aurora roadmap", limit=3, client=SlowSnowflake(), report=report)
+
+    assert time.monotonic() - began < 0.8
+    assert [r["doc_id"] for r in results] == ["doc:1"]
+    assert report["sources"]["keyword"]["status"] == "timeout"
+    assert report["sources"]["lexical"]["status"] == "ok"
+    assert report["sources"]["lexical"]["count"] == 1
+    assert report["parallel"] is True
+
+
+def test_require_source_raises_for_failed_or_late_sources():
+    import pytest
+
+    from app.modules.retrieve.fanout import require_source
+
+    report = {
+        "ok": {"status": "ok", "ms": 1.0},
+        "late": {"status": "timeout", "ms": 200.0},
+        "broken": {"status": "error", "ms": 1.0, "error": "snowflake down"},
+    }
+    require_source(report, "ok")
+    with pytest.raises(TimeoutError):
+        require_source(report, "late")
+    with pytest.raises(RuntimeError, match="snowflake down"):
+        require_source(report, "broken")
+    with pytest.raises(RuntimeError):
+        require_source(report, "missing")
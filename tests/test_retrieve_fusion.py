@@ -0,0 +1,78 @@
+import pytest
+
+from app.modules.embeddings.embedding_store import search_embeddings, upsert_embedding
+from app.modules.retrieve import fusion
+from app.modules.retrieve.chunk_index import index_chunks, search_chunks
+from app.modules.retrieve.fusion import fuse
+
+
+def _row(doc_id, score, source, text="aurora roadmap"):
+    return {"doc_id": doc_id, "segment_id": "s", "score": score, "text_snippet": text, "retrieval_source": source}
+
+
+def _ranked(rows):
+    return [row["doc_id"] for row in sorted(rows, key=lambda r: r["final_score"], reverse=True)]
+
+
+def test_rrf_prefers_candidates_found_by_several_sources():
+    outputs = {
+        "embedding": [_row("a", 0.9, "embedding"), _row("both", 0.8, "embedding")],
+        "keyword": [_row("b", 1.0, "keyword"), _row("both", 0.5, "keyword")],
+    }
+
+    fused = fuse(outputs, ["aurora", "roadmap"], method="rrf", weights={})
+
+    assert _ranked(fused)[0] == "both"
+    merged = next(row for row in fused if row["doc_id"] == "both")
+    assert merged["retrieval_sources"] == ["embedding", "keyword"]
+    assert all(0.0 < row["final_score"] <= 1.0 for row in fused)
+
+
+def test_zscore_weights_shift_ranking_between_sources():
+    def outputs():
+        return {
+            "embedding": [_row("e1", 0.9, "embedding"), _row("e2", 0.2, "embedding")],
+            "keyword": [_row("k1", 0.6, "keyword"), _row("k2", 0.1, "keyword")],
+        }
+
+    favour_keyword = fuse(outputs(), [], method="zscore", weights={"embedding": 0.2, "keyword": 1.0})
+    favour_embedding = fuse(outputs(), [], method="zscore", weights={"embedding": 1.0, "keyword": 0.2})
+
+    assert _ranked(favour_keyword)[0] == "k1"
+    assert _ranked(favour_embedding)[0] == "e1"
+
+
+def test_legacy_fusion_keeps_source_bias_blend():
+    fused = fuse({"keyword": [_row("a", 1.0, "keyword", text="aurora")]}, ["aurora", "roadmap"], method="legacy")
+
+    assert fused[0]["final_score"] == pytest.approx(0.18 + 0.52 + 0.15)
+
+
+def test_stored_token_sets_avoid_retokenizing_candidates(db, monkeypatch):
+    index_chunks(
+        "doc:1",
+        "v1",
+        [{"doc_id": "doc:1", "segment_id": "c1", "text": "Aurora roadmap, spring!", "source_refs": {}}],
+    )
+    upsert_embedding(
+        {
+            "doc_id": "doc:2",
+            "segment_id": "c1",
+            "source_id": "doc:2",
+            "source_version": "v1",
+            "text": "Roadmap review",
+            "text_hash": "h",
+            "embedding": [1.0, 0.0],
+        }
+    )
+    lexical = search_chunks("aurora roadmap", limit=5)
+    embedded = search_embeddings([1.0, 0.0], limit=5)
+    assert lexical[0]["tokens"] == ["aurora", "roadmap", "spring"]
+    assert embedded[0]["tokens"] == ["review", "roadmap"]
+
+    def fail(_text):
+        raise AssertionError("candidate text was re-tokenized")
+
+    monkeypatch.setattr(fusion, "tokens", fail)
+    fused = fuse({"lexical": lexical, "embedding": embedded}, ["aurora", "roadmap"], method="rrf", weights={})
+    assert _ranked(fused) == ["doc:1", "doc:2"]
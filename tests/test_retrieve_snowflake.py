@@ -1,3 +1,5 @@
+import pytest
+
 from app.modules.retrieve.retrieve_snowflake import retrieve
 from app.modules.memory.context_handoff import record_turn_and_refresh
 from app.modules.memory.memory_write import write_memory
@@ -34,22 +36,23 @@ class FakeDualClient:
         return f"SQL({query},{limit},{filters})"
 
     def execute_query(self, sql: str):
+        # doc-b leads on order and overlap, so only feedback can put doc-a first.
         return [
             {
-                "doc_id": "doc-a",
-                "segment_id": "seg-a",
+                "doc_id": "doc-b",
+                "segment_id": "seg-b",
                 "start_ms": 0,
                 "end_ms": 10,
                 "speaker": "UNKNOWN",
                 "text": "aurora roadmap timeline",
             },
             {
-                "doc_id": "doc-b",
-                "segment_id": "seg-b",
+                "doc_id": "doc-a",
+                "segment_id": "seg-a",
                 "start_ms": 0,
                 "end_ms": 10,
                 "speaker": "UNKNOWN",
-                "text": "aurora roadmap timeline",
+                "text": "aurora roadmap timeline notes",
             },
         ]
 
@@ -120,11 +123,13 @@ def test_retrieve_filters_memory_by_kind(tmp_path, monkeypatch):
     assert all(row.get("memory_kind") == "procedural" for row in memory_rows)
 
 
-def test_retrieve_uses_feedback_to_rerank_segments(tmp_path, monkeypatch):
+@pytest.mark.parametrize("fusion", ["legacy", "rrf"])
+def test_retrieve_uses_feedback_to_rerank_segments(tmp_path, monkeypatch, fusion):
     from app.modules.memory.retrieval_feedback import record_retrieval_feedback
 
     db_path = tmp_path / "queue.db"
     monkeypatch.setenv("POSTGRES_DSN", f"sqlite://{db_path}")
+    monkeypatch.setenv("RETRIEVE_FUSION", fusion)
     monkeypatch.setenv("EMBEDDINGS_ENABLED", "0")
     monkeypatch.setenv("MEMORY_ENABLED", "1")
     monkeypatch.setenv("CONTEXT_HANDOFF_ENABLED", "0")